@@ -1,16 +1,55 @@
 '''BEER -- the Bayesian spEEch Recognizer.
 
 BEER is a machine learning library focused on Bayesian Generative Models
-for speech technologies. 
+for speech technologies.
 
 '''
 
-from .models import *
-from .inference import *
-from . import features
-from . import nnet
-from . import dists
-from . import graph
-
+from importlib import import_module as _import_module
 import warnings
+
 warnings.filterwarnings("default", category=DeprecationWarning, module='beer')
+
+
+# The sub-modules (and therefore torch) are imported on first access
+# so that "import beer.cli..." stays cheap for the command line tools.
+# The public names of the "models" and "inference" modules are
+# available at the top level as if imported with "from ... import *".
+_submodules = ['features', 'nnet', 'dists', 'graph', 'lattice',
+               'serialization']
+_star_modules = ['inference', 'models']
+
+
+def _public_names(module):
+    if hasattr(module, '__all__'):
+        return list(module.__all__)
+    return [name for name in vars(module) if not name.startswith('_')]
+
+
+def __getattr__(name):
+    if name == '__all__':
+        names = []
+        for module_name in reversed(_star_modules):
+            module = _import_module(f'.{module_name}', __name__)
+            names += _public_names(module)
+        return sorted(set(names + _submodules + _star_modules))
+
+    if name in _submodules:
+        return _import_module(f'.{name}', __name__)
+    if not name.startswith('_'):
+        for module_name in _star_modules:
+            module = _import_module(f'.{module_name}', __name__)
+            if name in _public_names(module):
+                value = getattr(module, name)
+                globals()[name] = value
+                return value
+        try:
+            return _import_module(f'.{name}', __name__)
+        except ModuleNotFoundError as err:
+            if err.name != f'{__name__}.{name}':
+                raise
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__getattr__('__all__')))
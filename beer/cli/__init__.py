@@ -1,3 +1,19 @@
+from importlib import import_module as _import_module
 
-from . import dataset
 
+# The modules are imported on first access so that the "beer" command
+# does not import torch (and the other heavy dependencies) before to
+# know which command it has to run.
+_submodules = ['audio', 'compression', 'dataset', 'feacache', 'feastore',
+               'kaldi', 'lattices', 'llhcache', 'objcache', 'pipeline',
+               'posteriors', 'server']
+
+
+def __getattr__(name):
+    if name in _submodules:
+        return _import_module(f'.{name}', __name__)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_submodules))
@@ -0,0 +1,226 @@
+'''Read the audio of a list of utterances.
+
+An audio entry is either the path to a wav file or a command
+ending up with the "|" symbol whose output is a wav file (for
+instance: ``sph2pipe -f wav file.sph |``). The commands are run
+asynchronously so that decoding the audio overlaps with the
+processing of the previous utterances.
+
+'''
+
+import asyncio
+from collections import deque
+import io
+import os
+import queue
+import signal
+import threading
+
+from scipy.io.wavfile import read
+
+
+__all__ = ['AudioReader', 'load_wav', 'read_audio']
+
+
+# Marker of the end of the stream of utterances.
+_END = object()
+
+
+def load_wav(source):
+    '''Load a wav file.
+
+    Args:
+        source (str or bytes): Path to the wav file or content of the
+            file.
+
+    Returns:
+        (int, numpy.ndarray): Sampling rate and signal.
+
+    '''
+    if isinstance(source, bytes):
+        return read(io.BytesIO(source))
+    return read(source)
+
+
+async def _run_command(cmd, semaphore):
+    async with semaphore:
+        # The command runs in its own process group so that all the
+        # processes of a pipeline can be killed.
+        proc = await asyncio.create_subprocess_shell(
+            cmd, stdout=asyncio.subprocess.PIPE, start_new_session=True)
+        try:
+            stdout, _ = await proc.communicate()
+        except asyncio.CancelledError:
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            await proc.wait()
+            raise
+    if proc.returncode != 0:
+        raise ValueError(f'command failed (exit code: {proc.returncode}): '
+                         f'{cmd}')
+    return stdout
+
+
+# Time (in seconds) between two checks of the stop event by the
+# blocking operations on the queue of the reader.
+_POLL_INTERVAL = .1
+
+
+class _Stopped(Exception):
+    'The consumer has stopped reading.'
+
+
+def _put(outqueue, item, stop):
+    while not stop.is_set():
+        try:
+            outqueue.put(item, timeout=_POLL_INTERVAL)
+            return
+        except queue.Full:
+            pass
+    raise _Stopped()
+
+
+async def _read_entries(entries, max_pipes, outqueue, stop):
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max_pipes)
+    pending = deque()
+
+    def ready():
+        # We bound the number of outputs waiting to be consumed.
+        if len(pending) > 2 * max_pipes:
+            return True
+        source = pending[0][1]
+        return not isinstance(source, asyncio.Future) or source.done()
+
+    async def flush_head():
+        uttid, source, *extra = pending.popleft()
+        if isinstance(source, asyncio.Future):
+            source = await source
+        # Blocking "put" in a thread as the other commands have to
+        # keep running while the consumer is busy.
+        await loop.run_in_executor(None, _put, outqueue,
+                                   (uttid, source, *extra), stop)
+
+    try:
+        entries = iter(entries)
+        while True:
+            # The entries are read in a thread as reading them can block
+            # (e.g. on stdin) while the output of the running commands
+            # has to be consumed.
+            entry = await loop.run_in_executor(None, next, entries, _END)
+            if entry is _END:
+                break
+            if stop.is_set():
+                raise _Stopped()
+            uttid, inwav, *extra = entry
+            if inwav is not None and inwav[-1] == '|':
+                source = asyncio.ensure_future(
+                    _run_command(inwav[:-1], semaphore))
+            else:
+                source = inwav
+            pending.append((uttid, source, *extra))
+            while pending and ready():
+                await flush_head()
+        while pending:
+            await flush_head()
+        await loop.run_in_executor(None, _put, outqueue, _END, stop)
+    except Exception as err:
+        tasks = [source for _, source, *_ in pending
+                 if isinstance(source, asyncio.Future)]
+        for task in tasks:
+            task.cancel()
+        # Wait (once) for the cancelled commands to be terminated.
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if not isinstance(err, _Stopped):
+            # The traceback refers to the frames of the running
+            # coroutines: they must not be cleared from the thread of
+            # the consumer (as done, for instance, by "unittest").
+            try:
+                await loop.run_in_executor(None, _put, outqueue,
+                                           err.with_traceback(None), stop)
+            except _Stopped:
+                pass
+
+
+class AudioReader:
+    '''Iterator over the audio of a sequence of utterances (see
+    :any:`read_audio`).
+
+    The reader has to be closed (or used as a context manager) when the
+    iteration stops early: the running commands are killed and the
+    reader thread is stopped.
+
+    '''
+
+    def __init__(self, entries, max_pipes=4):
+        self._queue = queue.Queue(maxsize=max_pipes)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(entries, max_pipes), daemon=True)
+        self._thread.start()
+
+    def _run(self, entries, max_pipes):
+        asyncio.run(_read_entries(entries, max_pipes, self._queue,
+                                  self._stop))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while True:
+            if self._stop.is_set():
+                raise StopIteration
+            try:
+                item = self._queue.get(timeout=_POLL_INTERVAL)
+                break
+            except queue.Empty:
+                pass
+        if item is _END:
+            self.close()
+            raise StopIteration
+        if isinstance(item, Exception):
+            # The reader has stopped the commands and is exiting.
+            self.close()
+            raise item
+        return item
+
+    def close(self):
+        '''Stop reading: kill the running commands and wait for the
+        reader thread to exit.'''
+        self._stop.set()
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+
+
+def read_audio(entries, max_pipes=4):
+    '''Read the audio of a sequence of utterances.
+
+    Args:
+        entries (iterable): Sequence of tuple (uttid, inwav, ...)
+            where "inwav" is a path to a wav file, a command ending
+            with "|" or None (nothing to read). The extra elements of
+            the tuple are passed through.
+        max_pipes (int): Maximum number of commands running at the
+            same time.
+
+    Returns:
+        :any:`AudioReader`: Iterator over the tuples (uttid, source,
+        ...): the utterance id and the source of the audio (path to the
+        wav file or output of the command, see :any:`load_wav`) in the
+        order of the input sequence.
+
+    Example:
+        >>> with read_audio(entries) as reader:
+        ...     for uttid, source in reader:
+        ...         srate, signal = load_wav(source)
+
+    '''
+    return AudioReader(entries, max_pipes)
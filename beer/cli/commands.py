@@ -0,0 +1,76 @@
+'''Lazy registration of the commands of the command line tool.
+
+The commands of a group (e.g. "beer hmm ...") are registered with their
+name and help message only. The module of a command, and with it the
+heavy dependencies (torch, scipy, ...), is imported when the command is
+selected on the command line so that "beer --help", "beer hmm --help"
+or a mistyped command return immediately.
+
+'''
+
+import argparse
+from importlib import import_module
+
+
+__all__ = ['CommandParser', 'add_commands', 'load_command']
+
+
+def load_command(group, name):
+    '''Import the module of a command.
+
+    Args:
+        group (str): Module of the group of commands (e.g.
+            "beer.cli.subcommands.hmm").
+        name (str): Name of the command.
+
+    Returns:
+        module: Module with the ``setup(parser)`` and ``main(args,
+        logger)`` functions of the command.
+
+    '''
+    return import_module(f'{group}.{name}')
+
+
+class CommandParser(argparse.ArgumentParser):
+    '''Parser of a command adding the arguments of the command (and
+    therefore importing its module) only when it is used.
+
+    Args:
+        group (str): Module of the group of the command.
+        command (str): Name of the command.
+
+    '''
+
+    def __init__(self, *args, group=None, command=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.group = group
+        self.command = command
+        self._loaded = False
+
+    def load(self):
+        if not self._loaded:
+            self._loaded = True
+            cmd = load_command(self.group, self.command)
+            cmd.setup(self)
+            self.set_defaults(func=cmd.main)
+
+    def parse_known_args(self, args=None, namespace=None):
+        self.load()
+        return super().parse_known_args(args, namespace)
+
+
+def add_commands(parser, group, cmds):
+    '''Add the commands of a group to a parser.
+
+    Args:
+        parser (``argparse.ArgumentParser``): Parser of the group.
+        group (str): Module of the group of commands.
+        cmds (dict): Help message of each command (by name).
+
+    '''
+    subparsers = parser.add_subparsers(title='possible commands',
+                                       metavar='<cmd>',
+                                       parser_class=CommandParser)
+    subparsers.required = True
+    for name, help_msg in cmds.items():
+        subparsers.add_parser(name, help=help_msg, group=group, command=name)
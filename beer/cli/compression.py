@@ -0,0 +1,183 @@
+'''Lossy compression of the features matrices.
+
+The matrices are quantized with the same scheme (and binary layout) as
+the compressed matrices of Kaldi:
+  * "int8" (Kaldi's "CM" format): each column is quantized on 8 bits
+    with a piecewise linear mapping defined by the 0th, 25th, 75th and
+    100th percentiles of the column,
+  * "int16" (Kaldi's "CM2" format): each element is quantized on 16
+    bits,
+  * "CM3" (8 bits per element) is only supported for decompression.
+All the formats start with a header storing the range of the whole
+matrix.
+
+'''
+
+import numpy as np
+
+
+__all__ = ['compress', 'decompress', 'compressed_size', 'METHODS']
+
+
+# Compression method -> Kaldi format (token).
+METHODS = {
+    'int8': b'CM ',
+    'int16': b'CM2 ',
+}
+
+
+# Header: min_value (float), range (float), num_rows (int), num_cols (int).
+_HEADER = np.dtype([('min_value', '<f4'), ('range', '<f4'),
+                    ('num_rows', '<i4'), ('num_cols', '<i4')])
+
+
+def _float_to_uint16(values, min_value, range_):
+    ratio = np.clip((values - min_value) / range_, 0., 1.)
+    return (ratio * 65535 + 0.499).astype(np.int64)
+
+
+def _uint16_to_float(values, min_value, range_):
+    return min_value + range_ * (1. / 65535) * values
+
+
+def _percentiles(features, min_value, range_):
+    nrows, _ = features.shape
+    sdata = np.sort(features, axis=0)
+    if nrows >= 5:
+        quarter_nr = nrows // 4
+        idxs = [0, quarter_nr, 3 * quarter_nr, nrows - 1]
+    else:
+        idxs = [0, min(1, nrows - 1), min(2, nrows - 1), nrows - 1]
+    p0, p25, p75, p100 = [_float_to_uint16(sdata[idx], min_value, range_)
+                          for idx in idxs]
+
+    # Make sure the percentiles are strictly increasing.
+    p0 = np.minimum(p0, 65532)
+    p25 = np.minimum(np.maximum(p25, p0 + 1), 65533)
+    p75 = np.minimum(np.maximum(p75, p25 + 1), 65534)
+    p100 = np.maximum(p100, p75 + 1)
+    return np.stack([p0, p25, p75, p100], axis=-1).astype('<u2')
+
+
+def _char_tables(col_headers, min_value, range_):
+    # Value of the 256 codes for each column: (num_cols x 256) matrix.
+    p0, p25, p75, p100 = _uint16_to_float(
+        col_headers.astype(np.float32), min_value, range_).T[:, :, None]
+    codes = np.arange(256, dtype=np.float32)[None, :]
+    return np.where(
+        codes <= 64,
+        p0 + (p25 - p0) * codes * (1 / 64.),
+        np.where(codes <= 192,
+                 p25 + (p75 - p25) * (codes - 64) * (1 / 128.),
+                 p75 + (p100 - p75) * (codes - 192) * (1 / 63.))
+    ).astype(np.float32)
+
+
+def _float_to_char(features, col_headers, min_value, range_):
+    p0, p25, p75, p100 = _uint16_to_float(
+        col_headers.astype(np.float32), min_value, range_).T[:, None, :]
+    low = np.clip(((features - p0) / (p25 - p0) * 64. + .5).astype(np.int64),
+                  0, 64)
+    mid = np.clip(64 + ((features - p25) / (p75 - p25) * 128. + .5).astype(np.int64),
+                  64, 192)
+    high = np.clip(192 + ((features - p75) / (p100 - p75) * 63. + .5).astype(np.int64),
+                   192, 255)
+    return np.where(features <= p25, low,
+                    np.where(features <= p75, mid, high)).astype(np.uint8)
+
+
+def compress(features, method='int8'):
+    '''Compress a features matrix.
+
+    Args:
+        features (numpy.ndarray): Matrix (nframes x dim) to compress.
+        method (str): "int8" or "int16".
+
+    Returns:
+        bytes: The compressed matrix.
+
+    '''
+    features = np.asarray(features, dtype=np.float32)
+    nrows, ncols = features.shape
+    header = np.zeros(1, dtype=_HEADER)
+    header['num_rows'], header['num_cols'] = nrows, ncols
+    if features.size > 0:
+        min_value = float(features.min())
+        range_ = float(features.max()) - min_value
+        if range_ == 0.:
+            range_ = 1.
+        header['min_value'], header['range'] = min_value, range_
+    min_value, range_ = header['min_value'][0], header['range'][0]
+
+    if method == 'int8':
+        if features.size > 0:
+            col_headers = _percentiles(features, min_value, range_)
+            codes = _float_to_char(features, col_headers, min_value, range_)
+        else:
+            col_headers = np.zeros((ncols, 4), dtype='<u2')
+            codes = np.zeros((nrows, ncols), dtype=np.uint8)
+        payload = col_headers.tobytes() + codes.T.tobytes()
+    elif method == 'int16':
+        payload = _float_to_uint16(features, min_value, range_) \
+            .astype('<u2').tobytes()
+    else:
+        raise ValueError(f'Unknown compression method: {method}')
+    return METHODS[method] + header.tobytes() + payload
+
+
+def compressed_size(buffer, offset=0):
+    '''Size (in bytes) of the compressed matrix starting at "offset"
+    in "buffer".'''
+    token, header = _read_header(buffer, offset)
+    nrows, ncols = int(header['num_rows']), int(header['num_cols'])
+    size = len(token) + _HEADER.itemsize
+    if token == b'CM ':
+        return size + 8 * ncols + nrows * ncols
+    elif token == b'CM2 ':
+        return size + 2 * nrows * ncols
+    return size + nrows * ncols
+
+
+def _read_header(buffer, offset):
+    buffer = memoryview(buffer)
+    for token in (b'CM ', b'CM2 ', b'CM3 '):
+        if bytes(buffer[offset: offset + len(token)]) == token:
+            header = np.frombuffer(buffer, dtype=_HEADER, count=1,
+                                   offset=offset + len(token))[0]
+            return token, header
+    raise ValueError('Not a compressed matrix')
+
+
+def decompress(buffer, offset=0):
+    '''Decompress a matrix.
+
+    Args:
+        buffer (bytes-like): Buffer containing the compressed matrix
+            (for instance a memory-mapped file).
+        offset (int): Start of the compressed matrix in the buffer.
+
+    Returns:
+        numpy.ndarray: float32 matrix (nframes x dim).
+
+    '''
+    token, header = _read_header(buffer, offset)
+    min_value, range_ = header['min_value'], header['range']
+    nrows, ncols = int(header['num_rows']), int(header['num_cols'])
+    offset += len(token) + _HEADER.itemsize
+
+    if token == b'CM ':
+        col_headers = np.frombuffer(buffer, dtype='<u2', count=4 * ncols,
+                                    offset=offset).reshape(ncols, 4)
+        codes = np.frombuffer(buffer, dtype=np.uint8, count=nrows * ncols,
+                              offset=offset + 8 * ncols).reshape(ncols, nrows)
+        tables = _char_tables(col_headers, min_value, range_)
+        return np.ascontiguousarray(
+            np.take_along_axis(tables, codes.astype(np.intp), axis=1).T)
+    elif token == b'CM2 ':
+        codes = np.frombuffer(buffer, dtype='<u2', count=nrows * ncols,
+                              offset=offset).reshape(nrows, ncols)
+        return (min_value + codes * np.float32(range_ / 65535.)) \
+            .astype(np.float32)
+    codes = np.frombuffer(buffer, dtype=np.uint8, count=nrows * ncols,
+                          offset=offset).reshape(nrows, ncols)
+    return (min_value + codes * np.float32(range_ / 255.)).astype(np.float32)
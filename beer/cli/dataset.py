@@ -1,11 +1,16 @@
 'Structure over a dataset.'
 
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 import random
+import threading
 from typing import NamedTuple, Any
 import numpy as np
 import torch
 
+from .feastore import load_features
+
 
 class Utterance(NamedTuple):
     'An audio recording and the associated meta-data.'
@@ -35,6 +40,129 @@ class UtteranceIterator:
         return Utterance(id=uttid, features=features)
 
 
+class PrefetchIterator:
+    '''Iterate over the utterances while loading the next ones in
+    background threads.
+
+    Args:
+        utts (iterable): Utterance ids.
+        fea_dict (dict-like): Features archive.
+        depth (int): Maximum number of utterances loaded in advance.
+        num_workers (int): Number of loading threads.
+        pin_memory (boolean): Load the features in page-locked memory
+            (faster transfer to the GPU).
+
+    '''
+
+    def __init__(self, utts, fea_dict, depth=4, num_workers=1,
+                 pin_memory=False):
+        self.utts = iter(utts)
+        self.fea_dict = fea_dict
+        self.depth = max(1, depth)
+        self.pin_memory = pin_memory
+        self._executor = ThreadPoolExecutor(max_workers=num_workers)
+        self._pending = deque()
+
+        # The "npz" archives share a single file handle.
+        self._lock = threading.Lock() if isinstance(fea_dict, np.lib.npyio.NpzFile) \
+            else None
+        self._fill()
+
+    def _load(self, uttid):
+        if self._lock is not None:
+            with self._lock:
+                features = self.fea_dict[uttid]
+        else:
+            features = self.fea_dict[uttid]
+        features = torch.from_numpy(features).float()
+        if self.pin_memory:
+            features = features.pin_memory()
+        return Utterance(id=uttid, features=features)
+
+    def _fill(self):
+        while len(self._pending) < self.depth:
+            try:
+                uttid = next(self.utts)
+            except StopIteration:
+                break
+            self._pending.append(self._executor.submit(self._load, uttid))
+
+    def close(self):
+        for future in self._pending:
+            future.cancel()
+        self._pending.clear()
+        self._executor.shutdown(wait=False)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self._pending:
+            self.close()
+            raise StopIteration
+        future = self._pending.popleft()
+        self._fill()
+        try:
+            return future.result()
+        except BaseException:
+            self.close()
+            raise
+
+
+class FrameBatchIterator:
+    '''Iterate over minibatches of frames drawn in random order across
+    the utterances. This is only valid for models without temporal
+    dependencies (Normal, Mixture, ...).
+
+    The frames are shuffled within a buffer: when the buffer holds at
+    least "buffer_size" frames, it is shuffled and minibatches are
+    drawn from it until half of the buffer is consumed. Hence, the
+    memory is bounded whatever the size of the dataset.
+
+    Note:
+        As the last minibatch may be smaller, the ELBO of each
+        minibatch has to be computed with ``datasize=dataset.size``
+        so that the statistics are scaled by the actual number of
+        frames of the minibatch.
+
+    Args:
+        utts (iterable): Utterances.
+        batch_size (int): Number of frames per minibatch.
+        buffer_size (int): Number of frames of the shuffle buffer.
+
+    '''
+
+    def __init__(self, utts, batch_size, buffer_size=100000):
+        self.utts = iter(utts)
+        self.batch_size = batch_size
+        self.buffer_size = max(buffer_size, batch_size)
+
+    def _shuffle(self, chunks):
+        frames = torch.cat(chunks)
+        return frames[torch.randperm(len(frames))]
+
+    def __iter__(self):
+        chunks, count = [], 0
+        for utt in self.utts:
+            chunks.append(utt.features)
+            count += len(utt.features)
+            if count < self.buffer_size:
+                continue
+            frames = self._shuffle(chunks)
+            start = 0
+            while count - start >= max(self.batch_size,
+                                       self.buffer_size // 2):
+                yield frames[start: start + self.batch_size]
+                start += self.batch_size
+            chunks, count = [frames[start:]], count - start
+
+        # Empty the buffer.
+        if count > 0:
+            frames = self._shuffle(chunks)
+            for start in range(0, count, self.batch_size):
+                yield frames[start: start + self.batch_size]
+
+
 @dataclass
 class Dataset:
     'A collection of utterances with their features and meta-data.'
@@ -48,7 +176,7 @@ class Dataset:
     @property
     def fea_dict(self):
         if self._fea_dict is None:
-            self._fea_dict = np.load(self.feapath)
+            self._fea_dict = load_features(self.feapath)
         return self._fea_dict
 
     def __getstate__(self):
@@ -56,24 +184,55 @@ class Dataset:
         return self.__dict__
 
     def __len__(self):
-        features = np.load(self.feapath)
-        return len(features.files)
+        return len(self.fea_dict.files)
 
-    def utterances(self, random_order=True):
+    def utterances(self, random_order=True, uttids=None, prefetch=0,
+                   num_workers=1, pin_memory=False):
         '''Return an iterator over the utterances.
 
         Args:
             random_order (boolean): If False, iterate over the
                 utterances sorted alphabetically by their id.
+            uttids (iterable): Iterate over these utterances (in the
+                given order) instead of the whole dataset.
+            prefetch (int): Number of utterances to load in advance in
+                background threads (0 to load them on demand).
+            num_workers (int): Number of loading threads.
+            pin_memory (boolean): Load the features in page-locked
+                memory.
 
         Returns:
             ``iterable``
 
         '''
-        uttsid = sorted(list(self.fea_dict.keys()))
-        if random_order:
-            random.shuffle(uttsid)
-        return UtteranceIterator(uttsid, self.fea_dict)
+        if uttids is None:
+            uttids = sorted(list(self.fea_dict.keys()))
+            if random_order:
+                random.shuffle(uttids)
+        if prefetch > 0:
+            return PrefetchIterator(uttids, self.fea_dict, depth=prefetch,
+                                    num_workers=num_workers,
+                                    pin_memory=pin_memory)
+        return UtteranceIterator(list(uttids), self.fea_dict)
+
+    def frame_batches(self, batch_size, buffer_size=100000, prefetch=0):
+        '''Return an iterator over shuffled minibatches of frames (see
+        :any:`FrameBatchIterator`).
+
+        Args:
+            batch_size (int): Number of frames per minibatch.
+            buffer_size (int): Number of frames of the shuffle buffer.
+            prefetch (int): Number of utterances to load in advance.
+
+        Returns:
+            ``iterable``
+
+        '''
+        return FrameBatchIterator(self.utterances(prefetch=prefetch),
+                                  batch_size, buffer_size)
+
+    def __contains__(self, key):
+        return key in self.fea_dict
 
     def __getitem__(self, key):
         features = torch.from_numpy(self.fea_dict[key]).float()
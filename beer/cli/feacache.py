@@ -0,0 +1,66 @@
+'''Content-addressed cache of features.
+
+The features of an utterance are stored under a key computed from the
+audio (the content of the wav file or the command producing it) and
+the features configuration. Hence, the features of an utterance are
+extracted only once whatever the number of runs or corpora using it.
+
+'''
+
+import hashlib
+import json
+import os
+import uuid
+import numpy as np
+
+
+__all__ = ['FeatureCache']
+
+
+class FeatureCache:
+    '''Directory of cached features.
+
+    Args:
+        cachedir (str): Cache directory (created if needed).
+        conf (dict): Features configuration.
+
+    '''
+
+    def __init__(self, cachedir, conf):
+        self.cachedir = cachedir
+        self.conf_hash = hashlib.sha256(
+            json.dumps(conf, sort_keys=True).encode('utf-8')).hexdigest()
+        os.makedirs(cachedir, exist_ok=True)
+
+    def key(self, inwav):
+        '''Key of an audio entry (path to a wav file or command ending
+        with "|").'''
+        key = hashlib.sha256(self.conf_hash.encode('utf-8'))
+        if inwav[-1] == '|':
+            key.update(b'cmd:' + inwav.encode('utf-8'))
+        else:
+            key.update(b'wav:')
+            with open(inwav, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    key.update(block)
+        return key.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cachedir, key[:2], key + '.npy')
+
+    def __contains__(self, key):
+        return os.path.isfile(self._path(key))
+
+    def __getitem__(self, key):
+        return np.load(self._path(key))
+
+    def __setitem__(self, key, features):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write then rename so that a crash or a concurrent job never
+        # leaves a truncated entry.
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.save(f, features)
+        os.replace(tmp_path, path)
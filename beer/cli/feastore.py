@@ -0,0 +1,160 @@
+'''Memory-mapped features store.
+
+A features store is made of two files:
+  * ``<path>``: the features of all the utterances stored contiguously
+    as 32 bits floating point numbers or as compressed matrices (see
+    :any:`beer.cli.compression`),
+  * ``<path>.idx``: the index, one line per utterance of the form:
+    ``<uttid> <offset> <nframes> <dim> [<compression>]`` where the
+    offset is given in number of 32 bits words.
+
+The data file is memory-mapped so accessing the (uncompressed) features
+of an utterance does not copy any data and all the processes of a
+machine share the same physical memory (page cache). Compressed
+features are decompressed on the fly.
+
+'''
+
+from collections import OrderedDict
+import os
+import numpy as np
+
+from .compression import compress, decompress
+from .kaldi import KaldiArchive, is_kaldi_archive
+
+
+__all__ = ['FeatureStore', 'FeatureStoreWriter', 'is_feature_store',
+           'load_features']
+
+
+DTYPE = np.dtype('<f4')
+
+
+def _index_path(path):
+    return path + '.idx'
+
+
+def is_feature_store(path):
+    'Return True if "path" is a features store.'
+    return os.path.isfile(path) and os.path.isfile(_index_path(path))
+
+
+def load_features(path):
+    '''Load a features archive: a "npz" archive, a features store or a
+    Kaldi archive ("scp" or "ark" file).
+
+    Args:
+        path (str): Path to the archive.
+
+    Returns:
+        A dictionary-like object uttid -> ``numpy.ndarray``.
+
+    '''
+    if is_feature_store(path):
+        return FeatureStore(path)
+    if is_kaldi_archive(path):
+        return KaldiArchive(path)
+    return np.load(path)
+
+
+class FeatureStore:
+    '''Read-only access to a features store.
+
+    Args:
+        path (str): Path to the data file of the store.
+
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.index = OrderedDict()
+        with open(_index_path(path), 'r') as f:
+            for line in f:
+                uttid, offset, nframes, dim, *compression = \
+                    line.strip().split()
+                self.index[uttid] = (int(offset), int(nframes), int(dim),
+                                     compression[0] if compression else None)
+
+        # Copy-on-write mapping: the features are shared with the other
+        # processes but they can be wrapped into a (writable) tensor.
+        if os.path.getsize(path) > 0:
+            self.data = np.memmap(path, dtype=np.uint8, mode='c')
+        else:
+            self.data = np.zeros(0, dtype=np.uint8)
+
+    @property
+    def files(self):
+        'Utterance ids (same attribute as the "npz" archive).'
+        return list(self.index.keys())
+
+    def keys(self):
+        return self.index.keys()
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, uttid):
+        return uttid in self.index
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __getitem__(self, uttid):
+        offset, nframes, dim, compression = self.index[uttid]
+        start = offset * DTYPE.itemsize
+        if compression is not None:
+            return decompress(self.data, start)
+        end = start + nframes * dim * DTYPE.itemsize
+        return self.data[start:end].view(DTYPE).reshape(nframes, dim)
+
+
+class FeatureStoreWriter:
+    '''Create a features store by appending the features of the
+    utterances one after another.
+
+    Args:
+        path (str): Path to the data file of the store.
+        compression (str): Compression method of the features
+            ("int8" or "int16", see :any:`beer.cli.compression`).
+            If not provided, the features are stored as 32 bits
+            floating point numbers.
+
+    Example:
+        >>> with FeatureStoreWriter('features.fea') as store:
+        ...     store.add('utt1', features)
+
+    '''
+
+    def __init__(self, path, compression=None):
+        self.path = path
+        self.compression = compression
+        self.offset = 0
+        self._data = open(path, 'wb')
+        self._index = open(_index_path(path), 'w')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def add(self, uttid, features):
+        'Append the features (``numpy.ndarray[nframes, dim]``).'
+        features = np.ascontiguousarray(features, dtype=DTYPE)
+        nframes, dim = features.shape
+        if self.compression is None:
+            data = features.tobytes()
+            print(uttid, self.offset, nframes, dim, file=self._index)
+        else:
+            data = compress(features, self.compression)
+
+            # Keep the entries aligned on 32 bits words.
+            data += bytes(-len(data) % DTYPE.itemsize)
+            print(uttid, self.offset, nframes, dim, self.compression,
+                  file=self._index)
+        self._data.write(data)
+        self.offset += len(data) // DTYPE.itemsize
+
+    def close(self):
+        self._data.close()
+        self._index.close()
@@ -0,0 +1,172 @@
+'''Read the features of Kaldi binary archives.
+
+The features are read directly from the "ark" files through the
+offsets of the "scp" files (``<uttid> <ark>:<offset>``) without any
+conversion. Both float matrices (``FM``, ``DM``) and compressed
+matrices (``CM``, ``CM2``, ``CM3``, see :any:`beer.cli.compression`)
+are supported. As in Kaldi, the relative paths of the "scp" file are
+relative to the current working directory.
+
+'''
+
+from collections import OrderedDict
+import numpy as np
+
+from .compression import compressed_size, decompress
+
+
+__all__ = ['KaldiArchive', 'is_kaldi_archive']
+
+
+_BINARY_MARKER = b'\0B'
+_FLOAT_MATRICES = {b'FM ': np.dtype('<f4'), b'DM ': np.dtype('<f8')}
+
+
+def is_kaldi_archive(path):
+    'Return True if "path" is a Kaldi "scp" or "ark" file.'
+    return path.endswith('.scp') or path.endswith('.ark')
+
+
+def _read_int32(buffer, offset):
+    # Integers are stored as: <size (1 byte)> <value>.
+    if buffer[offset] != 4:
+        raise ValueError('Expected a 32 bits integer')
+    return int(np.frombuffer(buffer, dtype='<i4', count=1,
+                             offset=offset + 1)[0]), offset + 5
+
+
+def _read_float_matrix(buffer, offset, dtype):
+    nrows, offset = _read_int32(buffer, offset)
+    ncols, offset = _read_int32(buffer, offset)
+    data = np.frombuffer(buffer, dtype=dtype, count=nrows * ncols,
+                         offset=offset).reshape(nrows, ncols)
+    return data, offset + nrows * ncols * dtype.itemsize
+
+
+def _check_binary(buffer, offset):
+    if bytes(buffer[offset: offset + 2]) != _BINARY_MARKER:
+        raise ValueError('Only binary Kaldi archives are supported')
+    return offset + 2
+
+
+def matrix_end(buffer, offset):
+    '''End of a matrix stored in Kaldi binary format. Only the header of
+    the matrix is read (the compressed matrices are not decompressed).
+
+    Args:
+        buffer (bytes-like): Content of the "ark" file.
+        offset (int): Start of the matrix (binary marker "\0B").
+
+    Returns:
+        int: End of the matrix in the buffer.
+
+    '''
+    offset = _check_binary(buffer, offset)
+    for token, dtype in _FLOAT_MATRICES.items():
+        if bytes(buffer[offset: offset + len(token)]) == token:
+            nrows, offset = _read_int32(buffer, offset + len(token))
+            ncols, offset = _read_int32(buffer, offset)
+            return offset + nrows * ncols * dtype.itemsize
+    return offset + compressed_size(buffer, offset)
+
+
+def read_matrix(buffer, offset):
+    '''Read a matrix stored in Kaldi binary format.
+
+    Args:
+        buffer (bytes-like): Content of the "ark" file.
+        offset (int): Start of the matrix (binary marker "\\0B").
+
+    Returns:
+        numpy.ndarray: The float32 matrix.
+        int: End of the matrix in the buffer.
+
+    '''
+    offset = _check_binary(buffer, offset)
+    for token, dtype in _FLOAT_MATRICES.items():
+        if bytes(buffer[offset: offset + len(token)]) == token:
+            data, end = _read_float_matrix(buffer, offset + len(token),
+                                           dtype)
+            # The float32 matrices are returned without copy.
+            return data.astype(np.float32, copy=False), end
+    end = offset + compressed_size(buffer, offset)
+    return decompress(buffer, offset), end
+
+
+class KaldiArchive:
+    '''Read-only access to the features of a Kaldi archive.
+
+    Args:
+        path (str): Path to a "scp" or to an "ark" file.
+
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self._arks = {}
+        self.index = OrderedDict()
+        if path.endswith('.scp'):
+            with open(path, 'r') as f:
+                for line in f:
+                    tokens = line.strip().split(None, 1)
+                    if not tokens:
+                        continue
+                    uttid, rxfilename = tokens
+                    self.index[uttid] = self._parse_rxfilename(rxfilename)
+        else:
+            buffer = self._ark(path)
+            offset = 0
+            while offset < len(buffer):
+                end = bytes(buffer[offset: offset + 1024]).index(b' ')
+                uttid = bytes(buffer[offset: offset + end]).decode('utf-8')
+                offset += end + 1
+                self.index[uttid] = (path, offset)
+                # The matrices are decoded on access only.
+                offset = matrix_end(buffer, offset)
+
+    @staticmethod
+    def _parse_rxfilename(rxfilename):
+        if rxfilename.endswith('|'):
+            raise ValueError(f'Commands are not supported: {rxfilename}')
+        path, _, offset = rxfilename.rpartition(':')
+        if not path or not offset.isdigit():
+            return rxfilename, None
+        return path, int(offset)
+
+    def _ark(self, path):
+        if path not in self._arks:
+            # Copy-on-write mapping: the (float) features can be wrapped
+            # into a tensor without copy.
+            self._arks[path] = np.memmap(path, dtype=np.uint8, mode='c')
+        return self._arks[path]
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_arks'] = {}
+        return state
+
+    @property
+    def files(self):
+        'Utterance ids (same attribute as the "npz" archive).'
+        return list(self.index.keys())
+
+    def keys(self):
+        return self.index.keys()
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, uttid):
+        return uttid in self.index
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __getitem__(self, uttid):
+        path, offset = self.index[uttid]
+        buffer = self._ark(path)
+        if offset is None:
+            # Single matrix file ("<uttid> <path>" in the scp).
+            offset = 0
+        data, _ = read_matrix(buffer, offset)
+        return data
@@ -0,0 +1,98 @@
+'''Archive of lattices.
+
+The lattices (see :any:`beer.lattice.Lattice`) of all the utterances
+are stored in a single "npz" archive: each array of the lattice of an
+utterance is stored as ``<uttid>.<name>.npy``. The mapping between the
+units and their first pdf ("start_pdf" of the phone-loop) is stored
+(as JSON) in the comment of the archive so the lattices can be
+rescored without the model.
+
+'''
+
+import json
+from zipfile import ZipFile
+import numpy as np
+
+from ..lattice import Lattice
+
+
+__all__ = ['LatticeArchive', 'LatticeWriter', 'load_lattices']
+
+
+class LatticeWriter:
+    '''Write the lattices of the utterances into an archive.
+
+    Args:
+        path (str): Path to the archive.
+        start_pdf (dict): Mapping unit/start pdf of the model.
+
+    '''
+
+    def __init__(self, path, start_pdf=None):
+        self.path = path
+        self.meta = {'start_pdf': start_pdf}
+        self._archive = ZipFile(path, 'w', allowZip64=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def add(self, uttid, lattice):
+        'Add the lattice (:any:`Lattice`) of an utterance.'
+        for name in Lattice.arrays:
+            with self._archive.open(f'{uttid}.{name}.npy', 'w',
+                                    force_zip64=True) as f:
+                np.lib.format.write_array(f, getattr(lattice, name),
+                                          allow_pickle=False)
+
+    def close(self):
+        self._archive.comment = json.dumps(self.meta).encode('utf-8')
+        self._archive.close()
+
+
+class LatticeArchive:
+    '''Read-only access to an archive of lattices.
+
+    Args:
+        path (str): Path to the archive.
+
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self._archive = np.load(path)
+        with ZipFile(path, 'r') as f:
+            self.meta = json.loads(f.comment.decode('utf-8'))
+        self.start_pdf = self.meta['start_pdf']
+        suffix = '.' + Lattice.arrays[0]
+        self._keys = [name[:-len(suffix)] for name in self._archive.files
+                      if name.endswith(suffix)]
+
+    @property
+    def files(self):
+        return list(self._keys)
+
+    def keys(self):
+        return list(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, uttid):
+        return uttid in self._keys
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __getitem__(self, uttid):
+        if uttid not in self._keys:
+            raise KeyError(uttid)
+        return Lattice(**{name: self._archive[f'{uttid}.{name}']
+                          for name in Lattice.arrays})
+
+
+def load_lattices(path):
+    'Load an archive of lattices (see :any:`LatticeArchive`).'
+    return LatticeArchive(path)
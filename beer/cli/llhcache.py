@@ -0,0 +1,121 @@
+'''Cache of the emission log-likelihoods.
+
+The per-frame log-likelihood of all the emissions (pdfs) of a model is
+stored for each utterance under a key computed from the features and
+the parameters of the emissions (the "version" of the emissions). The
+decoding graph, the acoustic scale or the unigram weights of the
+phone-loop do not change the key so the log-likelihoods are computed
+only once for all the decoding or training runs with the same
+emissions.
+
+'''
+
+import hashlib
+import os
+import uuid
+import numpy as np
+import torch
+
+
+__all__ = ['LogLikelihoodCache', 'emission_version']
+
+
+def _update(key, tensor):
+    array = np.ascontiguousarray(tensor.detach().cpu().numpy())
+    key.update(f'{array.dtype}{array.shape}'.encode('utf-8'))
+    key.update(array.tobytes())
+
+
+def emission_version(modelset):
+    '''Version of the parameters of a set of emissions: a hash of the
+    posterior of its Bayesian parameters and of its standard
+    parameters.
+
+    Args:
+        modelset (:any:`BayesianModelSet`): Emissions.
+
+    Returns:
+        str
+
+    '''
+    key = hashlib.sha256(type(modelset).__name__.encode('utf-8'))
+    for param in modelset.bayesian_parameters():
+        _update(key, param.posterior.natural_parameters())
+    for param in modelset.parameters():
+        _update(key, param)
+    return key.hexdigest()
+
+
+class LogLikelihoodCache:
+    '''Directory of cached emission log-likelihoods.
+
+    Args:
+        cachedir (str): Cache directory (created if needed).
+        model (:any:`HMM`): HMM based model.
+
+    '''
+
+    def __init__(self, cachedir, model):
+        self.cachedir = cachedir
+        self.model = model
+        self.version = emission_version(model.modelset)
+        os.makedirs(cachedir, exist_ok=True)
+
+    def key(self, features, scale=1.):
+        '''Key of the log-likelihoods of the features (``numpy.ndarray``
+        or ``torch.Tensor``) whose sufficient statistics are scaled by
+        "scale".'''
+        key = hashlib.sha256(self.version.encode('utf-8'))
+        key.update(f'scale:{float(scale)!r}'.encode('utf-8'))
+        _update(key, torch.as_tensor(features))
+        return key.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cachedir, key[:2], key + '.npy')
+
+    def __contains__(self, key):
+        return os.path.isfile(self._path(key))
+
+    def __getitem__(self, key):
+        return np.load(self._path(key))
+
+    def __setitem__(self, key, llhs):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write then rename so that a crash or a concurrent job never
+        # leaves a truncated entry.
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.save(f, llhs)
+        os.replace(tmp_path, path)
+
+    def pdf_llhs(self, features, scale=1.):
+        '''Log-likelihood of each frame for all the pdfs of the model
+        (computed and stored if not already in the cache).
+
+        Args:
+            features (``torch.Tensor[N, D]``): Features.
+            scale (float): Scaling factor of the sufficient statistics
+                (see :any:`HMM.posteriors`).
+
+        Returns:
+            ``torch.Tensor[N, npdfs]``
+
+        '''
+        key = self.key(features, scale)
+        if key in self:
+            return torch.from_numpy(self[key]).to(features.dtype)
+        with torch.no_grad():
+            stats = self.model.sufficient_statistics(features)
+            llhs = self.model.modelset.expected_log_likelihood(scale * stats)
+        self[key] = llhs.numpy()
+        return llhs
+
+    def pc_llhs(self, features, graph, scale=1.):
+        '''Log-likelihood of each frame and state of a graph (same as
+        ``HMM._pc_llhs``).'''
+        llhs = self.pdf_llhs(features, scale)
+        if graph.pdf_id_mapping is None:
+            return llhs
+        return llhs[:, graph.pdf_id_mapping]
@@ -0,0 +1,139 @@
+'''In-memory cache of the objects read and written by the commands.
+
+The commands read and write their models, graphs and data sets with
+:any:`load_object` and :any:`save_object`. By default, these functions
+simply read and write the files. When several commands run in the same
+process (see "beer run"), an :any:`ObjectCache` is activated and the
+saved objects are kept in memory: the next commands get them without
+reading the disk and they are written to disk only if the cache is
+set to "persist" them. The objects read from disk are also kept so a
+file used by several commands is loaded only once.
+
+The cache stores and returns copies of the objects: a command can
+modify the object it has loaded (or continue to modify the object it
+has saved) without changing the cached one.
+
+'''
+
+from contextlib import contextmanager
+import copy
+import os
+import pickle
+import uuid
+
+from .. import serialization
+
+
+__all__ = ['ObjectCache', 'activate', 'load_object', 'save_object']
+
+
+def _write(obj, path, pickled):
+    # Write then rename so that a crash never leaves a truncated file.
+    tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    if pickled:
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(obj, f)
+    else:
+        serialization.save(obj, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _stat(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class ObjectCache:
+    '''Objects indexed by the path of their file.
+
+    Attributes:
+        persist (boolean): Write the saved objects to disk as well.
+
+    '''
+
+    def __init__(self):
+        self.persist = False
+        # Path -> (object, state of the file when the object was read
+        # or written, None if the object is only in memory).
+        self._objects = {}
+
+    def __contains__(self, path):
+        return os.path.abspath(path) in self._objects
+
+    def __len__(self):
+        return len(self._objects)
+
+    def clear(self):
+        self._objects = {}
+
+    def load(self, path):
+        key = os.path.abspath(path)
+        if key in self._objects:
+            obj, state = self._objects[key]
+            # The file is read again if it has been modified since.
+            if state is None or (os.path.isfile(path)
+                                 and _stat(path) == state):
+                return copy.deepcopy(obj)
+        obj = serialization.load(path)
+        self._objects[key] = (obj, _stat(path))
+        return copy.deepcopy(obj)
+
+    def save(self, obj, path, pickled=False):
+        key = os.path.abspath(path)
+        state = None
+        if self.persist:
+            _write(obj, path, pickled)
+            state = _stat(path)
+        self._objects[key] = (copy.deepcopy(obj), state)
+
+
+# Cache used by "load_object" and "save_object" (None: no cache).
+_active_cache = None
+
+
+@contextmanager
+def activate(cache):
+    '''Use a cache for the objects loaded and saved in the context.
+
+    Args:
+        cache (:any:`ObjectCache`): Cache to use.
+
+    '''
+    global _active_cache
+    previous, _active_cache = _active_cache, cache
+    try:
+        yield cache
+    finally:
+        _active_cache = previous
+
+
+def load_object(path):
+    '''Load an object saved with :any:`save_object` (or a pickle).
+
+    Args:
+        path (str): Path to the file.
+
+    Returns:
+        The object.
+
+    '''
+    if _active_cache is not None:
+        return _active_cache.load(path)
+    return serialization.load(path)
+
+
+def save_object(obj, path, pickled=False):
+    '''Save an object (a model, a graph, ...).
+
+    Args:
+        obj (object): Object to save.
+        path (str): Path to the file.
+        pickled (boolean): Save the object with :any:`pickle` rather
+            than with :any:`beer.serialization.save` (for the files read
+            by other tools).
+
+    '''
+    if _active_cache is not None:
+        _active_cache.save(obj, path, pickled)
+    else:
+        _write(obj, path, pickled)
@@ -0,0 +1,67 @@
+'''Process a stream of items with a pool of workers.
+
+The items are consumed from the input iterable (the "loader" stage),
+processed by a pool of worker processes and the results are returned
+in the order of the input (the "writer" stage). The number of items
+being processed is bounded so the memory stays constant whatever the
+length of the stream.
+
+'''
+
+from collections import deque
+import multiprocessing
+
+import torch
+
+
+__all__ = ['ordered_map']
+
+
+def _init_worker(initializer, initargs):
+    # Each worker uses a single thread, the parallelism comes from the
+    # number of workers.
+    torch.set_num_threads(1)
+    if initializer is not None:
+        initializer(*initargs)
+
+
+def ordered_map(func, items, nj=1, max_pending=None, initializer=None,
+                initargs=()):
+    '''Apply a function to a stream of items in parallel.
+
+    Args:
+        func (function): Function to apply (has to be picklable, i.e.
+            defined at the top level of a module).
+        items (iterable): Input stream.
+        nj (int): Number of worker processes. If 1, the items are
+            processed in the current process.
+        max_pending (int): Maximum number of items being processed
+            (default: 2 x nj).
+        initializer (function): Called by each worker when it starts
+            (for instance to set the model as a global variable).
+        initargs (tuple): Arguments of the initializer.
+
+    Yields:
+        The results in the order of the input stream.
+
+    '''
+    if nj <= 1:
+        if initializer is not None:
+            initializer(*initargs)
+        yield from map(func, items)
+        return
+
+    max_pending = max_pending or 2 * nj
+    pool = multiprocessing.Pool(nj, initializer=_init_worker,
+                                initargs=(initializer, initargs))
+    try:
+        pending = deque()
+        for item in items:
+            pending.append(pool.apply_async(func, (item,)))
+            if len(pending) >= max_pending:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+        pool.close()
+    finally:
+        pool.terminate()
@@ -0,0 +1,217 @@
+'''Archive of posteriors.
+
+The posteriors of all the utterances are stored in a single (indexed)
+"npz" archive with one of the following encodings:
+  * "float32"/"float16": dense matrix (nframes x dim) stored as
+    ``<uttid>.npy``,
+  * "topk": the k largest posteriors of each frame stored as two
+    (nframes x k) matrices ``<uttid>.indices.npy`` and
+    ``<uttid>.values.npy``,
+  * "threshold": the posteriors greater than a threshold stored in
+    compressed sparse row format: ``<uttid>.indptr.npy``,
+    ``<uttid>.indices.npy`` and ``<uttid>.values.npy``.
+The encoding and the dimension of the posteriors are stored (as JSON)
+in the comment of the archive. The dense encodings can still be read
+directly with ``numpy.load``.
+
+'''
+
+import json
+import shutil
+from zipfile import ZipFile
+import numpy as np
+
+
+__all__ = ['ENCODINGS', 'PosteriorsArchive', 'PosteriorsWriter',
+           'load_posteriors', 'merge_posteriors']
+
+
+ENCODINGS = ['float32', 'float16', 'topk', 'threshold']
+
+
+# Floor of the posteriors in the log domain.
+EPS = 1e-5
+
+
+def _indices_dtype(dim):
+    return np.uint16 if dim <= np.iinfo(np.uint16).max + 1 else np.int32
+
+
+class PosteriorsWriter:
+    '''Write the posteriors of the utterances into an archive.
+
+    Args:
+        path (str): Path to the archive.
+        encoding (str): One of :any:`ENCODINGS`.
+        topk (int): Number of posteriors per frame ("topk").
+        threshold (float): Minimum value of the posteriors stored
+            ("threshold").
+        log (boolean): Return the posteriors in the log domain when
+            reading the archive.
+        units (list): Name of the dimensions of the posteriors (e.g.
+            the phones).
+
+    '''
+
+    def __init__(self, path, encoding='float32', topk=10, threshold=1e-3,
+                 log=False, units=None):
+        if encoding not in ENCODINGS:
+            raise ValueError(f'Unknown encoding: {encoding}')
+        self.path = path
+        self.meta = {'encoding': encoding, 'log': log, 'units': units,
+                     'dim': None}
+        self.topk = topk
+        self.threshold = threshold
+        self._archive = ZipFile(path, 'w', allowZip64=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _write(self, name, array):
+        with self._archive.open(name + '.npy', 'w', force_zip64=True) as f:
+            np.lib.format.write_array(f, np.ascontiguousarray(array),
+                                      allow_pickle=False)
+
+    def add(self, uttid, posts):
+        '''Add the posteriors (probabilities) of an utterance.
+
+        Args:
+            uttid (str): Utterance id.
+            posts (numpy.ndarray): Posteriors (nframes x dim).
+
+        '''
+        nframes, dim = posts.shape
+        self.meta['dim'] = dim
+        encoding = self.meta['encoding']
+        idx_dtype = _indices_dtype(dim)
+        if encoding in ('float32', 'float16'):
+            if self.meta['log']:
+                posts = np.log(EPS + posts)
+            self._write(uttid, posts.astype(encoding))
+        elif encoding == 'topk':
+            k = min(self.topk, dim)
+            indices = np.argpartition(-posts, k - 1, axis=1)[:, :k]
+            values = np.take_along_axis(posts, indices, axis=1)
+            self._write(uttid + '.indices', indices.astype(idx_dtype))
+            self._write(uttid + '.values', values.astype(np.float32))
+        else:
+            mask = posts >= self.threshold
+            indptr = np.r_[0, np.cumsum(mask.sum(axis=1))]
+            self._write(uttid + '.indptr', indptr.astype(np.int64))
+            self._write(uttid + '.indices',
+                        np.nonzero(mask)[1].astype(idx_dtype))
+            self._write(uttid + '.values', posts[mask].astype(np.float32))
+
+    def close(self):
+        self._archive.comment = json.dumps(self.meta).encode('utf-8')
+        self._archive.close()
+
+
+class PosteriorsArchive:
+    '''Read-only access to an archive of posteriors. The posteriors are
+    returned as dense float32 matrices.
+
+    Args:
+        path (str): Path to the archive.
+
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self._archive = np.load(path)
+        with ZipFile(path, 'r') as f:
+            comment = f.comment.decode('utf-8')
+        if comment:
+            self.meta = json.loads(comment)
+        else:
+            # Archive of dense posteriors created from "npy" files.
+            self.meta = {'encoding': 'float32', 'log': False, 'units': None,
+                         'dim': None}
+        self.encoding = self.meta['encoding']
+        self.units = self.meta['units']
+        suffix = {'topk': '.values', 'threshold': '.indptr'}.get(self.encoding)
+        if suffix is None:
+            self._keys = list(self._archive.files)
+        else:
+            self._keys = [name[:-len(suffix)] for name in self._archive.files
+                          if name.endswith(suffix)]
+
+    @property
+    def files(self):
+        return list(self._keys)
+
+    def keys(self):
+        return list(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, uttid):
+        return uttid in self._keys
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __getitem__(self, uttid):
+        if self.encoding in ('float32', 'float16'):
+            return self._archive[uttid].astype(np.float32)
+
+        if uttid not in self._keys:
+            raise KeyError(uttid)
+        indices = self._archive[uttid + '.indices'].astype(np.intp)
+        values = self._archive[uttid + '.values']
+        if self.encoding == 'topk':
+            nframes = len(indices)
+            rows = np.arange(nframes)[:, None]
+        else:
+            indptr = self._archive[uttid + '.indptr']
+            nframes = len(indptr) - 1
+            rows = np.repeat(np.arange(nframes), np.diff(indptr))
+        posts = np.zeros((nframes, self.meta['dim']), dtype=np.float32)
+        posts[rows, indices] = values
+        if self.meta['log']:
+            posts = np.log(EPS + posts)
+        return posts
+
+
+def load_posteriors(path):
+    'Load an archive of posteriors (see :any:`PosteriorsArchive`).'
+    return PosteriorsArchive(path)
+
+
+def merge_posteriors(paths, path):
+    '''Merge archives of posteriors (e.g. computed by parallel jobs)
+    into a single archive. The posteriors are copied as is, without
+    being decoded.
+
+    Args:
+        paths (list): Archives to merge. They must have the same
+            encoding and the same dimension.
+        path (str): Path of the merged archive.
+
+    '''
+    meta = None
+    names = set()
+    with ZipFile(path, 'w', allowZip64=True) as archive:
+        for part in paths:
+            part_meta = load_posteriors(part).meta
+            # The dimension of an empty archive (e.g. a job without any
+            # utterance) is unknown.
+            if meta is None or meta['dim'] is None:
+                meta = part_meta
+            elif part_meta['dim'] is not None and part_meta != meta:
+                raise ValueError(f'Incompatible archive of posteriors: {part}')
+            with ZipFile(part, 'r') as f:
+                for name in f.namelist():
+                    if name in names:
+                        raise ValueError(f'Duplicate entry "{name}" in: '
+                                         f'{part}')
+                    names.add(name)
+                    with f.open(name, 'r') as src, \
+                            archive.open(name, 'w', force_zip64=True) as dst:
+                        shutil.copyfileobj(src, dst)
+        if meta is not None:
+            archive.comment = json.dumps(meta).encode('utf-8')
@@ -0,0 +1,277 @@
+'''Serve requests over a Unix domain socket and process them by batch.
+
+A message (request or response) is made of a header, one line of
+JSON, optionally followed by a numpy array in the "npy" format. When
+the array is present, the header has a "nbytes" field giving the size
+(in bytes) of the serialized array. For instance, a request to decode
+the features of an utterance is::
+
+    {"cmd": "decode", "nbytes": 12928}\\n<npy data>
+
+A client can send several requests over the same connection, the
+requests of a connection are processed one after another. The
+requests of all the connections are gathered into batches: the server
+waits for at most ``batch_wait`` seconds after the first request of a
+batch to collect up to ``max_batch`` requests. An error is reported by
+a response with an "error" field.
+
+'''
+
+import asyncio
+import io
+import json
+import os
+import socket
+import threading
+
+import numpy as np
+
+
+__all__ = ['BatchingServer', 'Client', 'read_message', 'write_message']
+
+
+def _dump_message(header, array=None):
+    data = b''
+    if array is not None:
+        buffer = io.BytesIO()
+        np.lib.format.write_array(buffer, np.asarray(array),
+                                  allow_pickle=False)
+        data = buffer.getvalue()
+        header = {**header, 'nbytes': len(data)}
+    return json.dumps(header).encode() + b'\n' + data
+
+
+def _load_array(data):
+    return np.lib.format.read_array(io.BytesIO(data), allow_pickle=False)
+
+
+async def read_message(reader):
+    '''Read a message from a stream.
+
+    Args:
+        reader (``asyncio.StreamReader``): Input stream.
+
+    Returns:
+        (dict, numpy.ndarray): The header and the array (None if the
+        message has no array) or None at the end of the stream.
+
+    '''
+    line = await reader.readline()
+    if not line:
+        return None
+    header = json.loads(line)
+    array = None
+    if 'nbytes' in header:
+        array = _load_array(await reader.readexactly(header.pop('nbytes')))
+    return header, array
+
+
+async def write_message(writer, header, array=None):
+    '''Write a message to a stream.
+
+    Args:
+        writer (``asyncio.StreamWriter``): Output stream.
+        header (dict): Header of the message (JSON serializable).
+        array (numpy.ndarray): Optional array.
+
+    '''
+    writer.write(_dump_message(header, array))
+    await writer.drain()
+
+
+class BatchingServer:
+    '''Server gathering the requests of its clients into batches.
+
+    Args:
+        path (str): Path of the Unix domain socket.
+        process_batch (function): Process a list of requests. A
+            request is a tuple (header, array) and the function
+            returns the list of the corresponding responses (same
+            format). It is called in a separate thread so the server
+            keeps on receiving the requests meanwhile.
+        max_batch (int): Maximum number of requests per batch.
+        batch_wait (float): Maximum time (in seconds) to wait for
+            more requests before to process a batch.
+
+    Example:
+        >>> server = BatchingServer('/tmp/beer.sock', process_batch)
+        >>> server.serve_forever()
+
+    '''
+
+    def __init__(self, path, process_batch, max_batch=16, batch_wait=.01):
+        self.path = path
+        self.process_batch = process_batch
+        self.max_batch = max_batch
+        self.batch_wait = batch_wait
+        self.ready = threading.Event()
+        self._loop = None
+        self._stop = None
+        self._queue = None
+
+    async def _handle_connection(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    request = await read_message(reader)
+                except (ValueError, asyncio.IncompleteReadError) as err:
+                    await write_message(writer, {'error': str(err)})
+                    break
+                if request is None:
+                    break
+                response = loop.create_future()
+                await self._queue.put((request, response))
+                await write_message(writer, *(await response))
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _next_batch(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.batch_wait
+        while len(batch) < self.max_batch:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(),
+                                                    timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _process_batches(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            requests = [request for request, _ in batch]
+            try:
+                responses = await loop.run_in_executor(
+                    None, self.process_batch, requests)
+            except Exception as err:
+                responses = [({'error': str(err)}, None)] * len(batch)
+            for (_, future), response in zip(batch, responses):
+                if not future.done():
+                    future.set_result(response)
+
+    async def serve(self):
+        'Serve the requests until :any:`shutdown` is called.'
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        self._queue = asyncio.Queue()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        server = await asyncio.start_unix_server(self._handle_connection,
+                                                 path=self.path)
+        batcher = asyncio.ensure_future(self._process_batches())
+        self.ready.set()
+        try:
+            await self._stop.wait()
+        finally:
+            batcher.cancel()
+            server.close()
+            await server.wait_closed()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self.ready.clear()
+
+    def serve_forever(self):
+        'Serve the requests in the current thread (blocking).'
+        asyncio.run(self.serve())
+
+    def shutdown(self):
+        'Stop the server (can be called from any thread).'
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+
+
+class Client:
+    '''Client of a :any:`BatchingServer`.
+
+    Args:
+        path (str): Path of the Unix domain socket of the server.
+
+    Example:
+        >>> with Client('/tmp/beer.sock') as client:
+        ...     phones = client.decode(features)
+
+    '''
+
+    def __init__(self, path):
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.connect(path)
+        self._file = self._sock.makefile('rwb')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self._file.close()
+        self._sock.close()
+
+    def request(self, header, array=None):
+        '''Send a request and wait for the response.
+
+        Args:
+            header (dict): Header of the request.
+            array (numpy.ndarray): Optional array.
+
+        Returns:
+            (dict, numpy.ndarray): Header and array (or None) of the
+            response.
+
+        '''
+        self._file.write(_dump_message(header, array))
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError('connection closed by the server')
+        header = json.loads(line)
+        array = None
+        if 'nbytes' in header:
+            array = _load_array(self._file.read(header.pop('nbytes')))
+        if 'error' in header:
+            raise RuntimeError(header['error'])
+        return header, array
+
+    def decode(self, features=None, wav=None, per_frame=False):
+        '''Most likely sequence of phones of an utterance.
+
+        Args:
+            features (numpy.ndarray): Features of the utterance.
+            wav (str): Path to the wav file of the utterance (on the
+                server side) if the features are not provided.
+            per_frame (boolean): Phone of each frame.
+
+        Returns:
+            list of str
+
+        '''
+        header, _ = self.request({'cmd': 'decode', 'wav': wav,
+                                  'per_frame': per_frame}, features)
+        return header['phones']
+
+    def posteriors(self, features=None, wav=None, state=False, log=False):
+        '''Per-frame posteriors of an utterance.
+
+        Args:
+            features (numpy.ndarray): Features of the utterance.
+            wav (str): Path to the wav file of the utterance (on the
+                server side) if the features are not provided.
+            state (boolean): State level posteriors instead of the
+                phone level posteriors.
+            log (boolean): Log domain.
+
+        Returns:
+            numpy.ndarray[nframes, nunits]
+
+        '''
+        _, posts = self.request({'cmd': 'posteriors', 'wav': wav,
+                                 'state': state, 'log': log}, features)
+        return posts
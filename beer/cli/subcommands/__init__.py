@@ -2,7 +2,27 @@
 from . import dataset
 from . import features
 from . import hmm
+from . import run
 from . import shmm
 
-__all__ = ['dataset', 'features', 'hmm', 'shmm']
+__all__ = ['dataset', 'features', 'hmm', 'run', 'shmm']
 
+
+def add_subcommands(parser, exclude=()):
+    '''Add the commands (and the groups of commands) to the parser of
+    the "beer" command line tool.
+
+    Args:
+        parser (``argparse.ArgumentParser``): Parser.
+        exclude (list): Name of the commands not to add.
+
+    '''
+    subparsers = parser.add_subparsers(title='possible commands', metavar='<cmd>')
+    subparsers.required = True
+    for cmd_name in __all__:
+        if cmd_name in exclude:
+            continue
+        cmd = globals()[cmd_name]
+        subparser = subparsers.add_parser(cmd_name, help=cmd.__doc__)
+        cmd.setup(subparser)
+        subparser.set_defaults(func=cmd.main)
@@ -2,58 +2,109 @@
 'compile a data set with the given features'
 
 import argparse
+import multiprocessing
 import os
-import pickle
 
 import numpy as np
 import torch
 
 from ...dataset import Dataset
+from ...compression import METHODS
+from ...feastore import FeatureStoreWriter, load_features
+from ...objcache import save_object
 
 
-def accumulate(feature_file):
+def accumulate_stats(feature_file, keys):
+    '''Accumulate the sufficient statistics (sum, squared sum and
+    frame counts) of a subset of the utterances.'''
+    feats = load_features(feature_file)
+    tot_sum, tot_square_sum, tot_counts = 0., 0., 0
+    for k in keys:
+        utt_feats = feats[k].astype(np.float64)
+        nframes_per_utt = len(utt_feats)
+        per_square_sum = (utt_feats ** 2).sum(axis=0)
+        tot_sum += utt_feats.sum(axis=0)
+        tot_square_sum += per_square_sum
+        tot_counts += nframes_per_utt
+    return tot_sum, tot_square_sum, tot_counts
+
+
+def _accumulate_stats(job):
+    return accumulate_stats(*job)
+
+
+def accumulate(feature_file, nj=1):
     '''Compute global mean, variance, frame counts
     Argument:
-        feature_file(str): feature file(npz)
+        feature_file(str): feature file(npz, features store or Kaldi
+            scp/ark)
+        nj(int): number of parallel jobs
     Returns:
         mean: np array (float)
         var: np array (float)
         tot_counts(int): total frames in feature files
     '''
-    feats = np.load(feature_file)
-    keys = list(feats.keys())
-    dim = feats[keys[0]].shape[1]
-    tot_sum = np.zeros(dim)
-    tot_square_sum = np.zeros(dim)
-    tot_counts = 0
-    for k in keys:
-        nframes_per_utt = len(feats[k])
-        per_square_sum = (feats[k] ** 2).sum(axis=0)
-        tot_sum += feats[k].sum(axis=0)
-        tot_square_sum += per_square_sum
-        tot_counts += nframes_per_utt
+    keys = list(load_features(feature_file).keys())
+    if nj > 1:
+        jobs = [(feature_file, keys[i::nj]) for i in range(nj)]
+        with multiprocessing.Pool(nj) as pool:
+            stats = pool.map(_accumulate_stats, jobs)
+    else:
+        stats = [accumulate_stats(feature_file, keys)]
+    tot_sum = sum(stat[0] for stat in stats)
+    tot_square_sum = sum(stat[1] for stat in stats)
+    tot_counts = sum(stat[2] for stat in stats)
     mean = tot_sum / tot_counts
     var = tot_square_sum / tot_counts - mean ** 2
     return torch.from_numpy(mean).float(), torch.from_numpy(var).float(), \
            int(tot_counts)
 
 
+def create_store(feature_file, store, compression=None):
+    '''Copy the features of an archive into a (memory-mapped) features
+    store.
+    '''
+    feats = load_features(feature_file)
+    with FeatureStoreWriter(store, compression=compression) as writer:
+        for k in sorted(feats.keys()):
+            writer.add(k, feats[k])
+
+
 def setup(parser):
+    parser.add_argument('-c', '--compress', choices=list(METHODS.keys()),
+                        help='compress the features of the store '
+                             '(lossy)')
+    parser.add_argument('--nj', type=int, default=1,
+                        help='number of parallel jobs to compute the '
+                             'statistics (default: 1)')
+    parser.add_argument('-s', '--store',
+                        help='copy the features into a memory-mapped '
+                             'features store and use it for the dataset')
     parser.add_argument('datadir', help='data directory')
-    parser.add_argument('features', help='features archive (npz format)')
+    parser.add_argument('features', help='features archive (npz format, '
+                                         'features store or Kaldi scp/ark)')
     parser.add_argument('out', help='output compiled dataset')
 
 
 def main(args, logger):
     logger.debug('computing features statistics...')
-    mean, var, size = accumulate(args.features)
+    mean, var, size = accumulate(args.features, args.nj)
+
+    if args.compress and not args.store:
+        logger.error('compression requires a features store (--store)')
+        exit(1)
+
+    feapath = args.features
+    if args.store:
+        logger.debug(f'creating the features store: {args.store}')
+        create_store(args.features, args.store, args.compress)
+        feapath = args.store
 
     logger.debug('creating the dataset...')
-    dataset = Dataset(os.path.abspath(args.features), mean, var, size)
+    dataset = Dataset(os.path.abspath(feapath), mean, var, size)
 
     logger.debug('saving the dataset on disk...')
-    with open(args.out, 'wb') as f:
-        pickle.dump(dataset, f)
+    save_object(dataset, args.out, pickled=True)
 
     logger.info(f'created dataset with {len(dataset)} utterances '\
                 f'(total frame count: {dataset.size})')
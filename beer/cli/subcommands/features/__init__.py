@@ -1,23 +1,20 @@
 
 'features related command'
 
-from . import extract
-from . import archive
+from ...commands import add_commands
 
 
-cmds = [extract, archive]
+# Help message of the commands. The module of a command is imported
+# only when the command is run (see "beer.cli.commands").
+cmds = {
+    'extract': 'extract speech features from a list of wav files',
+    'archive': 'create an archive from a features directory',
+}
 
 
 def setup(parser):
-    subparsers = parser.add_subparsers(title='possible commands', metavar='<cmd>')
-    subparsers.required = True
-    for cmd in cmds:
-        cmd_name = cmd.__name__.split('.')[-1]
-        subparser = subparsers.add_parser(cmd_name, help=cmd.__doc__)
-        cmd.setup(subparser)
-        subparser.set_defaults(func=cmd.main)
+    add_commands(parser, __name__, cmds)
 
 
 def main(args, logger):
     pass
-
@@ -3,14 +3,18 @@
 
 import argparse
 import beer
-import io
+import multiprocessing
 import os
-import subprocess
 import sys
+from zipfile import ZipFile
 
 import yaml
 import numpy as np
-from scipy.io.wavfile import read
+
+from ...audio import load_wav, read_audio
+from ...compression import METHODS
+from ...feacache import FeatureCache
+from ...feastore import FeatureStoreWriter
 
 
 feaconf = {
@@ -33,13 +37,6 @@ feaconf = {
 }
 
 
-def compute_dct_bases(nfilters, n_dct_coeff):
-    dct_bases = np.zeros((nfilters, n_dct_coeff))
-    for m in range(n_dct_coeff):
-        dct_bases[:, m] = np.cos((m+1) * np.pi / nfilters * (np.arange(nfilters) + 0.5))
-    return dct_bases
-
-
 class ShowDefaultsAction(argparse.Action):
     def __init__(self, option_strings, dest, **kwargs):
         super().__init__(option_strings, dest, nargs=0, **kwargs)
@@ -48,20 +45,210 @@ class ShowDefaultsAction(argparse.Action):
         parser.exit()
 
 
+def extract_features(signal, conf, dct_bases):
+    '''Extract the features of a signal.
+
+    Args:
+        signal (numpy.ndarray): Raw audio signal.
+        conf (dict): Features configuration.
+        dct_bases (numpy.ndarray): DCT bases (see
+            :any:`compute_dct_bases`).
+
+    Returns:
+        numpy.ndarray[nframes, dim]
+
+    '''
+    # Mel spectrum.
+    melspec, fft_len = beer.features.short_term_mspec(
+        signal,
+        flen=conf['window_len'],
+        frate=conf['framerate'],
+        preemph=conf['preemph'],
+        srate=conf['srate'],
+    )
+
+    # Filter bank.
+    if conf['apply_fbank']:
+        fbank = beer.features.create_fbank(conf['nfilters'], fft_len,
+                                           lowfreq=conf['cutoff_lfreq'],
+                                           highfreq=conf['cutoff_hfreq'])
+        melspec = melspec @ fbank.T
+
+    # Take the logarithm of the magnitude spectrum.
+    log_melspec = np.log(1e-6 + melspec)
+
+    # HTK compatibility normalization (probably doesn't change
+    # the accuracy of the recognition).
+    norm = np.sqrt(2. / conf['nfilters'])
+
+    # DCT transform.
+    if conf['apply_dct']:
+        features = log_melspec @ dct_bases
+
+        features *= norm
+
+        # Liftering.
+        l_coeff = conf['lifter_coeff']
+        lifter = 1 + (l_coeff / 2) * np.sin(np.pi * \
+            (1 + np.arange(conf['n_dct_coeff'])) / l_coeff)
+        features *= lifter
+    else:
+        features = log_melspec
+
+    # Signal enery (per-frame).
+    if conf['add_energy']:
+        energy = log_melspec.sum(axis=-1) * norm
+        features = np.c_[energy, features]
+
+    # Deltas.
+    if conf['apply_deltas']:
+        delta_order = conf['delta_order']
+        delta_winlen = conf['delta_winlen']
+        features = beer.features.add_deltas(features,
+            tuple([delta_winlen] * delta_order))
+
+    # Mean normalization.
+    if conf['utt_mnorm']:
+        features -= features.mean(axis=0)[None, :]
+
+    return features
+
+
+# State of the worker processes (set by "init_worker").
+_worker_conf = None
+_worker_dct_bases = None
+_worker_dtype = None
+_worker_cache = None
+
+
+def init_worker(conf, dtype, cachedir=None):
+    global _worker_conf, _worker_dct_bases, _worker_dtype, _worker_cache
+    _worker_conf = conf
+    _worker_dct_bases = beer.features.compute_dct_bases(conf['nfilters'],
+                                                        conf['n_dct_coeff'])
+    _worker_dtype = dtype
+    _worker_cache = FeatureCache(cachedir, conf) if cachedir else None
+
+
+def process_utterance(entry):
+    '''Extract the features of an utterance given as a tuple
+    (uttid, source, key) (see :any:`read_audio`). If the source is None,
+    the features are loaded from the cache.'''
+    uttid, source, key = entry
+    if source is None:
+        return uttid, _worker_cache[key].astype(_worker_dtype)
+
+    sr, signal = load_wav(source)
+    if not sr == _worker_conf['srate']:
+        msg = 'Sampling rate ({}) does not match the one ' \
+              'of the given file ({}): {}'
+        raise ValueError(msg.format(_worker_conf['srate'], sr, uttid))
+    features = extract_features(signal, _worker_conf, _worker_dct_bases)
+    if _worker_cache is not None:
+        _worker_cache[key] = features
+    return uttid, features.astype(_worker_dtype)
+
+
+def parse_entries(lines, cache=None):
+    '''Parse the lines "<uttid> <wav file or command |>" of the wav
+    list. The audio of the utterances found in the cache is not read.'''
+    for line in lines:
+        tokens = line.strip().split()
+        if not tokens:
+            continue
+        uttid, inwav = tokens[0], ' '.join(tokens[1:])
+        key = None
+        if cache is not None:
+            key = cache.key(inwav)
+            if key in cache:
+                inwav = None
+        yield uttid, inwav, key
+
+
+class NpyWriter:
+    'Store the features of each utterance as a numpy file.'
+
+    def __init__(self, outdir):
+        self.outdir = outdir
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def add(self, uttid, features):
+        np.save(os.path.join(self.outdir, uttid), features)
+
+    def close(self):
+        pass
+
+
+class NpzWriter:
+    '''Store the features of the utterances in a single "npz" archive
+    (same format as the "archive" command).'''
+
+    def __init__(self, path):
+        self.path = path
+        self._archive = ZipFile(path, 'w', allowZip64=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def add(self, uttid, features):
+        with self._archive.open(uttid + '.npy', 'w', force_zip64=True) as f:
+            np.lib.format.write_array(f, features, allow_pickle=False)
+
+    def close(self):
+        self._archive.close()
+
+
+writers = {
+    'npy': NpyWriter,
+    'npz': NpzWriter,
+    'store': FeatureStoreWriter,
+}
+
+
 def setup(parser):
     parser.add_argument('--show-default-conf', action=ShowDefaultsAction,
                         help='show the default configuration and exit')
+    parser.add_argument('-c', '--cache',
+                        help='directory of the features cache: the '
+                             'features are extracted only for the audio '
+                             '(and configuration) not already in the cache')
+    parser.add_argument('--compress', choices=list(METHODS.keys()),
+                        help='compress the features (lossy), only for the '
+                             '"store" format')
+    parser.add_argument('--dtype', choices=['float32', 'float64'],
+                        default='float64',
+                        help='data type of the features (default: float64)')
+    parser.add_argument('-f', '--format', choices=list(writers.keys()),
+                        default='npy',
+                        help='output format: a numpy file per utterance '
+                             '(npy), a single archive (npz) or a '
+                             'memory-mapped features store (store) '
+                             '(default: npy)')
+    parser.add_argument('--nj', type=int, default=1,
+                        help='number of parallel jobs (default: 1)')
+    parser.add_argument('-p', '--max-pipes', type=int, default=4,
+                        help='maximum number of audio commands ("cmd |") '
+                             'running at the same time (default: 4)')
     parser.add_argument('feaconf', help='configuration file of the '
                                         'features')
     parser.add_argument('wav_list', help='list of WAV files or "-" for stdin')
-    parser.add_argument('outdir', help='output directory')
+    parser.add_argument('out', help='output directory (npy format) or '
+                                    'output file (npz/store format)')
 
 
 def main(args, logger):
 
     # Override the default configuration.
     with open(args.feaconf, 'r') as fid:
-        new_conf = yaml.load(fid)
+        new_conf = yaml.safe_load(fid)
 
     # Check for unknown options.
     for key in new_conf:
@@ -70,9 +257,9 @@ def main(args, logger):
             exit(1)
     feaconf.update(new_conf)
 
-    # Pre-compute the DCT bases.
-    dct_bases = compute_dct_bases(feaconf['nfilters'], feaconf['n_dct_coeff'])
-
+    if args.compress and args.format != 'store':
+        logger.error('compression is only supported by the "store" format')
+        exit(1)
 
     if args.wav_list == '-':
         infile = sys.stdin
@@ -80,101 +267,45 @@ def main(args, logger):
         with open(args.wav_list, 'r') as f:
             infile = f.readlines()
 
-    counts = 0
-    for line in infile:
-        tokens = line.strip().split()
-        uttid, inwav = tokens[0], ' '.join(tokens[1:])
-        logger.debug(f'processing utterance: {uttid}')
-
-        # If 'inwav' ends up with the '|' symbol, 'inwav' is
-        # interpreted as a command otherwise we assume 'inwav' to
-        # be a path to a wav file.
-        if inwav[-1] == '|':
-            cmd = inwav[:-1]
-            logger.debug(f'reading command: {cmd}')
-            proc = subprocess.run(cmd, shell=True,
-                                  stdout=subprocess.PIPE)
-            sr, signal = read(io.BytesIO(proc.stdout))
-        else:
-            logger.debug(f'reading file: {inwav}')
-            sr, signal = read(inwav)
-        if not sr == feaconf['srate']:
-            msg = 'Sampling rate ({}) does not match the one ' \
-                  'of the given file ({}).'
-            logger.error(msg.format(feaconf['srate'], sr))
-            exit(1)
+    # The audio commands run asynchronously, the features are extracted
+    # by the workers and stored by the main process in the order of the
+    # input list.
+    # The workers are forked before to start the audio commands: they
+    # would otherwise inherit the pipes of the commands being started.
+    cache = FeatureCache(args.cache, feaconf) if args.cache else None
+    if args.nj > 1:
+        logger.debug(f'extracting the features with {args.nj} jobs')
+        pool = multiprocessing.Pool(args.nj, initializer=init_worker,
+                                    initargs=(feaconf, args.dtype, args.cache))
+    else:
+        pool = None
+        init_worker(feaconf, args.dtype, args.cache)
+    entries = read_audio(parse_entries(infile, cache),
+                         max_pipes=args.max_pipes)
+    if pool is not None:
+        results = pool.imap(process_utterance, entries)
+    else:
+        results = map(process_utterance, entries)
 
-        # Mel spectrum.
-        logger.debug('extracting STFT')
-        melspec, fft_len = beer.features.short_term_mspec(
-            signal,
-            flen=feaconf['window_len'],
-            frate=feaconf['framerate'],
-            preemph=feaconf['preemph'],
-            srate=feaconf['srate'],
-        )
-
-        # Filter bank.
-        if feaconf['apply_fbank']:
-            logger.debug(f'applying filter bank (F={feaconf["nfilters"]})')
-            fbank = beer.features.create_fbank(feaconf['nfilters'], fft_len,
-                                               lowfreq=feaconf['cutoff_lfreq'],
-                                               highfreq=feaconf['cutoff_hfreq'])
-            melspec = melspec @ fbank.T
-
-        # Take the logarithm of the magnitude spectrum.
-        logger.debug('log of the STFT')
-        log_melspec = np.log(1e-6 + melspec)
-
-        # HTK compatibility normalization (probably doesn't change
-        # the accuracy of the recognition).
-        norm = np.sqrt(2. / feaconf['nfilters'])
-
-        # DCT transform.
-        if feaconf['apply_dct']:
-            logger.debug('cosine transform of the log STFT')
-            features = log_melspec @ dct_bases
-
-            features *= norm
-
-            # Liftering.
-            logger.debug('cepstrum liftering')
-            l_coeff = feaconf['lifter_coeff']
-            lifter = 1 + (l_coeff / 2) * np.sin(np.pi * \
-                (1 + np.arange(feaconf['n_dct_coeff'])) / l_coeff)
-            features *= lifter
-        else:
-            features = log_melspec
-
-        # Signal enery (per-frame).
-        if feaconf['add_energy']:
-            logger.debug('add the energy to the features')
-            energy = log_melspec.sum(axis=-1) * norm
-            features = np.c_[energy, features]
-
-        # Deltas.
-        if feaconf['apply_deltas']:
-            logger.debug('concatenating derivatives')
-            delta_order = feaconf['delta_order']
-            delta_winlen = feaconf['delta_winlen']
-            features = beer.features.add_deltas(features,
-                tuple([delta_winlen] * delta_order))
-
-        # Mean normalization.
-        if feaconf['utt_mnorm']:
-            logger.debug('utterance mean normalization')
-            features -= features.mean(axis=0)[None, :]
-
-        # Store the features as a numpy file.
-        path = os.path.join(args.outdir, uttid)
-        logger.debug(f'saving features to: {path}')
-        np.save(path, features)
-
-        counts += 1
+    counts = 0
+    try:
+        kwargs = {'compression': args.compress} if args.compress else {}
+        with writers[args.format](args.out, **kwargs) as writer:
+            for uttid, features in results:
+                logger.debug(f'saving features of utterance: {uttid}')
+                writer.add(uttid, features)
+                counts += 1
+    except ValueError as err:
+        logger.error(str(err))
+        exit(1)
+    finally:
+        # Stop the audio commands still running (on error).
+        entries.close()
+        if pool is not None:
+            pool.terminate()
 
     logger.info(f'extracted features for {counts} file(s)')
 
 
 if __name__ == '__main__':
     main()
-
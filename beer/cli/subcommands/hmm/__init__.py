@@ -1,33 +1,45 @@
 'Hidden Markov Model (HMM)'
 
-from . import accumulate
-from . import decode
-from . import mkaligraph
-from . import mkdecodegraph
-from . import mkphoneloop
-from . import mkphoneloopgraph
-from . import mkphones
-from . import optimizer
-from . import posteriors
-from . import phonelist
-from . import train
-from . import update
+from ...commands import add_commands
 
 
-cmds = [accumulate, decode, mkaligraph, mkdecodegraph, mkphoneloop,
-        mkphoneloopgraph, mkphones, optimizer, posteriors,
-        phonelist, train, update]
+# Help message of the commands. The module of a command is imported
+# only when the command is run (see "beer.cli.commands").
+cmds = {
+    'accumulate':
+        'Accumulate the ELBO from a list of utterances given from '
+        '"stdin"',
+    'decode': 'print the most likely path of all the utterances of a dataset',
+    'mkaligraph':
+        'create the alignment graph for the HMM training from a '
+        'transcription (stdin)',
+    'mkdecodegraph': 'combine a set of HMMs with a phone-loop graph',
+    'mkphoneloop': 'create a phone-loop model',
+    'mkphoneloopgraph': 'create a phone-loop graph',
+    'mkphones': 'create a set of left-to-right HMM representing "phones"',
+    'online':
+        'update a HMM based model online from a stream of utterances '
+        '(stdin)',
+    'posteriors':
+        'print the most likely path of all the utterances of a dataset',
+    'phonelist': "print the list of phones from a set of phones' HMM",
+    'rescore':
+        'print the most likely path of the lattices of a set of '
+        'utterances',
+    'score': 'score (log-likelihood or ELBO) of the utterances of a dataset',
+    'serve': 'serve decoding requests over a Unix domain socket',
+    'train':
+        'train a HMM based model on a single machine (alternative to '
+        '"accumulate" and "update" commands)',
+    'update':
+        'Update the parameters of the model given the set of ELBO '
+        'loaded from stdin',
+}
+
 
 def setup(parser):
-    subparsers = parser.add_subparsers(title='possible commands', metavar='<cmd>')
-    subparsers.required = True
-    for cmd in cmds:
-        cmd_name = cmd.__name__.split('.')[-1]
-        subparser = subparsers.add_parser(cmd_name, help=cmd.__doc__)
-        cmd.setup(subparser)
-        subparser.set_defaults(func=cmd.main)
+    add_commands(parser, __name__, cmds)
 
 
 def main(args, logger):
     pass
-
@@ -2,6 +2,7 @@
 'Accumulate the ELBO from a list of utterances given from "stdin"'
 
 import argparse
+import os
 import pickle
 import sys
 
@@ -9,10 +10,15 @@ import numpy as np
 
 import beer
 
+from ...objcache import load_object
+
 
 def setup(parser):
     parser.add_argument('-a', '--alis', help='alignment graphs in a "npz" '
                                              'archive')
+    parser.add_argument('-p', '--prefetch', type=int, default=4,
+                        help='number of utterances loaded in advance in a '
+                             'background thread (default: 4)')
     parser.add_argument('-s', '--acoustic-scale', default=1., type=float,
                         help='scaling factor of the acoutsic model')
     parser.add_argument('model', help='hmm based model')
@@ -22,12 +28,10 @@ def setup(parser):
 
 def main(args, logger):
     logger.debug('load the model')
-    with open(args.model, 'rb') as f:
-        model = pickle.load(f)
+    model = load_object(args.model)
 
     logger.debug('load the dataset')
-    with open(args.dataset, 'rb') as f:
-        dataset = pickle.load(f)
+    dataset = load_object(args.dataset)
 
     alis = None
     if args.alis:
@@ -36,26 +40,29 @@ def main(args, logger):
 
     elbo = beer.evidence_lower_bound(datasize=dataset.size)
     count = 0
-    for line in sys.stdin:
-        uttid = line.strip().split()[0]
-        utt = dataset[uttid]
-
+    uttids = (line.strip().split()[0] for line in sys.stdin if line.strip())
+    for utt in dataset.utterances(uttids=uttids, prefetch=args.prefetch):
         aligraph = None
         if alis:
             try:
-                aligraph = alis[uttid][0]
+                aligraph = alis[utt.id][0]
             except KeyError:
-                logger.warning(f'no alignment graph for utterance "{uttid}"')
+                logger.warning(f'no alignment graph for utterance "{utt.id}"')
         logger.debug(f'processing utterance: {utt.id}')
         elbo += beer.evidence_lower_bound(model, utt.features,
                                           inference_graph=aligraph,
                                           datasize=dataset.size,
-                                          scale=args.acoustic_scale)
+                                          scale=args.acoustic_scale,
+                                          no_grad=True)
         count += 1
 
+    # The ELBO is written under a temporary name first so that the
+    # "update" command never loads a partially written file.
     logger.debug('saving the accumulated ELBO...')
-    with open(args.out, 'wb') as f:
+    tmp_path = args.out + '.tmp'
+    with open(tmp_path, 'wb') as f:
         pickle.dump((elbo, count), f)
+    os.replace(tmp_path, args.out)
 
     logger.info(f'accumulated ELBO over {count} utterances: {float(elbo) / (count * dataset.size) :.3f}.')
 
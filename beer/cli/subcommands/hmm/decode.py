@@ -4,18 +4,41 @@
 import argparse
 import bisect
 from itertools import groupby
-import pickle
 import sys
 
 import numpy as np
+import torch
 import beer
+from beer.lattice import Lattice
+
+from ...lattices import LatticeWriter
+from ...llhcache import LogLikelihoodCache
+from ...objcache import load_object
+from ...pipeline import ordered_map
 
 
 def setup(parser):
     parser.add_argument('-a', '--alis', help='alignment graphs in a "npz" '
                                              'archive')
+    parser.add_argument('-l', '--lattices',
+                        help='store the state lattices in the given archive '
+                             '(see "hmm rescore")')
+    parser.add_argument('-b', '--lattice-beam', type=float, default=10.,
+                        help='pruning beam of the lattices (default: 10)')
+    parser.add_argument('-c', '--llh-cache',
+                        help='directory of the emission log-likelihoods '
+                             'cache: the log-likelihoods are computed only '
+                             'once for a given set of emissions')
+    parser.add_argument('-n', '--nbest', type=int, default=0,
+                        help='output the N best transcriptions with their '
+                             'acoustic and graph scores')
+    parser.add_argument('--nj', type=int, default=1,
+                        help='number of parallel jobs (default: 1)')
     parser.add_argument('--per-frame', action='store_true',
                         help='output the per-frame transcription')
+    parser.add_argument('-p', '--prefetch', type=int, default=4,
+                        help='number of utterances loaded in advance in a '
+                             'background thread (default: 4)')
     parser.add_argument('-s', '--acoustic-scale', default=1., type=float,
                         help='scaling factor of the acoustic model')
     parser.add_argument('-u', '--utts',
@@ -39,14 +62,76 @@ def state2phone(path, start_pdf, per_frame):
         previous_state = state
     return phones
 
+def unit_labels(lattice, start_pdf):
+    'Unit of the lattice states corresponding to the start of a unit.'
+    pdf2sym = {value: key for key, value in start_pdf.items()}
+    return {int(state): pdf2sym[int(pdf_id)]
+            for state, pdf_id in zip(lattice.states, lattice.pdf_ids)
+            if int(pdf_id) in pdf2sym}
+
+
+def print_nbest(uttid, nbest):
+    for rank, (phones, acoustic, graph) in enumerate(nbest, start=1):
+        print(f'{uttid}-{rank} {acoustic:.3f} {graph:.3f}', ' '.join(phones))
+
+
+# Model and options of the worker processes (set by "init_worker").
+_worker_model = None
+_worker_args = None
+_worker_cache = None
+
+
+def init_worker(model, args):
+    global _worker_model, _worker_args, _worker_cache
+    _worker_model = model
+    _worker_args = args
+    _worker_cache = None
+    if args.llh_cache:
+        _worker_cache = LogLikelihoodCache(args.llh_cache, model)
+
+
+def utterance_llhs(utt, graph):
+    'Log-likelihood per frame and state (of the graph) of an utterance.'
+    if _worker_cache is not None:
+        return _worker_cache.pc_llhs(utt.features, graph)
+    with torch.no_grad():
+        stats = _worker_model.sufficient_statistics(utt.features)
+        return _worker_model._pc_llhs(stats, graph)
+
+
+def decode_utterance(job):
+    utt, aligraph = job
+    args = _worker_args
+    start_pdf = _worker_model.start_pdf
+    graph = aligraph if aligraph is not None else _worker_model.graph
+    llhs = utterance_llhs(utt, graph)
+    if not args.lattices and not args.nbest:
+        # Same as "HMM.decode".
+        path_ids = [graph.pdf_id_mapping[int(state)]
+                    for state in graph.best_path(args.acoustic_scale * llhs)]
+        return utt.id, state2phone(path_ids, start_pdf, args.per_frame), \
+               None, None
+
+    # The best path is searched in the lattice (the result is the
+    # same as above).
+    lattice = Lattice.from_llhs(graph, llhs, beam=args.lattice_beam,
+                                acoustic_scale=args.acoustic_scale)
+    path, _, _ = lattice.best_path(acoustic_scale=args.acoustic_scale)
+    phones = state2phone(lattice.pdf_ids[path].tolist(), start_pdf,
+                         args.per_frame)
+    nbest = None
+    if args.nbest:
+        nbest = lattice.nbest(args.nbest, acoustic_scale=args.acoustic_scale,
+                              labels=unit_labels(lattice, start_pdf))
+    return utt.id, phones, lattice if args.lattices else None, nbest
+
+
 def main(args, logger):
     logger.debug('load the model')
-    with open(args.model, 'rb') as f:
-        model = pickle.load(f)
+    model = load_object(args.model)
 
     logger.debug('load the dataset')
-    with open(args.dataset, 'rb') as f:
-        dataset = pickle.load(f)
+    dataset = load_object(args.dataset)
 
     alis = None
     if args.alis:
@@ -62,27 +147,37 @@ def main(args, logger):
     else:
         utts = list([utt.id for utt in dataset.utterances(random_order=False)])
 
+    def jobs():
+        for utt in dataset.utterances(uttids=utts, prefetch=args.prefetch):
+            aligraph = None
+            if alis:
+                try:
+                    aligraph = alis[utt.id][0]
+                except KeyError:
+                    logger.warning(f'no alignment graph for utterance "{utt.id}"')
+            logger.debug(f'processing utterance: {utt.id}')
+            yield utt, aligraph
+
+    writer = None
+    if args.lattices:
+        writer = LatticeWriter(args.lattices, start_pdf=model.start_pdf)
+
+    # The results are printed in the order of the utterances.
     count = 0
-    for uttname in utts:
-        utt = dataset[uttname]
-
-        aligraph = None
-        if alis:
-            try:
-                aligraph = alis[utt.id][0]
-            except KeyError:
-                logger.warning(f'no alignment graph for utterance "{utt.id}"')
-
-        logger.debug(f'processing utterance: {utt.id}')
-        path_ids = [
-            int(unit)
-            for unit in model.decode(utt.features, inference_graph=aligraph,
-                                     scale=args.acoustic_scale)
-        ]
-        phones = state2phone(path_ids, model.start_pdf, args.per_frame)
-        print(utt.id, ' '.join(phones))
+    for uttid, phones, lattice, nbest in ordered_map(
+            decode_utterance, jobs(), nj=args.nj, initializer=init_worker,
+            initargs=(model, args)):
+        if nbest is not None:
+            print_nbest(uttid, nbest)
+        else:
+            print(uttid, ' '.join(phones))
+        if writer is not None:
+            writer.add(uttid, lattice)
         count += 1
 
+    if writer is not None:
+        writer.close()
+
     logger.info(f'successfully decoded {count} utterances.')
 
 
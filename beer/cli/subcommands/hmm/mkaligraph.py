@@ -1,13 +1,14 @@
 'create the alignment graph for the HMM training from a transcription (stdin)'
 
 import argparse
-import pickle
 import os
 import sys
 
 import numpy as np
 import beer
 
+from ...objcache import load_object
+
 
 def setup(parser):
     parser.add_argument('hmms', help='hmm graph for each unit')
@@ -42,8 +43,7 @@ def create_graph_from_seq(seq, phone_graphs):
 def main(args, logger):
 
     logger.debug('loading the hmms')
-    with open(args.hmms, 'rb') as fid:
-        hmm_graphs, _ = pickle.load(fid)
+    hmm_graphs, _ = load_object(args.hmms)
 
     nutts = 0
     for line in sys.stdin:
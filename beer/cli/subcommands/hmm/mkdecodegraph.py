@@ -2,11 +2,12 @@
 'combine a set of HMMs with a phone-loop graph'
 
 import argparse
-import pickle
 import sys
 
 import beer
 
+from ...objcache import load_object, save_object
+
 
 def get_first_emitting_state_pdf(graph):
     state_ids = [pdf_id for pdf_id, _ in
@@ -34,12 +35,10 @@ def setup(parser):
 
 def main(args, logger):
     logger.debug('loading the phone loop graph...')
-    with open(args.phoneloop, 'rb') as f:
-        graph = pickle.load(f)
+    graph = load_object(args.phoneloop)
 
     logger.debug('loading the phones \' hmms...')
-    with open(args.hmms, 'rb') as f:
-        units, emissions = pickle.load(f)
+    units, emissions = load_object(args.hmms)
 
     logger.debug('build the mapping phone -> state from the symbol table')
     phone2state = {phone: state for state, phone in graph.symbols.items()}
@@ -59,8 +58,7 @@ def main(args, logger):
         end_pdf[phone] = get_last_emitting_state_pdf(hmm)
 
     logger.debug('saving the decoding graph on disk...')
-    with open(args.out, 'wb') as f:
-        pickle.dump((graph, start_pdf, end_pdf), f)
+    save_object((graph, start_pdf, end_pdf), args.out, pickled=True)
 
     logger.info('created decoding graph. ' \
                 f'# states: {len(list(graph.states()))} ' \
@@ -2,11 +2,12 @@
 'create a phone-loop model'
 
 import argparse
-import pickle
 import sys
 
 import beer
 
+from ...objcache import load_object, save_object
+
 
 def setup(parser):
     parser.add_argument('decode_graph', help='decoding graph')
@@ -16,12 +17,10 @@ def setup(parser):
 
 def main(args, logger):
     logger.debug('load the decoding graph...')
-    with open(args.decode_graph, 'rb') as f:
-        graph, start_pdf, end_pdf = pickle.load(f)
+    graph, start_pdf, end_pdf = load_object(args.decode_graph)
 
     logger.debug('load the hmms...')
-    with open(args.hmms, 'rb') as f:
-        hmms, emissions = pickle.load(f)
+    hmms, emissions = load_object(args.hmms)
 
     logger.debug('compiling the graph...')
     cgraph = graph.compile()
@@ -30,8 +29,7 @@ def main(args, logger):
     ploop = beer.PhoneLoop.create(cgraph, start_pdf, end_pdf, emissions)
 
     logger.debug('saving the model on disk...')
-    with open(args.out, 'wb') as f:
-        pickle.dump(ploop, f)
+    save_object(ploop, args.out)
 
     logger.info('successfully created a phone-loop model with ' \
                 f'{len(start_pdf)} phones')
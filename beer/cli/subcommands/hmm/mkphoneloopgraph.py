@@ -2,11 +2,12 @@
 'create a phone-loop graph'
 
 import argparse
-import pickle
 import sys
 
 import beer
 
+from ...objcache import save_object
+
 START_SYM = '\<s\>'
 END_SYM = '\</s\>'
 PIVOT_SYM = '#1'
@@ -77,8 +78,7 @@ def main(args, logger):
     graph.normalize()
 
     logger.debug('saving the graph on disk...')
-    with open(args.out, 'wb') as f:
-        pickle.dump(graph, f)
+    save_object(graph, args.out, pickled=True)
 
     logger.info('created phone-loop graph. ' \
                 f'# states: {len(list(graph.states()))} ' \
@@ -2,13 +2,14 @@
 
 import argparse
 from collections import defaultdict
-import pickle
 
 import torch
 import yaml
 
 import beer
 
+from ...objcache import load_object, save_object
+
 
 def parse_topology(topology):
     state_ids = set()
@@ -92,8 +93,7 @@ def main(args, logger):
     else:
         logger.debug(f'using "{args.dataset}" dataset for ' \
                      'initialization')
-        with open(args.dataset, 'rb') as f:
-            dataset = pickle.load(f)
+        dataset = load_object(args.dataset)
         mean, var = dataset.mean, dataset.var
 
     start_pdf_id = 0
@@ -113,8 +113,7 @@ def main(args, logger):
     emissions = beer.JointModelSet(pdfs)
 
     logger.debug('saving the HMMs on disk...')
-    with open(args.out, 'wb') as f:
-        pickle.dump((units, emissions), f)
+    save_object((units, emissions), args.out, pickled=True)
 
     logger.info(f'created {len(units)} HMMs for a total of {len(emissions)}' \
                 f' emitting states')
@@ -0,0 +1,102 @@
+
+'update a HMM based model online from a stream of utterances (stdin)'
+
+import argparse
+import os
+import sys
+
+import torch
+import beer
+
+from ...objcache import load_object, save_object
+
+
+def setup(parser):
+    parser.add_argument('-b', '--batch-size', type=int, default=1,
+                        help='number of utterances per update (default: 1)')
+    parser.add_argument('-c', '--checkpoint-rate', type=int, default=100,
+                        help='save the model every N updates (default: 100)')
+    parser.add_argument('--datasize', type=int,
+                        help='total number of frames the model represents '
+                             '(default: size of the dataset)')
+    parser.add_argument('--delay', type=float, default=1.,
+                        help='delay of the Robbins-Monro learning rate '
+                             'schedule (default: 1.)')
+    parser.add_argument('--forgetting-rate', type=float, default=.51,
+                        help='forgetting rate of the Robbins-Monro '
+                             'learning rate schedule (default: .51)')
+    parser.add_argument('-o', '--optim-state', help='optimizer state')
+    parser.add_argument('--prior-steps', type=int,
+                        help='number of updates the model is considered '
+                             'to have had before (required without an '
+                             'existing optimizer state, 0 for a new model)')
+    parser.add_argument('-s', '--acoustic-scale', default=1., type=float,
+                        help='scaling factor of the acoustic model')
+    parser.add_argument('model', help='hmm based model')
+    parser.add_argument('dataset', help='data set')
+    parser.add_argument('out', help='updated model')
+
+
+def save_checkpoint(model, trainer, args, logger):
+    logger.debug(f'saving the model to: {args.out}')
+    save_object(model, args.out)
+
+    if args.optim_state:
+        logger.debug(f'saving the optimizer state to: {args.optim_state}')
+        torch.save(trainer.state_dict(), args.optim_state)
+
+
+def main(args, logger):
+    logger.debug('load the model')
+    model = load_object(args.model)
+
+    logger.debug('load the dataset')
+    dataset = load_object(args.dataset)
+
+    datasize = args.datasize if args.datasize else dataset.size
+    trainer = beer.OnlineVBTrainer(model, datasize,
+                                   batch_size=args.batch_size,
+                                   delay=args.delay,
+                                   forgetting_rate=args.forgetting_rate)
+
+    if args.optim_state and os.path.isfile(args.optim_state):
+        logger.debug(f'loading optimizer state from: {args.optim_state}')
+        trainer.load_state_dict(torch.load(args.optim_state))
+    elif args.prior_steps is None:
+        # Starting the schedule at 0 on a trained model would replace
+        # its statistics with the ones of the first minibatch.
+        logger.error('no optimizer state to resume the learning rate '
+                     'schedule from, set the number of updates already '
+                     'done on the model with --prior-steps (0 for a new '
+                     'model)')
+        exit(1)
+    if args.prior_steps is not None:
+        trainer.prior_steps = args.prior_steps
+
+    nutts = 0
+    def stream():
+        nonlocal nutts
+        for line in sys.stdin:
+            uttid = line.strip().split()[0]
+            logger.debug(f'processing utterance: {uttid}')
+            nutts += 1
+            yield dataset[uttid].features
+
+    nupdates = 0
+    for elbo in trainer.train(stream(), scale=args.acoustic_scale,
+                              no_grad=True):
+        nupdates += 1
+        elbo_value = float(elbo) / (nutts * datasize)
+        logger.info(f'{"update=" + str(trainer.update_count):<20} '
+                    f'{"lrate=" + str(round(trainer.optim.lrate, 3)):<20} '
+                    f'{"ELBO=" + str(round(elbo_value, 3)):<20}')
+        nutts = 0
+        if nupdates % args.checkpoint_rate == 0:
+            save_checkpoint(model, trainer, args, logger)
+
+    save_checkpoint(model, trainer, args, logger)
+    logger.info(f'updated the model {nupdates} times')
+
+
+if __name__ == "__main__":
+    main()
@@ -2,10 +2,11 @@
 'print the list of phones from a set of phones\' HMM'
 
 import argparse
-import pickle
 
 from natsort import natsorted
 
+from ...objcache import load_object
+
 
 def setup(parser):
     parser.add_argument('hmms', help='phones\' hmms')
@@ -13,8 +14,7 @@ def setup(parser):
 
 def main(args, logger):
     logger.debug('loading the HMMs...')
-    with open(args.hmms, 'rb') as f:
-        units, _ = pickle.load(f)
+    units, _ = load_object(args.hmms)
 
     for key in natsorted(units.keys(), key=lambda x: x.lower()):
         print(key)
@@ -3,46 +3,115 @@
 
 import argparse
 import os
-import pickle
 import sys
 
 import numpy as np
+import torch
 import beer
 
-
-EPS = 1e-5
+from ...llhcache import LogLikelihoodCache
+from ...objcache import load_object
+from ...pipeline import ordered_map
+from ...posteriors import ENCODINGS, EPS, PosteriorsWriter
 
 
 def setup(parser):
+    parser.add_argument('-e', '--encoding', choices=['npy'] + ENCODINGS,
+                        default='npy',
+                        help='output a numpy file per utterance (npy) or a '
+                             'single archive of dense (float32, float16) or '
+                             'sparse (topk, threshold) posteriors '
+                             '(default: npy)')
+    parser.add_argument('-c', '--llh-cache',
+                        help='directory of the emission log-likelihoods '
+                             'cache: the log-likelihoods are computed only '
+                             'once for a given set of emissions')
+    parser.add_argument('-k', '--topk', type=int, default=10,
+                        help='number of posteriors per frame for the "topk" '
+                             'encoding (default: 10)')
+    parser.add_argument('-t', '--threshold', type=float, default=1e-3,
+                        help='minimum posterior for the "threshold" encoding '
+                             '(default: 1e-3)')
+    parser.add_argument('--nj', type=int, default=1,
+                        help='number of parallel jobs (default: 1)')
     parser.add_argument('-S', '--state', action='store_true',
                         help='state level posteriors')
     parser.add_argument('-l', '--log', action='store_true',
                         help='log domain')
+    parser.add_argument('-p', '--prefetch', type=int, default=4,
+                        help='number of utterances loaded in advance in a '
+                             'background thread (default: 4)')
     parser.add_argument('-s', '--acoustic-scale', default=1., type=float,
                         help='scaling factor of the acoustic model')
     parser.add_argument('-u', '--utts',
                         help='decode the given utterances ("-") for stdin')
     parser.add_argument('model', help='hmm based model')
     parser.add_argument('dataset', help='training data set')
-    parser.add_argument('outdir', help='output directory')
+    parser.add_argument('out', help='output directory ("npy" encoding) or '
+                                    'output archive')
 
 
-def state2phone(posts, start_pdf, end_pdf):
-    retval = np.zeros((len(posts), len(start_pdf)))
+def pdf2unit_mapping(start_pdf, end_pdf, npdfs):
+    '''Index of the unit of each pdf. The pdfs which do not belong to
+    any unit are mapped to an extra unit (i.e. len(start_pdf)).'''
+    mapping = torch.full((npdfs,), len(start_pdf), dtype=torch.long)
     for i, unit in enumerate(start_pdf):
-        start, end = start_pdf[unit], end_pdf[unit]
-        retval[:, i] = posts[:, start:end].sum(axis=-1)
-    return retval
+        mapping[start_pdf[unit]:end_pdf[unit]] = i
+    return mapping
+
+
+def state2phone(posts, pdf2unit, nunits):
+    retval = torch.zeros(len(posts), nunits + 1, dtype=posts.dtype)
+    retval.index_add_(1, pdf2unit, posts)
+    return retval[:, :-1]
+
+
+# Model and options of the worker processes (set by "init_worker").
+_worker_model = None
+_worker_args = None
+_worker_pdf2unit = None
+_worker_cache = None
+
+
+def init_worker(model, args):
+    global _worker_model, _worker_args, _worker_pdf2unit, _worker_cache
+    _worker_model = model
+    _worker_args = args
+    _worker_pdf2unit = None
+    _worker_cache = None
+    if args.llh_cache:
+        _worker_cache = LogLikelihoodCache(args.llh_cache, model)
+
+
+def utterance_posteriors(utt):
+    global _worker_pdf2unit
+    if _worker_cache is not None:
+        # Same as "HMM.posteriors" (the acoustic scale is applied to
+        # the statistics).
+        graph = _worker_model.graph
+        llhs = _worker_cache.pc_llhs(utt.features, graph,
+                                     scale=_worker_args.acoustic_scale)
+        posts = graph.posteriors(llhs)
+    else:
+        posts = _worker_model.posteriors(utt.features,
+                                         scale=_worker_args.acoustic_scale)
+    posts = posts.detach()
+    if not _worker_args.state:
+        start_pdf = _worker_model.start_pdf
+        if _worker_pdf2unit is None:
+            _worker_pdf2unit = pdf2unit_mapping(start_pdf,
+                                                _worker_model.end_pdf,
+                                                posts.shape[1])
+        posts = state2phone(posts, _worker_pdf2unit, len(start_pdf))
+    return utt.id, posts.numpy()
 
 
 def main(args, logger):
     logger.debug('load the model')
-    with open(args.model, 'rb') as f:
-        model = pickle.load(f)
+    model = load_object(args.model)
 
     logger.debug('load the dataset')
-    with open(args.dataset, 'rb') as f:
-        dataset = pickle.load(f)
+    dataset = load_object(args.dataset)
 
     if args.utts:
         if args.utts == '-':
@@ -53,24 +122,35 @@ def main(args, logger):
     else:
         utts = list([utt.id for utt in dataset.utterances(random_order=False)])
 
-    count = 0
     for uttname in utts:
-        try:
-            utt = dataset[uttname]
-        except KeyError as err:
+        if uttname not in dataset:
             logger.warning(f'no data for utterance {uttname}')
-            continue
-        logger.debug(f'processing utterance: {utt.id}')
-        posts = model.posteriors(utt.features, scale=args.acoustic_scale)
-        posts = posts.detach().numpy()
-        if not args.state:
-            posts = state2phone(posts, model.start_pdf, model.end_pdf)
-        if args.log:
-            posts = np.log(EPS + posts)
-        path = os.path.join(args.outdir, f'{uttname}.npy')
-        np.save(path, posts)
+    utts = [uttname for uttname in utts if uttname in dataset]
+
+    writer = None
+    if args.encoding != 'npy':
+        units = None if args.state else list(model.start_pdf)
+        writer = PosteriorsWriter(args.out, encoding=args.encoding,
+                                  topk=args.topk, threshold=args.threshold,
+                                  log=args.log, units=units)
+
+    count = 0
+    utterances = dataset.utterances(uttids=utts, prefetch=args.prefetch)
+    for uttid, posts in ordered_map(utterance_posteriors, utterances,
+                                    nj=args.nj, initializer=init_worker,
+                                    initargs=(model, args)):
+        logger.debug(f'saving the posteriors of utterance: {uttid}')
+        if writer is not None:
+            writer.add(uttid, posts)
+        else:
+            if args.log:
+                posts = np.log(EPS + posts)
+            np.save(os.path.join(args.out, f'{uttid}.npy'), posts)
         count += 1
 
+    if writer is not None:
+        writer.close()
+
     logger.info(f'successfully computed the posteriors for {count} utterances.')
 
 
@@ -0,0 +1,83 @@
+
+'print the most likely path of the lattices of a set of utterances'
+
+import argparse
+import sys
+
+import beer
+
+from ...lattices import load_lattices
+from ...objcache import load_object
+from .decode import print_nbest, state2phone, unit_labels
+
+
+def setup(parser):
+    parser.add_argument('-g', '--graph-scale', default=1., type=float,
+                        help='scaling factor of the graph scores '
+                             '(default: 1)')
+    parser.add_argument('-m', '--model',
+                        help='replace the graph scores with the ones of the '
+                             'graph of the given model (for instance, with '
+                             'other unigram weights)')
+    parser.add_argument('-n', '--nbest', type=int, default=0,
+                        help='output the N best transcriptions with their '
+                             'acoustic and graph scores')
+    parser.add_argument('--per-frame', action='store_true',
+                        help='output the per-frame transcription')
+    parser.add_argument('-s', '--acoustic-scale', default=1., type=float,
+                        help='scaling factor of the acoustic model')
+    parser.add_argument('-u', '--utts',
+                        help='rescore the given utterances ("-") for stdin')
+    parser.add_argument('lattices', help='lattices archive (see the '
+                                         '"--lattices" option of "decode")')
+
+
+def main(args, logger):
+    logger.debug('load the lattices')
+    lattices = load_lattices(args.lattices)
+    start_pdf = lattices.start_pdf
+
+    graph = None
+    if args.model:
+        logger.debug('load the model')
+        model = load_object(args.model)
+        graph = model.graph
+        start_pdf = model.start_pdf
+
+    if args.utts:
+        if args.utts == '-':
+            utts = [line.strip().split()[0] for line in sys.stdin.readlines()]
+        else:
+            with open(args.utts, 'r') as f:
+                utts = [line.strip().split()[0] for line in f.readlines()]
+    else:
+        utts = lattices.keys()
+
+    count = 0
+    for uttid in utts:
+        if uttid not in lattices:
+            logger.warning(f'no lattice for utterance "{uttid}"')
+            continue
+        logger.debug(f'processing utterance: {uttid}')
+        lattice = lattices[uttid]
+        if graph is not None:
+            lattice = lattice.rescore_graph(graph)
+        if args.nbest:
+            nbest = lattice.nbest(args.nbest,
+                                  acoustic_scale=args.acoustic_scale,
+                                  graph_scale=args.graph_scale,
+                                  labels=unit_labels(lattice, start_pdf))
+            print_nbest(uttid, nbest)
+        else:
+            path, _, _ = lattice.best_path(acoustic_scale=args.acoustic_scale,
+                                           graph_scale=args.graph_scale)
+            phones = state2phone(lattice.pdf_ids[path].tolist(), start_pdf,
+                                 args.per_frame)
+            print(uttid, ' '.join(phones))
+        count += 1
+
+    logger.info(f'successfully rescored {count} lattices.')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+
+'score (log-likelihood or ELBO) of the utterances of a dataset'
+
+import argparse
+import sys
+
+import numpy as np
+import torch
+import beer
+
+from ...objcache import load_object
+from ...pipeline import ordered_map
+
+
+def setup(parser):
+    parser.add_argument('-a', '--alis', help='alignment graphs in a "npz" '
+                                             'archive')
+    parser.add_argument('-e', '--elbo', action='store_true',
+                        help='score with the ELBO (expected log-likelihood '
+                             'along the best path minus the KL divergence '
+                             'of the parameters) instead of the '
+                             'log-likelihood')
+    parser.add_argument('--nj', type=int, default=1,
+                        help='number of parallel jobs (default: 1)')
+    parser.add_argument('-p', '--prefetch', type=int, default=4,
+                        help='number of utterances loaded in advance in a '
+                             'background thread (default: 4)')
+    parser.add_argument('-s', '--acoustic-scale', default=1., type=float,
+                        help='scaling factor of the acoustic model')
+    parser.add_argument('-u', '--utts',
+                        help='score the given utterances ("-") for stdin')
+    parser.add_argument('model', help='hmm based model')
+    parser.add_argument('dataset', help='data set')
+
+
+# Model and options of the worker processes (set by "init_worker").
+_worker_model = None
+_worker_args = None
+
+
+def init_worker(model, args):
+    global _worker_model, _worker_args
+    _worker_model = model
+    _worker_args = args
+
+
+def score_utterance(job):
+    utt, aligraph = job
+    args = _worker_args
+    if args.elbo:
+        score_fn = _worker_model.local_elbo
+    else:
+        score_fn = _worker_model.log_likelihood
+    with torch.no_grad():
+        score = score_fn(utt.features, inference_graph=aligraph,
+                         scale=args.acoustic_scale)
+    return utt.id, float(score), len(utt.features)
+
+
+def main(args, logger):
+    logger.debug('load the model')
+    model = load_object(args.model)
+
+    logger.debug('load the dataset')
+    dataset = load_object(args.dataset)
+
+    alis = None
+    if args.alis:
+        logger.debug('loading alignment graphs')
+        alis = np.load(args.alis)
+
+    if args.utts:
+        if args.utts == '-':
+            utts = [line.strip().split()[0] for line in sys.stdin.readlines()]
+        else:
+            with open(args.utts, 'r') as f:
+                utts = [line.strip().split()[0] for line in f.readlines()]
+    else:
+        utts = list([utt.id for utt in dataset.utterances(random_order=False)])
+
+    def jobs():
+        for utt in dataset.utterances(uttids=utts, prefetch=args.prefetch):
+            aligraph = None
+            if alis:
+                try:
+                    aligraph = alis[utt.id][0]
+                except KeyError:
+                    logger.warning(f'no alignment graph for utterance "{utt.id}"')
+            logger.debug(f'processing utterance: {utt.id}')
+            yield utt, aligraph
+
+    # Only the forward pass is computed: no backward pass and no
+    # accumulation of the statistics as in "hmm accumulate".
+    total, nframes, count = 0., 0, 0
+    for uttid, score, length in ordered_map(
+            score_utterance, jobs(), nj=args.nj, initializer=init_worker,
+            initargs=(model, args)):
+        print(f'{uttid} {score:.3f} {length}')
+        total += score
+        nframes += length
+        count += 1
+
+    if args.elbo:
+        with torch.no_grad():
+            total -= float(model.kl_div_posterior_prior().sum())
+
+    if count == 0:
+        logger.warning('no utterance scored')
+        return
+    name = 'ELBO' if args.elbo else 'log-likelihood'
+    logger.info(f'{name} over {count} utterances ({nframes} frames): '
+                f'{total:.3f} ({total / nframes:.3f} per frame).')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+
+'serve decoding requests over a Unix domain socket'
+
+import argparse
+import signal
+
+import numpy as np
+import torch
+import yaml
+import beer
+
+from ...audio import load_wav
+from ...objcache import load_object
+from ...posteriors import EPS
+from ...server import BatchingServer
+from ..features.extract import feaconf
+from .decode import state2phone
+from .posteriors import pdf2unit_mapping, state2phone as state2phone_posts
+
+
+def setup(parser):
+    parser.add_argument('-b', '--max-batch', type=int, default=16,
+                        help='maximum number of requests processed '
+                             'together (default: 16)')
+    parser.add_argument('-f', '--feaconf',
+                        help='configuration file of the features to '
+                             'extract from the wav files (default: '
+                             'configuration of "features extract")')
+    parser.add_argument('-s', '--acoustic-scale', default=1., type=float,
+                        help='scaling factor of the acoustic model')
+    parser.add_argument('-w', '--batch-wait', type=float, default=10.,
+                        help='maximum time (in ms) to wait for more '
+                             'requests before to process a batch '
+                             '(default: 10)')
+    parser.add_argument('model', help='hmm based model')
+    parser.add_argument('socket', help='path of the Unix domain socket')
+
+
+class BatchDecoder:
+    '''Process the "decode" and "posteriors" requests of a batch.
+
+    The features of the requests given as wav files are extracted
+    together and the emission log-likelihoods of all the frames of the
+    batch are computed at once, only the decoding itself is done per
+    utterance.
+
+    Args:
+        model (:any:`PhoneLoop`): Phone-loop model.
+        conf (dict): Features configuration (for the wav files).
+        scale (float): Scaling factor of the acoustic model.
+
+    '''
+
+    commands = ('decode', 'posteriors')
+
+    def __init__(self, model, conf, scale=1.):
+        self.model = model
+        self.conf = conf
+        self.scale = scale
+        self.dim = None
+        self._extractor = None
+        self._pdf2unit = None
+
+    @property
+    def extractor(self):
+        # The features extractor is created on demand as not all the
+        # clients send wav files.
+        if self._extractor is None:
+            self._extractor = beer.features.BatchFeatureExtractor(
+                **self.conf)
+        return self._extractor
+
+    def _wav_features(self, paths):
+        signals = []
+        for path in paths:
+            srate, samples = load_wav(path)
+            if srate != self.conf['srate']:
+                raise ValueError(f'Sampling rate ({self.conf["srate"]}) '
+                                 'does not match the one of the given file '
+                                 f'({srate}): {path}')
+            signals.append(samples)
+        features, lengths = self.extractor(signals)
+        return [feas[:length] for feas, length in zip(features, lengths)]
+
+    def check_features(self, features):
+        '''Check the shape of the features of a request before to batch
+        them with the others.'''
+        if features.dim() != 2 or len(features) == 0:
+            raise ValueError('expected a non-empty 2-D array of features '
+                             f'(frames x dim), got: {tuple(features.shape)}')
+        if self.dim is None:
+            # The dimension expected by the model is found out from the
+            # first valid request.
+            self._llhs(features[:1], [1], 'decode')
+            self.dim = features.shape[1]
+        elif features.shape[1] != self.dim:
+            raise ValueError(f'expected features of dimension {self.dim}, '
+                             f'got: {features.shape[1]}')
+
+    def features(self, requests):
+        '''Features of each request (or the exception raised when
+        loading them).'''
+        retval = [None] * len(requests)
+        wavs = []
+        for i, (header, array) in enumerate(requests):
+            if header.get('cmd') not in self.commands:
+                retval[i] = ValueError('unknown command: '
+                                       f'{header.get("cmd")}')
+            elif array is not None:
+                retval[i] = torch.from_numpy(array).float()
+            elif header.get('wav'):
+                wavs.append(i)
+            else:
+                retval[i] = ValueError('no features nor wav file')
+
+        # Extract the features of the wav files in one batch. If it
+        # fails, we extract them one by one to know which ones failed.
+        try:
+            all_features = self._wav_features([requests[i][0]['wav']
+                                               for i in wavs])
+            for i, features in zip(wavs, all_features):
+                retval[i] = features.float()
+        except Exception:
+            for i in wavs:
+                try:
+                    features, = self._wav_features([requests[i][0]['wav']])
+                    retval[i] = features.float()
+                except Exception as err:
+                    retval[i] = err
+
+        for i, features in enumerate(retval):
+            if not isinstance(features, Exception):
+                try:
+                    self.check_features(features)
+                except Exception as err:
+                    retval[i] = err
+        return retval
+
+    def _llhs(self, data, lengths, cmd):
+        # The acoustic scale is applied as in "HMM.decode" and
+        # "HMM.posteriors".
+        model = self.model
+        stats = model.sufficient_statistics(data)
+        if cmd == 'decode':
+            llhs = self.scale * model._pc_llhs(stats, model.graph)
+        else:
+            llhs = model._pc_llhs(self.scale * stats, model.graph)
+        return llhs.split(lengths)
+
+    def decode(self, header, llhs):
+        graph = self.model.graph
+        path = [graph.pdf_id_mapping[int(state)]
+                for state in graph.best_path(llhs)]
+        phones = state2phone(path, self.model.start_pdf,
+                             header.get('per_frame', False))
+        return {'phones': phones}, None
+
+    def posteriors(self, header, llhs):
+        posts = self.model.graph.posteriors(llhs).detach()
+        if not header.get('state', False):
+            start_pdf = self.model.start_pdf
+            if self._pdf2unit is None:
+                self._pdf2unit = pdf2unit_mapping(start_pdf,
+                                                  self.model.end_pdf,
+                                                  posts.shape[1])
+            posts = state2phone_posts(posts, self._pdf2unit, len(start_pdf))
+        posts = posts.numpy()
+        if header.get('log', False):
+            posts = np.log(EPS + posts)
+        return {}, posts
+
+    def __call__(self, requests):
+        features = self.features(requests)
+        responses = [({'error': str(feas)}, None)
+                     if isinstance(feas, Exception) else None
+                     for feas in features]
+        with torch.no_grad():
+            for cmd in self.commands:
+                idxs = [i for i, (header, _) in enumerate(requests)
+                        if responses[i] is None and header['cmd'] == cmd]
+                if not idxs:
+                    continue
+                data = torch.cat([features[i] for i in idxs])
+                lengths = [len(features[i]) for i in idxs]
+                all_llhs = self._llhs(data, lengths, cmd)
+                for i, llhs in zip(idxs, all_llhs):
+                    try:
+                        responses[i] = getattr(self, cmd)(requests[i][0],
+                                                          llhs)
+                    except Exception as err:
+                        responses[i] = ({'error': str(err)}, None)
+        return responses
+
+
+def main(args, logger):
+    logger.debug('load the model')
+    model = load_object(args.model)
+
+    conf = dict(feaconf)
+    if args.feaconf:
+        with open(args.feaconf, 'r') as fid:
+            new_conf = yaml.safe_load(fid)
+        for key in new_conf:
+            if key not in feaconf:
+                logger.error('Unknown setting "{}"'.format(key))
+                exit(1)
+        conf.update(new_conf)
+
+    decoder = BatchDecoder(model, conf, scale=args.acoustic_scale)
+    server = BatchingServer(args.socket, decoder, max_batch=args.max_batch,
+                            batch_wait=args.batch_wait / 1000)
+
+    def stop(signum, frame):
+        logger.debug('stopping the server')
+        server.shutdown()
+    signal.signal(signal.SIGTERM, stop)
+
+    logger.info(f'listening on: {args.socket}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    logger.info('server stopped')
+
+
+if __name__ == "__main__":
+    main()
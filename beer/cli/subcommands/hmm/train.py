@@ -2,59 +2,139 @@
 'train a HMM based model on a single machine (alternative to "accumulate" and "update" commands)'
 
 import argparse
-import pickle
 import sys
 
 import beer
 
+from ...llhcache import LogLikelihoodCache
+from ...objcache import load_object, save_object
+
 
 def setup(parser):
     parser.add_argument('-b', '--batch-size', type=int, default=-1,
                         help='batch size in number of utterance ' \
                              '(-1 means all the utterances as one batch)')
+    parser.add_argument('-c', '--llh-cache',
+                        help='directory of the emission log-likelihoods '
+                             'cache (only with "--weights-only")')
     parser.add_argument('-e', '--epochs', type=int, default=1,
                         help='number of epochs')
+    parser.add_argument('--delay', type=float, default=1.,
+                        help='delay of the Robbins-Monro learning rate '
+                             'schedule with "--frame-batch-size" '
+                             '(default: 1.)')
+    parser.add_argument('-f', '--frame-batch-size', type=int, default=0,
+                        help='update the model after each minibatch of N '
+                             'frames drawn at random across the utterances '
+                             '(only for models without temporal '
+                             'dependencies, e.g. GMM)')
+    parser.add_argument('--forgetting-rate', type=float, default=.51,
+                        help='forgetting rate of the Robbins-Monro '
+                             'learning rate schedule with '
+                             '"--frame-batch-size" (default: .51)')
     parser.add_argument('-l', '--lrate', type=float, default=1.,
-                        help='learning rate')
+                        help='learning rate (not used with '
+                             '"--frame-batch-size")')
+    parser.add_argument('-p', '--prefetch', type=int, default=4,
+                        help='number of utterances loaded in advance in a '
+                             'background thread (default: 4)')
+    parser.add_argument('--shuffle-buffer', type=int, default=100000,
+                        help='number of frames of the shuffle buffer with '
+                             '"--frame-batch-size" (default: 100000)')
+    parser.add_argument('-w', '--weights-only', action='store_true',
+                        help='only update the unigram weights of the '
+                             'phone-loop, the emissions are fixed')
     parser.add_argument('model', help='hmm based model')
     parser.add_argument('dataset', help='training data set')
     parser.add_argument('out', help='phone loop model')
 
 
+def train_frame_batches(model, trainer, dataset, epoch, args, logger):
+    batches = dataset.frame_batches(args.frame_batch_size,
+                                    buffer_size=args.shuffle_buffer,
+                                    prefetch=args.prefetch)
+    nbatches = -(-dataset.size // args.frame_batch_size)
+    for i, batch in enumerate(batches, start=1):
+        elbo = beer.evidence_lower_bound(model, batch,
+                                         datasize=dataset.size,
+                                         no_grad=True)
+        # Decaying learning rate: with a constant one, each minibatch
+        # would replace (most of) the statistics of the previous ones.
+        trainer.update(elbo)
+        logger.info(f'{"epoch=" + str(epoch):<20}  ' \
+                    f'{"batch=" + str(i) + "/" + str(nbatches):<20} ' \
+                    f'{"ELBO=" + str(round(float(elbo) / dataset.size, 3)):<20}')
+
+
 def main(args, logger):
     logger.debug('load the model')
-    with open(args.model, 'rb') as f:
-        model = pickle.load(f)
+    model = load_object(args.model)
 
     logger.debug('load the dataset')
-    with open(args.dataset, 'rb') as f:
-        dataset = pickle.load(f)
+    dataset = load_object(args.dataset)
 
-    logger.debug('create the optimizer')
-    optim = beer.BayesianModelOptimizer(model.mean_field_factorization(),
-                                        lrate=args.lrate)
+    cache = None
+    if args.frame_batch_size > 0:
+        # Shuffling the frames breaks the temporal dependencies.
+        if any(isinstance(module, beer.HMM) for module in model.modules()):
+            logger.error('"--frame-batch-size" cannot be used with a '
+                         'model with temporal dependencies (HMM)')
+            exit(1)
+        if args.weights_only or args.llh_cache:
+            logger.error('"--frame-batch-size" cannot be used with '
+                         '"--weights-only" or "--llh-cache"')
+            exit(1)
+        logger.debug('create the online trainer')
+        trainer = beer.OnlineVBTrainer(model, dataset.size,
+                                       delay=args.delay,
+                                       forgetting_rate=args.forgetting_rate)
+    elif args.weights_only:
+        logger.debug('create the optimizer (unigram weights only)')
+        optim = beer.VBConjugateOptimizer([[model.weights]],
+                                          lrate=args.lrate)
+        if args.llh_cache:
+            cache = LogLikelihoodCache(args.llh_cache, model)
+    else:
+        if args.llh_cache:
+            logger.error('the log-likelihoods cache can only be used with '
+                         '"--weights-only"')
+            exit(1)
+        logger.debug('create the optimizer')
+        optim = beer.VBConjugateOptimizer(
+            model.conjugate_bayesian_parameters(keepgroups=True),
+            lrate=args.lrate
+        )
 
+    batch_size = args.batch_size if args.batch_size > 0 else len(dataset)
     for epoch in range(1, args.epochs + 1):
+        if args.frame_batch_size > 0:
+            train_frame_batches(model, trainer, dataset, epoch, args, logger)
+            continue
+
         elbo = beer.evidence_lower_bound(datasize=dataset.size)
         optim.init_step()
-        for i, utt in enumerate(dataset.utterances(), start=1):
+        utterances = dataset.utterances(prefetch=args.prefetch)
+        for i, utt in enumerate(utterances, start=1):
             logger.debug(f'processing utterance: {utt.id}')
+            kwargs = {}
+            if cache is not None:
+                kwargs['pc_llhs'] = cache.pc_llhs(utt.features, model.graph)
             elbo += beer.evidence_lower_bound(model, utt.features,
-                                              datasize=dataset.size)
+                                              datasize=dataset.size,
+                                              no_grad=True, **kwargs)
 
             # Update the model after N utterances.
-            if i % args.batch_size == 0:
+            if i % batch_size == 0:
                 elbo.backward()
                 optim.step()
                 logger.info(f'{"epoch=" + str(epoch):<20}  ' \
-                            f'{"batch=" + str(i // args.batch_size) + "/" + str(int(len(dataset) / args.batch_size)):<20} ' \
-                            f'{"ELBO=" + str(round(float(elbo) / (args.batch_size * dataset.size), 3)):<20}')
+                            f'{"batch=" + str(i // batch_size) + "/" + str(int(len(dataset) / batch_size)):<20} ' \
+                            f'{"ELBO=" + str(round(float(elbo) / (batch_size * dataset.size), 3)):<20}')
                 elbo = beer.evidence_lower_bound(datasize=dataset.size)
                 optim.init_step()
 
     logger.debug('save the model on disk...')
-    with open(args.out, 'wb') as f:
-        pickle.dump(model, f)
+    save_object(model, args.out)
 
     logger.info(f'finished training after {args.epochs} epochs. ' \
                 f'KL(q || p) = {float(model.kl_div_posterior_prior()): .3f}')
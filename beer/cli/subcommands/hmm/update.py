@@ -5,23 +5,47 @@ import argparse
 import os
 import pickle
 import sys
+import time
 
 import torch
 import beer
 
+from ...objcache import load_object, save_object
+
+
+# Time (in seconds) between two checks for the arrival of new shards.
+POLL_INTERVAL = 5
+
 
 def setup(parser):
+    parser.add_argument('-c', '--carry-over',
+                        help='file listing the shards that arrived too late '
+                             'for the update, they will be included in the '
+                             'next update')
+    parser.add_argument('-f', '--min-fraction', default=1., type=float,
+                        help='update the model once this fraction of the '
+                             'shards has arrived (default: 1.)')
+    parser.add_argument('--by-frames', action='store_true',
+                        help='measure the fraction of arrived data in number '
+                             'of frames rather than in number of shards')
     parser.add_argument('-l', '--learning-rate', default=1., type=float,
                         help='learning rate')
     parser.add_argument('-o', '--optim-state', help='optimizer state')
+    parser.add_argument('-w', '--wait', default=0., type=float,
+                        help='maximum time (in seconds) to wait for the '
+                             'shards (default: 0.)')
     parser.add_argument('model', help='model to update')
     parser.add_argument('out_model', help='updated model')
 
 
+def load_elbo(path):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
 def main(args, logger):
     logger.debug('load the model')
-    with open(args.model, 'rb') as f:
-        model = pickle.load(f)
+    model = load_object(args.model)
 
     logger.debug('building the optimizer')
     optim = beer.VBConjugateOptimizer(
@@ -38,23 +62,70 @@ def main(args, logger):
 
     elbo = None
     nutts = 0
-    count = 0
-    for line in sys.stdin:
-        path = line.strip()
-        logger.debug(f'loading ELBO stored in {path}')
-        with open(path, 'rb') as f:
-            elbo_batch, nutts_batch = pickle.load(f)
-        if elbo is None:
-            elbo = elbo_batch
-            nutts = nutts_batch
-        else:
-            elbo += elbo_batch
+    nframes = 0
+
+    # Shards which were too late for the previous update.
+    if args.carry_over and os.path.isfile(args.carry_over):
+        with open(args.carry_over, 'r') as f:
+            late_paths = [line.strip() for line in f if line.strip()]
+        for path in late_paths:
+            if not os.path.isfile(path):
+                logger.warning(f'late shard {path} still missing, dropping it')
+                continue
+            logger.debug(f'carrying over late shard stored in {path}')
+            elbo_batch, nutts_batch = load_elbo(path)
+            elbo = elbo_batch if elbo is None else elbo + elbo_batch
+            nutts += nutts_batch
+            nframes += elbo_batch._minibatchsize
+
+    pending = [line.strip() for line in sys.stdin if line.strip()]
+    nshards = len(pending)
+    narrived = 0
+    start_time = time.time()
+    while True:
+        for path in list(pending):
+            if not os.path.isfile(path):
+                continue
+            logger.debug(f'loading ELBO stored in {path}')
+            elbo_batch, nutts_batch = load_elbo(path)
+            elbo = elbo_batch if elbo is None else elbo + elbo_batch
             nutts += nutts_batch
-        count += 1
+            nframes += elbo_batch._minibatchsize
+            narrived += 1
+            pending.remove(path)
+
+        if args.by_frames and elbo is not None:
+            fraction = nframes / elbo._datasize
+        else:
+            fraction = narrived / max(nshards, 1)
+        if not pending or fraction >= args.min_fraction:
+            break
+        remaining = args.wait - (time.time() - start_time)
+        if remaining <= 0:
+            logger.error(f'only {narrived}/{nshards} shards arrived after '
+                         f'{args.wait} seconds (fraction: {fraction:.3f}, '
+                         f'required: {args.min_fraction})')
+            exit(1)
+        time.sleep(min(POLL_INTERVAL, remaining))
+
+    if elbo is None:
+        logger.error(f'no statistics to update the model: none of the '
+                     f'{nshards} shards (nor any late shard) arrived')
+        exit(1)
+
+    for path in pending:
+        logger.warning(f'dropping late shard: {path}')
+    if args.carry_over:
+        logger.debug(f'saving the list of late shards to: {args.carry_over}')
+        with open(args.carry_over, 'w') as f:
+            for path in pending:
+                print(path, file=f)
 
     logger.debug('synchronizing the ELBO and the model')
     elbo.sync(model)
 
+    # If some shards are missing, the statistics are rescaled to the
+    # full data set size by the ELBO (datasize / minibatchsize).
     logger.debug('computing the gradient')
     elbo.backward()
 
@@ -62,15 +133,14 @@ def main(args, logger):
     optim.step()
 
     logger.debug('saving the new model')
-    with open(args.out_model, 'wb') as f:
-        pickle.dump(model, f)
+    save_object(model, args.out_model)
 
     if args.optim_state:
         logger.debug(f'saving the optimizer state to: {args.optim_state}')
         torch.save(optim.state_dict(), args.optim_state)
 
+    logger.info(f'updated the model with {narrived}/{nshards} shards')
     logger.info(f'accumulated ELBO={float(elbo)/(nutts * elbo._datasize):.3f}')
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,122 @@
+
+'run a script of commands in a single process'
+
+import argparse
+from contextlib import contextmanager, redirect_stdout, ExitStack
+import shlex
+import sys
+
+
+EPILOG = '''\
+The script (YAML) is a list of steps. A step is a command line (without
+the leading "beer") or a mapping with the command line ("cmd") and the
+options of the step:
+  persist   write the models, graphs, ... saved by the command to disk
+            (by default, they are only kept in memory for the next
+            steps)
+  stdin     file given as standard input to the command
+  stdout    file where to write the standard output of the command
+
+example:
+  - hmm mkphones -d data/dataset.pkl conf/hmm.yml data/units hmms.mdl
+  - hmm mkphoneloopgraph data/units ploop_graph.pkl
+  - hmm mkdecodegraph ploop_graph.pkl hmms.mdl decode_graph.pkl
+  - cmd: hmm mkphoneloop decode_graph.pkl hmms.mdl 0.mdl
+    persist: true
+  - cmd: hmm decode 0.mdl data/dataset.pkl
+    stdout: decode.txt
+'''
+
+STEP_OPTIONS = {'cmd', 'persist', 'stdin', 'stdout'}
+
+
+def setup(parser):
+    parser.formatter_class = argparse.RawDescriptionHelpFormatter
+    parser.epilog = EPILOG
+    parser.add_argument('script', nargs='?', default='-',
+                        help='script to run (default: "-" for stdin)')
+
+
+def parse_step(step):
+    'Options of a step of the script (given as a string or a dict).'
+    if isinstance(step, str):
+        step = {'cmd': step}
+    if not isinstance(step, dict) or 'cmd' not in step:
+        raise ValueError(f'invalid step: {step}')
+    unknown = set(step) - STEP_OPTIONS
+    if unknown:
+        raise ValueError(f'unknown option(s) {", ".join(sorted(unknown))} '
+                         f'for step: {step["cmd"]}')
+    cmd = step['cmd']
+    return {
+        'argv': shlex.split(cmd) if isinstance(cmd, str) else list(cmd),
+        'persist': bool(step.get('persist', False)),
+        'stdin': step.get('stdin'),
+        'stdout': step.get('stdout'),
+    }
+
+
+@contextmanager
+def redirect_stdin(f):
+    stdin, sys.stdin = sys.stdin, f
+    try:
+        yield f
+    finally:
+        sys.stdin = stdin
+
+
+def main(args, logger):
+    # Imported here to keep "beer --help" fast (see "beer.cli.commands").
+    import yaml
+    from . import add_subcommands
+    from ..objcache import ObjectCache, activate
+
+    if args.script == '-':
+        script = yaml.safe_load(sys.stdin)
+    else:
+        with open(args.script, 'r') as f:
+            script = yaml.safe_load(f)
+
+    try:
+        steps = [parse_step(step) for step in script or []]
+    except ValueError as err:
+        logger.error(str(err))
+        exit(1)
+
+    # All the commands (but "run") are parsed with the same parser so
+    # the module of each command is imported once.
+    parser = argparse.ArgumentParser(prog='beer')
+    add_subcommands(parser, exclude=['run'])
+
+    cache = ObjectCache()
+    with activate(cache):
+        for i, step in enumerate(steps, start=1):
+            cmdline = ' '.join(step['argv'])
+            logger.debug(f'step {i}/{len(steps)}: {cmdline}')
+            try:
+                step_args = parser.parse_args(step['argv'])
+            except SystemExit:
+                logger.error(f'invalid command (step {i}): {cmdline}')
+                exit(1)
+
+            cache.persist = step['persist']
+            with ExitStack() as stack:
+                if step['stdin']:
+                    stack.enter_context(redirect_stdin(
+                        stack.enter_context(open(step['stdin'], 'r'))))
+                if step['stdout']:
+                    stack.enter_context(redirect_stdout(
+                        stack.enter_context(open(step['stdout'], 'w'))))
+                try:
+                    step_args.func(step_args, logger)
+                except SystemExit as err:
+                    if err.code:
+                        logger.error(f'command failed (step {i}): {cmdline}')
+                        raise
+            sys.stdout.flush()
+
+    logger.info(f'successfully ran {len(steps)} commands')
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,19 @@
 'Subspace Hidden Markov Model (SHMM)'
 
-from . import mksphoneloop
-from . import train
+from ...commands import add_commands
+
+
+# Help message of the commands. The module of a command is imported
+# only when the command is run (see "beer.cli.commands").
+cmds = {
+    'mksphoneloop': 'create a subspace phone-loop model',
+    'train': 'train a subspace phone-loop model',
+}
 
-cmds = [mksphoneloop, train]
 
 def setup(parser):
-    subparsers = parser.add_subparsers(title='possible commands', metavar='<cmd>')
-    subparsers.required = True
-    for cmd in cmds:
-        cmd_name = cmd.__name__.split('.')[-1]
-        subparser = subparsers.add_parser(cmd_name, help=cmd.__doc__)
-        cmd.setup(subparser)
-        subparser.set_defaults(func=cmd.main)
+    add_commands(parser, __name__, cmds)
+
 
 def main(args, logger):
     pass
-
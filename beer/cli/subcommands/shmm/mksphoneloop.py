@@ -11,6 +11,8 @@ import yaml
 
 import beer
 
+from ...objcache import load_object, save_object
+
 
 # Create a view of the emissions (aka modelset) for each units.
 def iterate_units(modelset, nunits, nstates):
@@ -91,8 +93,7 @@ def main(args, logger):
     logger.debug(f'number of states per unit: {nstates}')
 
     logger.debug('loading the phone-loop')
-    with open(args.phoneloop, 'rb') as f:
-        ploop = pickle.load(f)
+    ploop = load_object(args.phoneloop)
 
     logger.debug('loading the units models')
     units_emissions = ploop.modelset.original_modelset.modelsets[groupidx]
@@ -171,8 +172,7 @@ def main(args, logger):
         gsm = beer.Mixture.create(gsmset)
 
     logger.debug('saving the GSM')
-    with open(args.gsm, 'wb') as f:
-        pickle.dump(gsm, f)
+    save_object(gsm, args.gsm)
 
     logger.debug('saving the units posterior')
     with open(args.posts, 'wb') as f:
@@ -182,8 +182,7 @@ def main(args, logger):
             pickle.dump((latent_posts, nunits, nstates, groupidx, labels), f)
 
     logger.debug('saving the subspace phoneloop')
-    with open(args.sploop, 'wb') as f:
-        pickle.dump(ploop, f)
+    save_object(ploop, args.sploop)
 
     logger.info(f'created {nunits} subspace HMMs (latent dim: {args.latent_dim})')
     logger.info(f'latent prior: {latent_prior}')
@@ -10,6 +10,8 @@ import torch
 
 import beer
 
+from ...objcache import load_object, save_object
+
 
 # Create a view of the emissions (aka modelset) for each units.
 def iterate_units(modelset, nunits, nstates):
@@ -18,6 +20,23 @@ def iterate_units(modelset, nunits, nstates):
         yield modelset[start:end]
 
 
+# Indices of the mean-field groups of the GSM which can be updated from
+# the same pass: given the latent posteriors, the statistics of the
+# latent prior do not depend on the transform and vice versa. The groups
+# of a latent prior with several groups (e.g. a mixture) depend on each
+# other and are updated in turn.
+def independent_groups(gsm, groups):
+    independent = []
+    for submodel in [gsm.latent_prior, gsm.transform]:
+        subgroups = list(submodel.conjugate_bayesian_parameters(
+            keepgroups=True))
+        if len(subgroups) == 1:
+            params = set(id(param) for param in subgroups[0])
+            independent += [idx for idx, group in enumerate(groups)
+                            if all(id(param) in params for param in group)]
+    return independent
+
+
 def setup(parser):
     parser.add_argument('-c', '--learning-rate-cjg', default=1., type=float,
                         help='learning rate for the conjugate parameters '\
@@ -25,6 +44,10 @@ def setup(parser):
     parser.add_argument('-e', '--epochs', default=1, type=int,
                        help='number of training epochs (default: 1)')
     parser.add_argument('--gpu', action='store_true', help='use a GPU')
+    parser.add_argument('-j', '--joint-update', action='store_true',
+                        help='update the independent mean-field groups of '
+                             'the GSM (latent prior and transform) at the '
+                             'same epoch instead of one after the other')
     parser.add_argument('-k', '--params-nsamples', type=int, default=1,
                         help='number of samples for the parameters posterior ' \
                              '(default: 1)')
@@ -52,8 +75,7 @@ def main(args, logger):
         gpu_idx = beer.utils.reserve_gpu(logger=logger)
 
     logger.debug('loading the GSM')
-    with open(args.gsm, 'rb') as f:
-        gsm = pickle.load(f)
+    gsm = load_object(args.gsm)
 
     logger.debug('loading the units posterior')
     with open(args.posts, 'rb') as f:
@@ -67,8 +89,7 @@ def main(args, logger):
 
 
     logger.debug('loading the subspace phoneloop')
-    with open(args.sploop, 'rb') as f:
-        sploop = pickle.load(f)
+    sploop = load_object(args.sploop)
 
     if args.gpu:
         logger.info(f'using gpu device: {gpu_idx}')
@@ -86,8 +107,13 @@ def main(args, logger):
     if args.posteriors:
         params = [[]]
     else:
-        params = gsm.conjugate_bayesian_parameters(keepgroups=True)
-    cjg_optim = beer.VBConjugateOptimizer(params, lrate=args.learning_rate_cjg)
+        params = list(gsm.conjugate_bayesian_parameters(keepgroups=True))
+    schedule, independent = None, None
+    if args.joint_update and not args.posteriors:
+        schedule, independent = 'joint', independent_groups(gsm, params)
+    cjg_optim = beer.VBConjugateOptimizer(params, lrate=args.learning_rate_cjg,
+                                          schedule=schedule,
+                                          independent_groups=independent)
     if args.posteriors:
         params = list(latent_posts.parameters())
     else:
@@ -129,8 +155,7 @@ def main(args, logger):
             labels = labels.cpu()
 
     logger.debug('saving the GSM')
-    with open(args.out_gsm, 'wb') as f:
-        pickle.dump(gsm, f)
+    save_object(gsm, args.out_gsm)
 
     logger.debug('saving the units posterior')
     with open(args.out_posts, 'wb') as f:
@@ -140,8 +165,7 @@ def main(args, logger):
             pickle.dump((latent_posts, nunits, nstates, groupidx, labels), f)
 
     logger.debug('saving the subspace phoneloop')
-    with open(args.out_sploop, 'wb') as f:
-        pickle.dump(sploop, f)
+    save_object(sploop, args.out_sploop)
 
     if args.optim_state:
         logger.debug(f'saving the optimizer state to: {args.optim_state}')
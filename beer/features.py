@@ -5,6 +5,7 @@
 from functools import lru_cache
 import numpy as np
 import scipy.signal
+import torch
 
 
 def hz2mel(freq_hz):
@@ -31,7 +32,7 @@ def bark2hz(bark):
 def __triangle(center, start, end, freqs):
     'Create triangular filter.'
     slopes = 1. / (center - start), 1./ (end - center)
-    retval = np.zeros_like(freqs).astype(np.float)
+    retval = np.zeros_like(freqs).astype(float)
     idxs = np.logical_and(freqs >= start, freqs <= center)
     retval[idxs] = np.linspace(slopes[0] * (freqs[idxs][0] - start),
                                slopes[0] * (freqs[idxs][-1] - start),
@@ -79,6 +80,25 @@ def create_fbank(nfilters, fft_len=512, srate=16000, lowfreq=0, highfreq=None,
     return filters
 
 
+def compute_dct_bases(nfilters, n_dct_coeff):
+    '''Bases of the Discrete Cosine Transform (without the 0th
+    coefficient).
+
+    Args:
+        nfilters (int): Dimension of the input.
+        n_dct_coeff (int): Number of coefficients to keep.
+
+    Returns
+        (numpy.ndarray): Bases organized as a matrix
+            (nfilters x n_dct_coeff).
+
+    '''
+    dct_bases = np.zeros((nfilters, n_dct_coeff))
+    for m in range(n_dct_coeff):
+        dct_bases[:, m] = np.cos((m+1) * np.pi / nfilters * (np.arange(nfilters) + 0.5))
+    return dct_bases
+
+
 def add_deltas(fea, winlens=(2, 2)):
     '''Add derivatives to features (deltas, double deltas, triple_delas, ...)
 
@@ -202,3 +222,342 @@ def fbank(signal, flen=0.025, frate=0.01, hifreq=8000, lowfreq=20, nfilters=26,
     melspec = magspec @ filters.T
 
     return np.log(melspec + 1)
+
+
+class BatchFeatureExtractor:
+    '''Extract the features of a batch of utterances at once.
+
+    The features are the same as the ones of the "beer features
+    extract" command but all the utterances are processed together:
+    the frames of the batch are transformed with a single FFT, the
+    energy, DCT and liftering are applied as a single (precomputed)
+    matrix and the derivatives are computed with a convolution over the
+    whole batch.
+
+    Args:
+        srate (int): Expected sampling rate of the audio.
+        preemph (float): Pre-emphasis coefficient.
+        window_len (float): Frame duration in seconds.
+        framerate (float): Frame rate in seconds.
+        apply_fbank (boolean): Apply the filter bank.
+        nfilters (int): Number of filters.
+        cutoff_hfreq (float): High cut off frequency (Hz).
+        cutoff_lfreq (float): Low cut off frequency (Hz).
+        apply_deltas (boolean): Add the derivatives.
+        delta_order (int): Order of the derivatives.
+        delta_winlen (int): Window length of the derivatives.
+        apply_dct (boolean): Apply the cosine transform.
+        n_dct_coeff (int): Number of cepstral coefficients.
+        lifter_coeff (float): Liftering coefficient.
+        utt_mnorm (boolean): Per-utterance mean normalization.
+        add_energy (boolean): Add the (log) energy of the frame.
+        remove_dc (boolean): Remove the DC offset (i.e. the mean) of
+            the signal.
+        dtype (``torch.dtype``): Type of the computation.
+        device (``torch.device``): Device of the computation.
+
+    Example:
+        >>> extractor = beer.features.BatchFeatureExtractor(**feaconf)
+        >>> features, lengths = extractor([signal1, signal2])
+
+    '''
+
+    def __init__(self, srate=16000, preemph=0.97, window_len=0.025,
+                 framerate=0.01, apply_fbank=True, nfilters=26,
+                 cutoff_hfreq=8000, cutoff_lfreq=20, apply_deltas=True,
+                 delta_order=2, delta_winlen=2, apply_dct=True,
+                 n_dct_coeff=13, lifter_coeff=22, utt_mnorm=False,
+                 add_energy=True, remove_dc=True, dtype=torch.float32,
+                 device=None):
+        self.preemph = preemph
+        self.frate = int(srate * framerate)
+        self.flen = int(srate * window_len)
+        self.fft_len = int(2 ** np.floor(np.log2(self.flen) + 1))
+        self.utt_mnorm = utt_mnorm
+        self.remove_dc = remove_dc
+        self.delta_winlen = delta_winlen
+        self.delta_order = delta_order if apply_deltas else 0
+        self.dtype = dtype
+        self.device = device
+
+        self.window = self._tensor(np.hamming(self.flen))
+        if apply_fbank:
+            self.fbank = self._tensor(create_fbank(nfilters, self.fft_len,
+                                                   lowfreq=cutoff_lfreq,
+                                                   highfreq=cutoff_hfreq).T)
+        else:
+            self.fbank = None
+
+        # Energy, DCT and liftering as a single linear transform of the
+        # log spectrum.
+        dim = nfilters if apply_fbank else self.fft_len // 2
+        norm = np.sqrt(2. / nfilters)
+        if apply_dct:
+            lifter = 1 + (lifter_coeff / 2) * np.sin(np.pi * \
+                (1 + np.arange(n_dct_coeff)) / lifter_coeff)
+            proj = compute_dct_bases(dim, n_dct_coeff) * norm * lifter
+        else:
+            proj = np.eye(dim)
+        if add_energy:
+            proj = np.c_[norm * np.ones(dim), proj]
+        self.proj = self._tensor(proj)
+
+        dfilter = np.arange(-delta_winlen, delta_winlen + 1)
+        dfilter = dfilter / (2 * dfilter.dot(dfilter))
+        self.dfilter = self._tensor(dfilter)
+
+    def _tensor(self, array):
+        return torch.tensor(array, dtype=self.dtype, device=self.device)
+
+    @property
+    def dim(self):
+        'Dimension of the features.'
+        return self.proj.shape[1] * (1 + self.delta_order)
+
+    def nframes(self, nsamples):
+        'Number of frames of a signal of "nsamples" samples.'
+        return max(0, (nsamples - self.flen) // self.frate + 1)
+
+    def pad(self, signals):
+        '''Pad a list of signals.
+
+        Args:
+            signals (list): List of 1D ``numpy.ndarray`` or
+                ``torch.Tensor``.
+
+        Returns:
+            ``torch.Tensor[nutts, max_nsamples]``: Padded signals.
+            ``torch.LongTensor[nutts]``: Number of samples.
+
+        '''
+        signals = [torch.as_tensor(signal).to(self.dtype) for signal in signals]
+        lengths = torch.tensor([len(signal) for signal in signals])
+        padded = torch.zeros(len(signals), max(self.flen, int(lengths.max())),
+                             dtype=self.dtype, device=self.device)
+        for i, signal in enumerate(signals):
+            padded[i, :len(signal)] = signal
+        return padded, lengths
+
+    def frames(self, signals):
+        '''Pre-emphasized and windowed frames of a batch of signals.
+
+        Args:
+            signals (``torch.Tensor[nutts, nsamples]``): Signals.
+
+        Returns:
+            ``torch.Tensor[nutts, nframes, frame_length]``
+
+        '''
+        sframes = signals.unfold(1, self.flen, self.frate)
+        frames = sframes * self.window
+        frames[:, :, 1:] -= sframes[:, :, :-1] * (self.preemph * self.window[1:])
+        frames[:, :, 0] *= 1 - self.preemph
+        return frames
+
+    def frames_features(self, frames):
+        '''Static features (i.e. without derivatives) of frames.
+
+        Args:
+            frames (``torch.Tensor[..., frame_length]``): Windowed
+                frames (see :any:`frames`).
+
+        Returns:
+            ``torch.Tensor[..., dim]``
+
+        '''
+        spec = torch.fft.rfft(frames, n=self.fft_len, dim=-1)[..., :-1].abs()
+        if self.fbank is not None:
+            spec = spec @ self.fbank
+        return torch.log(1e-6 + spec) @ self.proj
+
+    def deltas(self, features, lengths):
+        '''Add the derivatives to a batch of features (same as
+        :any:`add_deltas`).
+
+        Args:
+            features (``torch.Tensor[nutts, nframes, dim]``): Padded
+                features.
+            lengths (``torch.LongTensor[nutts]``): Number of frames
+                per utterance.
+
+        Returns:
+            ``torch.Tensor[nutts, nframes, dim * (1 + order)]``
+
+        '''
+        nutts, nframes, dim = features.shape
+        wlen = self.delta_winlen
+
+        # Replicate the first/last valid frame of each utterance.
+        idxs = torch.arange(-wlen, nframes + wlen, device=features.device)
+        idxs = torch.min(idxs.clamp(min=0)[None, :],
+                         (lengths.to(features.device) - 1).clamp(min=0)[:, None])
+        idxs = idxs[:, :, None].expand(-1, -1, dim)
+
+        kernel = self.dfilter.view(1, 1, -1).expand(dim, 1, -1)
+        fea_list = [features]
+        for _ in range(self.delta_order):
+            padded = features.gather(1, idxs).transpose(1, 2)
+            features = torch.nn.functional.conv1d(padded, kernel, groups=dim)
+            features = features.transpose(1, 2)
+            fea_list.append(features)
+        return torch.cat(fea_list, dim=-1)
+
+    def __call__(self, signals):
+        '''Extract the features of a batch of utterances.
+
+        Args:
+            signals (list): List of 1D ``numpy.ndarray`` or
+                ``torch.Tensor``.
+
+        Returns:
+            ``torch.Tensor[nutts, max_nframes, dim]``: Padded features
+            (the padding is set to 0).
+            ``torch.LongTensor[nutts]``: Number of frames of each
+            utterance.
+
+        '''
+        signals, nsamples = self.pad(signals)
+
+        # Remove the DC offset of each utterance.
+        if self.remove_dc:
+            mask = torch.arange(signals.shape[1], device=signals.device)[None, :] \
+                < nsamples.to(signals.device)[:, None]
+            means = signals.sum(dim=1) / nsamples.to(signals.device).clamp(min=1)
+            signals = (signals - means[:, None]) * mask
+
+        lengths = torch.tensor([self.nframes(n) for n in nsamples.tolist()])
+        features = self.frames_features(self.frames(signals))
+        nframes = int(lengths.max())
+        features = features[:, :nframes]
+        if self.delta_order > 0:
+            features = self.deltas(features, lengths)
+
+        mask = (torch.arange(nframes, device=features.device)[None, :] \
+            < lengths.to(features.device)[:, None])[:, :, None]
+        features = features * mask
+        if self.utt_mnorm:
+            means = features.sum(dim=1) / lengths.to(features.device).clamp(min=1)[:, None]
+            features = (features - means[:, None, :]) * mask
+
+        return features, lengths
+
+
+class StreamingFeatureExtractor:
+    '''Extract the features of a (possibly very long) signal given
+    chunk by chunk.
+
+    The samples of the incomplete frame and the frames needed to compute
+    the derivatives are carried from one chunk to the next so the
+    features are the same as the ones of the :any:`BatchFeatureExtractor`
+    whatever the size of the chunks. Note that, as the whole signal is
+    not known in advance, its DC offset is not removed (i.e. the
+    features are the same as the batch path with ``remove_dc=False``)
+    and the per-utterance mean normalization is replaced by an online
+    (cumulative) mean normalization.
+
+    Args:
+        extractor (:any:`BatchFeatureExtractor`): Features
+            configuration.
+        online_mnorm (boolean): Subtract from each frame the mean of
+            the frames up to (and including) this frame.
+
+    Example:
+        >>> stream = beer.features.StreamingFeatureExtractor(extractor)
+        >>> for chunk in chunks:
+        ...     features = stream.process(chunk)
+        >>> features = stream.flush()
+
+    '''
+
+    def __init__(self, extractor, online_mnorm=False):
+        if extractor.utt_mnorm:
+            raise ValueError('Per-utterance mean normalization is not '
+                             'possible on a stream, use the online mean '
+                             'normalization')
+        self.extractor = extractor
+        self.online_mnorm = online_mnorm
+        # Number of frames on each side needed to compute the
+        # derivatives of a frame.
+        self.context = extractor.delta_order * extractor.delta_winlen
+        self.reset()
+
+    def reset(self):
+        'Start a new stream.'
+        extractor = self.extractor
+        self._samples = torch.zeros(0, dtype=extractor.dtype,
+                                    device=extractor.device)
+        self._static = torch.zeros(0, extractor.proj.shape[1],
+                                   dtype=extractor.dtype,
+                                   device=extractor.device)
+        self._static_offset = 0    # Index of the first buffered frame.
+        self._nframes = 0          # Number of frames returned so far.
+        self._sum = torch.zeros(extractor.dim, dtype=extractor.dtype,
+                                device=extractor.device)
+
+    def _output(self, final):
+        nstatic = len(self._static)
+
+        # Last frame (excluded) for which all the right context is
+        # available.
+        end = nstatic if final else max(0, nstatic - self.context)
+        start = self._nframes - self._static_offset
+        if end <= start:
+            return torch.zeros(0, self.extractor.dim,
+                               dtype=self.extractor.dtype,
+                               device=self.extractor.device)
+        if self.extractor.delta_order > 0:
+            features = self.extractor.deltas(self._static[None],
+                                             torch.tensor([nstatic]))[0]
+        else:
+            features = self._static
+        features = features[start:end]
+
+        # Only keep the left context of the next frames.
+        self._nframes += len(features)
+        first = max(0, self._nframes - self.context - self._static_offset)
+        self._static = self._static[first:]
+        self._static_offset += first
+
+        if self.online_mnorm and len(features) > 0:
+            csum = self._sum + features.cumsum(dim=0)
+            counts = torch.arange(self._nframes - len(features) + 1,
+                                  self._nframes + 1,
+                                  dtype=features.dtype,
+                                  device=features.device)
+            features = features - csum / counts[:, None]
+            self._sum = csum[-1]
+        return features
+
+    def process(self, chunk):
+        '''Process the next chunk of the signal.
+
+        Args:
+            chunk (``numpy.ndarray`` or ``torch.Tensor``): Samples.
+
+        Returns:
+            ``torch.Tensor[nframes, dim]``: The features that can be
+            computed so far (possibly empty).
+
+        '''
+        extractor = self.extractor
+        chunk = torch.as_tensor(chunk).to(dtype=extractor.dtype,
+                                          device=extractor.device)
+        samples = torch.cat([self._samples, chunk])
+        nframes = extractor.nframes(len(samples))
+        if nframes > 0:
+            frames = extractor.frames(samples[None])[0]
+            static = extractor.frames_features(frames)
+            self._static = torch.cat([self._static, static])
+        self._samples = samples[nframes * extractor.frate:]
+        return self._output(final=False)
+
+    def flush(self):
+        '''Terminate the stream.
+
+        Returns:
+            ``torch.Tensor[nframes, dim]``: The remaining features.
+
+        '''
+        features = self._output(final=True)
+        self.reset()
+        return features
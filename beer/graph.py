@@ -6,7 +6,7 @@ from typing import Set, Dict, TypeVar, Generic
 import torch
 from .utils import logsumexp
 
-__all__ = ['Graph']
+__all__ = ['Graph', 'StreamingViterbi']
 
 
 # Create some new type to use with the "dataclass" code generator.
@@ -322,6 +322,25 @@ class CompiledGraph(torch.nn.Module):
         return retval
 
 
+    def log_likelihood(self, llhs):
+        '''Log-likelihood of the data (forward recursion only, the
+        intermediate forward variables are not stored).
+
+        Args:
+            llhs (``torch.Tensor[N, K]``): Log-likelihood per frame and
+                state.
+
+        Returns:
+            ``torch.Tensor``: scalar.
+
+        '''
+        log_trans_mat_t = self.trans_log_probs.t()
+        log_alpha = llhs[0] + self.init_log_probs
+        for llh in llhs[1:]:
+            log_alpha = llh + torch.logsumexp(log_alpha + log_trans_mat_t,
+                                              dim=1)
+        return torch.logsumexp(log_alpha + self.final_log_probs, dim=0)
+
     def best_path(self, llhs):
         init_log_prob = self.init_log_probs
         backtrack = torch.zeros_like(llhs, dtype=torch.long,
@@ -339,3 +358,172 @@ class CompiledGraph(torch.nn.Module):
             path.insert(0, backtrack[i, path[0]])
         return torch.LongTensor(path, device=llhs.device)
 
+
+
+class StreamingViterbi:
+    '''Frame-synchronous Viterbi search over a :any:`CompiledGraph` for
+    a stream of frames.
+
+    The frames are given by chunks and the search keeps one token per
+    active state. A frame is finalized as soon as all the surviving
+    tokens share the same history up to this frame. Only the
+    back-pointers of the frames not yet finalized are stored so the
+    memory does not grow with the length of the stream. Without pruning,
+    the concatenation of the finalized states is the same as the output
+    of :any:`CompiledGraph.best_path`.
+
+    Args:
+        graph (:any:`CompiledGraph`): Inference graph.
+        beam (float): Prune the tokens whose score is lower than the
+            score of the best token minus the beam. If not provided,
+            no pruning is done.
+        max_latency (int): Maximum number of frames not finalized. If
+            the tokens have not converged after this number of frames,
+            the frames are finalized along the best token and the
+            tokens not consistent with it are pruned.
+
+    Example:
+        >>> search = StreamingViterbi(graph, beam=20.)
+        >>> for llhs in chunks:
+        ...     path += search.process(llhs)
+        ...     print(path + search.best_partial_path())
+        >>> path += search.flush()
+
+    '''
+
+    def __init__(self, graph, beam=None, max_latency=None):
+        self.graph = graph
+        self.beam = beam
+        self.max_latency = max_latency
+        self.reset()
+
+    def reset(self):
+        'Start a new stream.'
+        self._omega = None
+
+        # Log-likelihood removed from the scores to keep them close to
+        # 0 (the scores are normalized after each frame).
+        self.log_offset = 0.
+
+        # Back-pointers of the frames not yet finalized: for the
+        # frame t, the predecessor (at the frame t-1) of each state.
+        # The back-pointers of the first pending frame are not used.
+        self._backtracks = []
+
+    @property
+    def n_pending(self):
+        'Number of frames not yet finalized.'
+        return len(self._backtracks)
+
+    @property
+    def score(self):
+        'Log-likelihood of the best token (without the final weight).'
+        if self._omega is None:
+            return float('-inf')
+        return self.log_offset + float(self._omega.max())
+
+    def _trace(self, state):
+        # Sequence of states of the pending frames ending at "state".
+        path = [int(state)]
+        for backtrack in reversed(self._backtracks[1:]):
+            path.append(int(backtrack[path[-1]]))
+        return path[::-1]
+
+    def _prune(self):
+        if self.beam is not None:
+            threshold = self._omega.max() - self.beam
+            self._omega[self._omega < threshold] = float('-inf')
+
+    def _step(self, llh):
+        log_trans_mat = self.graph.trans_log_probs
+        if self._omega is None:
+            self._omega = llh + self.graph.init_log_probs
+            backtrack = torch.zeros_like(self._omega, dtype=torch.long)
+        else:
+            hypothesis = self._omega + log_trans_mat.t()
+            backtrack = torch.argmax(hypothesis, dim=1)
+            self._omega = llh + hypothesis[range(len(log_trans_mat)),
+                                           backtrack]
+        best = self._omega.max()
+        self._omega -= best
+        self.log_offset += float(best)
+        self._backtracks.append(backtrack)
+        self._prune()
+
+    def _finalize(self, last, state):
+        # Finalize the pending frames up to "last" (included) given the
+        # state of the frame "last".
+        path = [int(state)]
+        for backtrack in reversed(self._backtracks[1:last + 1]):
+            path.append(int(backtrack[path[-1]]))
+        self._backtracks = self._backtracks[last + 1:]
+        return path[::-1]
+
+    def _converged_frame(self):
+        # Last pending frame on which all the surviving tokens agree
+        # (and the common state) or None.
+        states = torch.nonzero(self._omega > float('-inf')).view(-1)
+        for frame in reversed(range(len(self._backtracks))):
+            if len(states) == 1:
+                return frame, states[0]
+            if frame > 0:
+                states = torch.unique(self._backtracks[frame][states])
+        return None
+
+    def _force_finalize(self, last):
+        # Finalize the pending frames up to "last" along the best token
+        # and prune the tokens going through another state.
+        best_path = self._trace(torch.argmax(self._omega))
+        ancestors = torch.arange(len(self._omega))
+        for backtrack in reversed(self._backtracks[last + 1:]):
+            ancestors = backtrack[ancestors]
+        self._omega[ancestors != best_path[last]] = float('-inf')
+        return self._finalize(last, best_path[last])
+
+    def process(self, llhs):
+        '''Process a chunk of frames.
+
+        Args:
+            llhs (``torch.Tensor[N, K]``): Log-likelihood per frame and
+                state of the chunk.
+
+        Returns:
+            list: The states of the newly finalized frames.
+
+        '''
+        for llh in llhs:
+            self._step(llh)
+        if self._omega is None:
+            return []
+
+        path = []
+        converged = self._converged_frame()
+        if converged is not None:
+            path += self._finalize(*converged)
+        if self.max_latency is not None and \
+                self.n_pending > self.max_latency:
+            path += self._force_finalize(self.n_pending - self.max_latency
+                                         - 1)
+        return path
+
+    def best_partial_path(self):
+        '''States of the frames not yet finalized according to the
+        current best token (they may change with the next frames).'''
+        if not self._backtracks:
+            return []
+        return self._trace(torch.argmax(self._omega))
+
+    def flush(self):
+        '''End of the stream: finalize the remaining frames (taking into
+        account the final weights of the graph) and reset the search.
+
+        Returns:
+            list: The states of the remaining frames.
+
+        '''
+        path = []
+        if self._backtracks:
+            scores = self._omega + self.graph.final_log_probs
+            path = self._trace(torch.argmax(scores))
+        self.reset()
+        return path
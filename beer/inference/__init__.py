@@ -1,2 +1,3 @@
 from .objectives import *
-from .optimizers import *
\ No newline at end of file
+from .optimizers import *
+from .online import *
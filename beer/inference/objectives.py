@@ -1,3 +1,4 @@
+import contextlib
 from dataclasses import dataclass, field
 import typing
 import torch
@@ -92,7 +93,8 @@ class EvidenceLowerBoundInstance:
     def backward(self, std_params=True):
         # Pytorch minimizes the loss ! We change the sign of the ELBO
         # just before to compute the gradient.
-        if std_params and self.value.requires_grad:
+        if std_params and isinstance(self.value, torch.Tensor) \
+                and self.value.requires_grad:
             (-self.value).backward()
 
         scale = self._datasize / self._minibatchsize
@@ -116,8 +118,13 @@ class EvidenceLowerBoundInstance:
         self._model_parameters = set(model.bayesian_parameters())
 
 
+def _has_std_parameters(model):
+    'True if the model has some trainable standard pytorch parameters.'
+    return any(param.requires_grad for param in model.parameters())
+
+
 def evidence_lower_bound(model=None, minibatch_data=None, datasize=-1,
-                         **kwargs):
+                         no_grad=None, **kwargs):
     '''Evidence Lower Bound objective function of Variational Bayes
     Inference.
 
@@ -135,8 +142,11 @@ def evidence_lower_bound(model=None, minibatch_data=None, datasize=-1,
         datasize (int): Number of data points of the total training
             data. If set to 0 or negative values, the size of the
             provided `minibatch_data` will be used instead.
-        fast_eval (boolean): If true, skip computing KL-divergence for the
-            global parameters.
+        no_grad (boolean): If true, compute the ELBO without tracking
+            the gradient of the standard pytorch parameters. The value
+            of the returned ELBO is then a python float. If not
+            provided, the gradient is tracked only if the model has
+            some trainable pytorch parameters.
         kwargs (object): Model specific extra parameters to evalute the
             ELBO.
 
@@ -178,12 +188,20 @@ def evidence_lower_bound(model=None, minibatch_data=None, datasize=-1,
     if datasize <= 0:
         datasize = mb_datasize
     scale = datasize / float(mb_datasize)
-    stats = model.sufficient_statistics(minibatch_data)
-    exp_llh = model.expected_log_likelihood(stats, **kwargs)
-    kl_div = model.kl_div_posterior_prior().sum()
-    elbo_value = float(scale) * exp_llh.sum() - kl_div
-    acc_stats = model.accumulate(stats)
+
+    # Models trained only with the natural gradient (HMM, Mixture, ...)
+    # don't need the autograd graph.
+    if no_grad is None:
+        no_grad = not _has_std_parameters(model)
+    with torch.no_grad() if no_grad else contextlib.nullcontext():
+        stats = model.sufficient_statistics(minibatch_data)
+        exp_llh = model.expected_log_likelihood(stats, **kwargs)
+        kl_div = model.kl_div_posterior_prior().sum()
+        elbo_value = float(scale) * exp_llh.sum() - kl_div
+        acc_stats = model.accumulate(stats)
     model.clear_cache()
+    if no_grad:
+        elbo_value = float(elbo_value)
 
     return EvidenceLowerBoundInstance(elbo_value, acc_stats,
                                       model.bayesian_parameters(),
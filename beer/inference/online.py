@@ -0,0 +1,129 @@
+'Online (stochastic) Variational Bayes training over a stream of data.'
+
+from .objectives import evidence_lower_bound
+from .optimizers import VBConjugateOptimizer
+
+
+__all__ = ['OnlineVBTrainer', 'robbins_monro_lrate']
+
+
+def robbins_monro_lrate(step, delay=1., forgetting_rate=.51):
+    '''Learning rate of the Robbins-Monro schedule:
+    (step + delay)^(-forgetting_rate).
+
+    Args:
+        step (int): Number of updates done so far.
+        delay (float): Down-weight the early updates (>= 0).
+        forgetting_rate (float): How fast the previous statistics are
+            forgotten. It should be in (0.5, 1] for the training to
+            converge.
+
+    Returns:
+        float
+
+    '''
+    return (step + delay) ** (-forgetting_rate)
+
+
+class OnlineVBTrainer:
+    '''Update the conjugate parameters of a model after each minibatch
+    of a (possibly unbounded) stream of data.
+
+    Args:
+        model (:any:`Model`): Model to train.
+        datasize (int): Total number of frames the model is supposed to
+            represent. The statistics of each minibatch are scaled to
+            this size.
+        batch_size (int): Number of elements of the stream per update.
+        delay (float): Delay of the Robbins-Monro schedule.
+        forgetting_rate (float): Forgetting rate of the Robbins-Monro
+            schedule.
+        prior_steps (int): Number of updates the model is considered to
+            have had before the training. It should be non-zero when
+            starting from an already trained model, otherwise the first
+            learning rate is 1 and the first minibatch replaces all the
+            statistics of the model.
+        independent_groups (list): Indices of the mean-field groups of
+            the model which can be updated from the same minibatch (see
+            :any:`VBConjugateOptimizer`). By default, one group is
+            updated per minibatch in turn. The groups without
+            statistics in the minibatch are not updated.
+
+    Example:
+        >>> trainer = beer.OnlineVBTrainer(model, datasize=1e6)
+        >>> for elbo in trainer.train(features_stream):
+        ...     print(float(elbo))
+
+    '''
+
+    def __init__(self, model, datasize, batch_size=1, delay=1.,
+                 forgetting_rate=.51, prior_steps=0,
+                 independent_groups=None):
+        self.model = model
+        self.datasize = datasize
+        self.batch_size = batch_size
+        self.delay = delay
+        self.forgetting_rate = forgetting_rate
+        self.prior_steps = prior_steps
+        self.optim = VBConjugateOptimizer(
+            model.conjugate_bayesian_parameters(keepgroups=True),
+            schedule='joint',
+            independent_groups=independent_groups or []
+        )
+
+    @property
+    def update_count(self):
+        'Number of updates done so far.'
+        return self.optim.update_count
+
+    def state_dict(self):
+        return {**self.optim.state_dict(), 'prior_steps': self.prior_steps}
+
+    def load_state_dict(self, state_dict):
+        self.optim.load_state_dict(state_dict)
+        self.prior_steps = state_dict.get('prior_steps', 0)
+
+    def update(self, elbo):
+        '''Update the model with the statistics of a minibatch.
+
+        Args:
+            elbo (``EvidenceLowerBoundInstance``): ELBO of the
+                minibatch.
+
+        '''
+        step = self.prior_steps + self.optim.update_count
+        self.optim.lrate = robbins_monro_lrate(step, self.delay,
+                                               self.forgetting_rate)
+        self.optim.init_step()
+        elbo.backward()
+        self.optim.step()
+
+    def train(self, stream, **kwargs):
+        '''Train the model on a stream of data.
+
+        Args:
+            stream (iterable): Stream of data (``torch.Tensor``).
+            kwargs (object): Model specific extra parameters to
+                evaluate the ELBO.
+
+        Yields:
+            ``EvidenceLowerBoundInstance``: The ELBO of each minibatch
+            after the model has been updated.
+
+        '''
+        elbo = evidence_lower_bound(datasize=self.datasize)
+        count = 0
+        for data in stream:
+            elbo += evidence_lower_bound(self.model, data,
+                                         datasize=self.datasize, **kwargs)
+            count += 1
+            if count == self.batch_size:
+                self.update(elbo)
+                yield elbo
+                elbo = evidence_lower_bound(datasize=self.datasize)
+                count = 0
+
+        # Last (incomplete) minibatch.
+        if count > 0:
+            self.update(elbo)
+            yield elbo
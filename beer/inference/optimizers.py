@@ -3,13 +3,49 @@ __all__ = ['VBConjugateOptimizer', 'VBOptimizer']
 
 
 class VBConjugateOptimizer:
-    'Variational Bayes optimizer for "conjugate parameters".'
+    '''Variational Bayes optimizer for "conjugate parameters".
+
+    Args:
+        groups (list): List of mean-field groups (list of parameters).
+        lrate (float): Learning rate.
+        schedule (str or list): Which groups to update at each step.
+            If not provided, update one group per step in turn. If
+            "joint", update together the independent groups (see
+            `independent_groups`) for which the statistics of all the
+            parameters were stored since the last call to `init_step`
+            and then each of the other groups in turn. If a list of
+            list of group indices, update at each step the groups of
+            the next entry of the list (in turn).
+        independent_groups (list): Indices of the groups whose
+            statistics do not depend on the value of the parameters of
+            the other groups (required for the "joint" schedule).
+
+    Note:
+        Updating several groups from the statistics of the same pass
+        is valid only if the statistics of one group do not depend on
+        the value of the parameters of the other groups (for instance,
+        the priors of two independent latent spaces). This cannot be
+        inferred from the groups, hence the explicit declaration.
 
-    def __init__(self, groups, lrate=1.):
+    '''
+
+    def __init__(self, groups, lrate=1., schedule=None,
+                 independent_groups=None):
         # List of list of parameters. Note that we expand the list as
         # the user may pass a generator.
         self.groups = [[param for param in group] for group in groups]
         self.lrate = lrate
+        self.schedule = schedule
+        if schedule == 'joint':
+            if independent_groups is None:
+                raise ValueError('the "joint" schedule requires the '
+                                 'indices of the independent groups')
+            independent_groups = sorted(set(independent_groups))
+            others = [[idx] for idx in range(len(self.groups))
+                      if idx not in independent_groups]
+            self._joint_schedule = [entry for entry in
+                                    [independent_groups, *others] if entry]
+        self.independent_groups = independent_groups
         self.update_count = 0
 
     def state_dict(self):
@@ -19,6 +55,18 @@ class VBConjugateOptimizer:
         self.lrate = state_dict['lrate']
         self.update_count = state_dict['update_count']
 
+    def _groups_to_update(self):
+        if self.schedule is None:
+            return [self.groups[self.update_count % len(self.groups)]]
+        if self.schedule == 'joint':
+            schedule = self._joint_schedule
+            entry = schedule[self.update_count % len(schedule)]
+            return [self.groups[idx] for idx in entry
+                    if all(getattr(param, 'stats_stored', False)
+                           for param in self.groups[idx])]
+        entry = self.schedule[self.update_count % len(self.schedule)]
+        return [self.groups[idx] for idx in entry]
+
     def init_step(self):
         for group in self.groups:
             for param in group:
@@ -26,8 +74,9 @@ class VBConjugateOptimizer:
 
     def step(self):
         if len(self.groups) > 0:
-            for parameter in self.groups[self.update_count % len(self.groups)]:
-                parameter.natural_grad_update(self.lrate)
+            for group in self._groups_to_update():
+                for parameter in group:
+                    parameter.natural_grad_update(self.lrate)
         self.update_count += 1
 
 
@@ -0,0 +1,290 @@
+'State lattices of the HMM.'
+
+import numpy as np
+import torch
+
+
+__all__ = ['Lattice']
+
+
+def _viterbi_scores(graph, llhs):
+    # Best forward and backward scores of each frame and state.
+    log_trans_mat = graph.trans_log_probs
+    alphas = torch.zeros_like(llhs)
+    betas = torch.zeros_like(llhs)
+    alphas[0] = llhs[0] + graph.init_log_probs
+    for i in range(1, len(llhs)):
+        hypothesis = alphas[i - 1] + log_trans_mat.t()
+        alphas[i] = llhs[i] + hypothesis.max(dim=1)[0]
+    betas[-1] = graph.final_log_probs
+    for i in reversed(range(len(llhs) - 1)):
+        hypothesis = log_trans_mat + llhs[i + 1] + betas[i + 1]
+        betas[i] = hypothesis.max(dim=1)[0]
+    return alphas, betas
+
+
+class Lattice:
+    '''Pruned state lattice of an utterance.
+
+    The nodes of the lattice are the states of the decoding graph
+    which are (in a beam) around the best path at each frame. The
+    acoustic and the graph scores are kept separately (and unscaled) so
+    the lattice can be rescored with another acoustic scale, another
+    graph weight or even the transition probabilities of another
+    graph.
+
+    Args:
+        states (numpy.ndarray): Graph state of each node.
+        pdf_ids (numpy.ndarray): pdf id of each node.
+        frame_offsets (numpy.ndarray): The nodes of the frame t are
+            ``frame_offsets[t]:frame_offsets[t+1]``.
+        acoustic (numpy.ndarray): Acoustic log-likelihood of each node.
+        arcs (numpy.ndarray): Source and destination nodes (narcs x 2)
+            ordered by frame of the destination.
+        arc_offsets (numpy.ndarray): The arcs going to the nodes of the
+            frame t are ``arc_offsets[t]:arc_offsets[t+1]``.
+        graph_scores (numpy.ndarray): Log-probability of each arc.
+        init_scores (numpy.ndarray): Initial log-probability of the
+            nodes of the first frame.
+        final_scores (numpy.ndarray): Final log-probability of the
+            nodes of the last frame.
+
+    '''
+
+    arrays = ('states', 'pdf_ids', 'frame_offsets', 'acoustic', 'arcs',
+              'arc_offsets', 'graph_scores', 'init_scores', 'final_scores')
+
+    def __init__(self, states, pdf_ids, frame_offsets, acoustic, arcs,
+                 arc_offsets, graph_scores, init_scores, final_scores):
+        self.states = states
+        self.pdf_ids = pdf_ids
+        self.frame_offsets = frame_offsets
+        self.acoustic = acoustic
+        self.arcs = arcs
+        self.arc_offsets = arc_offsets
+        self.graph_scores = graph_scores
+        self.init_scores = init_scores
+        self.final_scores = final_scores
+
+    @classmethod
+    def from_llhs(cls, graph, llhs, beam=10., acoustic_scale=1.):
+        '''Create the lattice of an utterance.
+
+        Args:
+            graph (:any:`CompiledGraph`): Decoding graph.
+            llhs (``torch.Tensor[N, K]``): Acoustic log-likelihood per
+                frame and state.
+            beam (float): Keep the nodes and the arcs on a path whose
+                score is within the beam of the best path.
+            acoustic_scale (float): Scaling factor of the acoustic
+                scores to prune the lattice.
+
+        Returns:
+            :any:`Lattice`
+
+        '''
+        with torch.no_grad():
+            scaled_llhs = acoustic_scale * llhs
+            alphas, betas = _viterbi_scores(graph, scaled_llhs)
+            threshold = (alphas[-1] + graph.final_log_probs).max() - beam
+
+            nodes = [torch.nonzero(scores >= threshold).view(-1)
+                     for scores in alphas + betas]
+            arcs, graph_scores = [np.zeros((0, 2), dtype=np.int32)], []
+            offset = 0
+            for i in range(1, len(llhs)):
+                src, dest = nodes[i - 1], nodes[i]
+                trans = graph.trans_log_probs[src][:, dest]
+                scores = alphas[i - 1, src][:, None] + trans \
+                         + (scaled_llhs[i] + betas[i])[dest][None, :]
+                src_idxs, dest_idxs = torch.nonzero(scores >= threshold).t()
+                graph_scores.append(trans[src_idxs, dest_idxs].numpy())
+                arcs.append(np.c_[offset + src_idxs.numpy(),
+                                  offset + len(src) + dest_idxs.numpy()])
+                offset += len(src)
+
+            states = torch.cat(nodes).numpy()
+            pdf_ids = states
+            if graph.pdf_id_mapping is not None:
+                pdf_ids = np.asarray(graph.pdf_id_mapping)[states]
+            frame_offsets = np.r_[0, np.cumsum([len(n) for n in nodes])]
+            acoustic = torch.cat([llh[n] for llh, n in zip(llhs, nodes)])
+            arc_offsets = np.r_[0, np.cumsum([len(a) for a in arcs])]
+        return cls(
+            states=states.astype(np.int32),
+            pdf_ids=pdf_ids.astype(np.int32),
+            frame_offsets=frame_offsets.astype(np.int64),
+            acoustic=acoustic.numpy().astype(np.float32),
+            arcs=np.concatenate(arcs).astype(np.int32),
+            arc_offsets=arc_offsets.astype(np.int64),
+            graph_scores=np.concatenate(
+                [np.zeros(0)] + graph_scores).astype(np.float32),
+            init_scores=graph.init_log_probs[nodes[0]].numpy() \
+                .astype(np.float32),
+            final_scores=graph.final_log_probs[nodes[-1]].numpy() \
+                .astype(np.float32),
+        )
+
+    @property
+    def nframes(self):
+        return len(self.frame_offsets) - 1
+
+    def frame_nodes(self, frame):
+        'Indices of the nodes of a frame.'
+        return np.arange(self.frame_offsets[frame],
+                         self.frame_offsets[frame + 1])
+
+    def frame_arcs(self, frame):
+        'Arcs (source, destination, graph score) going to a frame.'
+        start, end = self.arc_offsets[frame], self.arc_offsets[frame + 1]
+        return self.arcs[start:end, 0], self.arcs[start:end, 1], \
+               self.graph_scores[start:end]
+
+    def rescore_graph(self, graph):
+        '''Lattice with the graph scores of another graph (with the
+        same states, e.g. a phone-loop with other unigram weights).'''
+        trans = graph.trans_log_probs.numpy()
+        states = self.states
+        arcs = self.arcs
+        return Lattice(
+            states=states,
+            pdf_ids=self.pdf_ids,
+            frame_offsets=self.frame_offsets,
+            acoustic=self.acoustic,
+            arcs=arcs,
+            arc_offsets=self.arc_offsets,
+            graph_scores=trans[states[arcs[:, 0]],
+                               states[arcs[:, 1]]].astype(np.float32),
+            init_scores=graph.init_log_probs.numpy()[
+                states[self.frame_nodes(0)]].astype(np.float32),
+            final_scores=graph.final_log_probs.numpy()[
+                states[self.frame_nodes(self.nframes - 1)]] \
+                .astype(np.float32),
+        )
+
+    def best_path(self, acoustic_scale=1., graph_scale=1.):
+        '''Best path of the lattice.
+
+        Args:
+            acoustic_scale (float): Scaling factor of the acoustic
+                scores.
+            graph_scale (float): Scaling factor of the graph scores.
+
+        Returns:
+            (list, float, float): The nodes of the path (see
+            ``states`` and ``pdf_ids`` to get the corresponding graph
+            states and pdf ids), its acoustic and graph scores
+            (unscaled).
+
+        '''
+        acoustic = acoustic_scale * self.acoustic.astype(np.float64)
+        nodes = self.frame_nodes(0)
+        scores = graph_scale * self.init_scores + acoustic[nodes]
+        backpointers = []
+        for frame in range(1, self.nframes):
+            src, dest, graph_scores = self.frame_arcs(frame)
+            offset = self.frame_offsets[frame]
+            dest = dest - offset
+            candidates = scores[src - self.frame_offsets[frame - 1]] \
+                         + graph_scale * graph_scores
+            best = np.full(self.frame_offsets[frame + 1] - offset,
+                           float('-inf'))
+            np.maximum.at(best, dest, candidates)
+            backpointer = np.zeros(len(best), dtype=np.int64)
+            is_best = candidates == best[dest]
+            backpointer[dest[is_best]] = np.nonzero(is_best)[0] \
+                                         + self.arc_offsets[frame]
+            backpointers.append(backpointer)
+            scores = best + acoustic[offset:offset + len(best)]
+        scores = scores + graph_scale * self.final_scores
+
+        last_offset = self.frame_offsets[-2]
+        path = [last_offset + int(np.argmax(scores))]
+        graph_score = float(self.final_scores[path[0] - last_offset])
+        for frame in reversed(range(1, self.nframes)):
+            backpointer = backpointers[frame - 1]
+            arc = backpointer[path[-1] - self.frame_offsets[frame]]
+            graph_score += float(self.graph_scores[arc])
+            path.append(int(self.arcs[arc, 0]))
+        path = path[::-1]
+        graph_score += float(self.init_scores[path[0]])
+        acoustic_score = float(self.acoustic[path].astype(np.float64).sum())
+        return path, acoustic_score, graph_score
+
+    def nbest(self, n, acoustic_scale=1., graph_scale=1., labels=None):
+        '''N best label sequences of the lattice.
+
+        A label is output each time the path enters a new state
+        ("labels" can restrict the output to some states, e.g. the
+        first state of each unit). The hypotheses of a node with the
+        same label sequence are merged (keeping the best one) so the N
+        best label sequences are distinct.
+
+        Args:
+            n (int): Number of hypotheses.
+            acoustic_scale (float): Scaling factor of the acoustic
+                scores.
+            graph_scale (float): Scaling factor of the graph scores.
+            labels (dict): Label of the states (by default, the state
+                itself). The states without label output nothing.
+
+        Returns:
+            list: Tuples (labels, acoustic score, graph score) ordered
+            from the best hypothesis.
+
+        '''
+        states = self.states.tolist()
+        acoustic = self.acoustic.astype(np.float64).tolist()
+        arcs = self.arcs.tolist()
+        graph_scores = self.graph_scores.astype(np.float64).tolist()
+        if labels is None:
+            labels = {state: state for state in states}
+
+        def prune(tokens):
+            # Tokens: label sequence -> (total, acoustic, graph).
+            best = sorted(tokens.items(), key=lambda item: -item[1][0])
+            return dict(best[:n])
+
+        # Tokens of the nodes of the current frame.
+        frame_tokens = []
+        for node in self.frame_nodes(0).tolist():
+            label = labels.get(states[node])
+            history = (label,) if label is not None else ()
+            init_score = float(self.init_scores[node])
+            frame_tokens.append({history: (
+                acoustic_scale * acoustic[node] + graph_scale * init_score,
+                acoustic[node], init_score)})
+
+        for frame in range(1, self.nframes):
+            offset = int(self.frame_offsets[frame])
+            prev_offset = int(self.frame_offsets[frame - 1])
+            new_tokens = [{} for _ in self.frame_nodes(frame)]
+            for arc in range(self.arc_offsets[frame],
+                             self.arc_offsets[frame + 1]):
+                src, dest = arcs[arc]
+                state = states[dest]
+                label = labels.get(state) if state != states[src] else None
+                ac_score = acoustic[dest]
+                gr_score = graph_scores[arc]
+                score = acoustic_scale * ac_score + graph_scale * gr_score
+                tokens = new_tokens[dest - offset]
+                for history, (total, ac_total, gr_total) in \
+                        frame_tokens[src - prev_offset].items():
+                    if label is not None:
+                        history = history + (label,)
+                    previous = tokens.get(history)
+                    if previous is None or previous[0] < total + score:
+                        tokens[history] = (total + score, ac_total + ac_score,
+                                           gr_total + gr_score)
+            frame_tokens = [prune(tokens) for tokens in new_tokens]
+
+        final = {}
+        for tokens, final_score in zip(frame_tokens,
+                                       self.final_scores.tolist()):
+            for history, (total, ac_total, gr_total) in tokens.items():
+                total += graph_scale * final_score
+                previous = final.get(history)
+                if previous is None or previous[0] < total:
+                    final[history] = (total, ac_total, gr_total + final_score)
+        return [(list(history), ac_total, gr_total)
+                for history, (_, ac_total, gr_total) in prune(final).items()]
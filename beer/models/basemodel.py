@@ -1,31 +1,90 @@
 import abc
 from functools import reduce
+from typing import FrozenSet, NamedTuple, Tuple
+import weakref
 import torch
 from .parameters import ConjugateBayesianParameter
 
 __all__ = ['Model', 'DiscreteLatentModel']
 
 
+# Frozen view of the structure of a model: its mean-field groups and
+# all its sub-models (itself included).
+class _ParameterRegistry(NamedTuple):
+    version: int
+    groups: Tuple
+    models: FrozenSet
+
+
 class Model(torch.nn.Module, metaclass=abc.ABCMeta):
     'Abstract base class for all the models.'
 
+    # Incremented every time the structure of any model is changed.
+    # Registries built for an older version are discarded.
+    _structure_version = 0
+
+    # Models whose cache may be populated (i.e. it was accessed since
+    # it was last cleared).
+    _cached_models = weakref.WeakSet()
+
     def __init__(self):
         super().__init__()
         self._cache = {}
 
+    # Replacing a sub-module (sub-model or parameter) changes the
+    # structure of the model.
+    def __setattr__(self, name, value):
+        if isinstance(value, torch.nn.Module) \
+                and name in self.__dict__.get('_modules', {}):
+            Model._structure_changed()
+        super().__setattr__(name, value)
+
+    # The registry is not saved with the model as the version counter
+    # is only valid within the current process.
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_registry', None)
+        return state
+
+    # A copied or loaded model may come with a populated cache.
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        if self.__dict__.get('_cache'):
+            Model._cached_models.add(self)
+
+    @staticmethod
+    def _structure_changed():
+        Model._structure_version += 1
+
+    def _parameter_registry(self):
+        registry = self.__dict__.get('_registry')
+        if registry is None or registry.version != Model._structure_version:
+            groups = tuple(tuple(group)
+                           for group in self.mean_field_factorization())
+            models = frozenset(module for module in self.modules()
+                               if isinstance(module, Model))
+            registry = _ParameterRegistry(Model._structure_version, groups,
+                                          models)
+            self.__dict__['_registry'] = registry
+        return registry
+
     @property
     def cache(self):
         '''Dictionary object used to store intermediary results while
         computing the ELBO.
 
         '''
+        Model._cached_models.add(self)
         return self._cache
 
     def clear_cache(self):
-        self._cache = {}
-        for module in self.modules():
-            if module is not self and isinstance(module, Model):
-                module.clear_cache()
+        # Only the models whose cache was accessed are visited, not all
+        # the sub-models.
+        models = self._parameter_registry().models
+        for model in [model for model in Model._cached_models
+                      if model in models]:
+            model._cache.clear()
+            Model._cached_models.discard(model)
 
     def bayesian_parameters(self, paramtype=None, paramfilter=None,
                             keepgroups=False):
@@ -48,7 +107,7 @@ class Model(torch.nn.Module, metaclass=abc.ABCMeta):
                     if paramfilter is None or paramfilter(param):
                         yield param
 
-        for group in self.mean_field_factorization():
+        for group in self._parameter_registry().groups:
             if not keepgroups:
                 yield from _yield_params(group)
             else:
@@ -102,6 +161,7 @@ class Model(torch.nn.Module, metaclass=abc.ABCMeta):
                 values are the new parameters.
         '''
         Model._replace_params(self, paramsmap)
+        Model._structure_changed()
 
     ####################################################################
     # Abstract methods to be implemented by subclasses.
@@ -2,10 +2,11 @@ from operator import mul
 import torch
 from .basemodel import DiscreteLatentModel
 from .modelset import DynamicallyOrderedModelSet
+from ..graph import StreamingViterbi
 from ..utils import onehot
 
 
-__all__ = ['HMM']
+__all__ = ['HMM', 'StreamingDecoder']
 
 
 class HMM(DiscreteLatentModel):
@@ -71,11 +72,18 @@ class HMM(DiscreteLatentModel):
 
     def expected_log_likelihood(self, stats, inference_graph=None,
                                 viterbi=True, state_path=None,
-                                scale=1.):
+                                scale=1., pc_llhs=None):
         trans_posts = True if inference_graph is None else False
         if inference_graph is None:
             inference_graph = self.graph
-        pc_llhs = scale * self._pc_llhs(stats, inference_graph)
+
+        # If the per-state log-likelihoods are given (for instance,
+        # from a cache), the emissions are considered fixed and their
+        # statistics are not accumulated.
+        self.cache['fixed_emissions'] = pc_llhs is not None
+        if pc_llhs is None:
+            pc_llhs = self._pc_llhs(stats, inference_graph)
+        pc_llhs = scale * pc_llhs
         all_resps = self._inference(pc_llhs, inference_graph, viterbi=viterbi,
                                     state_path=state_path,
                                     trans_posteriors=trans_posts)
@@ -92,6 +100,8 @@ class HMM(DiscreteLatentModel):
         return exp_llh #- kl_div
 
     def accumulate(self, stats, parent_msg=None):
+        if self.cache.get('fixed_emissions', False):
+            return {}
         scaled_resps = self.cache['scale'] * self.cache['resps']
         retval = {**self.modelset.accumulate(stats, scaled_resps)}
 
@@ -120,3 +130,136 @@ class HMM(DiscreteLatentModel):
         pc_llhs = self._pc_llhs(stats, inference_graph)
         return self._inference(pc_llhs, inference_graph)
 
+    def log_likelihood(self, data, inference_graph=None, scale=1.):
+        '''Log-likelihood of the data (forward recursion only).
+
+        Args:
+            data (``torch.Tensor[N, D]``): Features of an utterance.
+            inference_graph (:any:`CompiledGraph`): Inference graph
+                (default: the graph of the model).
+            scale (float): Scaling factor of the acoustic model.
+
+        Returns:
+            ``torch.Tensor``: scalar.
+
+        '''
+        if inference_graph is None:
+            inference_graph = self.graph
+        stats = self.sufficient_statistics(data)
+        pc_llhs = scale * self._pc_llhs(stats, inference_graph)
+        return inference_graph.log_likelihood(pc_llhs)
+
+    def local_elbo(self, data, inference_graph=None, scale=1.):
+        '''Term of the ELBO of the data (without the KL divergence of
+        the parameters): the expected log-likelihood along the best
+        path as computed by :any:`evidence_lower_bound` but without
+        storing anything for the accumulation of the statistics.
+
+        Args:
+            data (``torch.Tensor[N, D]``): Features of an utterance.
+            inference_graph (:any:`CompiledGraph`): Inference graph
+                (default: the graph of the model).
+            scale (float): Scaling factor of the acoustic model.
+
+        Returns:
+            ``torch.Tensor``: scalar.
+
+        '''
+        if inference_graph is None:
+            inference_graph = self.graph
+        stats = self.sufficient_statistics(data)
+        pc_llhs = scale * self._pc_llhs(stats, inference_graph)
+        path = inference_graph.best_path(pc_llhs)
+        return pc_llhs[torch.arange(len(pc_llhs)), path].sum()
+
+    def streaming_decoder(self, inference_graph=None, scale=1., beam=None,
+                          max_latency=None):
+        '''Decoder of a stream of features (see :any:`StreamingDecoder`).
+
+        Args:
+            inference_graph (:any:`CompiledGraph`): Decoding graph
+                (default: the graph of the model).
+            scale (float): Scaling factor of the acoustic model.
+            beam (float): Pruning threshold of the search.
+            max_latency (int): Maximum number of frames not finalized.
+
+        Returns:
+            :any:`StreamingDecoder`
+
+        '''
+        return StreamingDecoder(self, inference_graph, scale, beam,
+                                max_latency)
+
+
+class StreamingDecoder:
+    '''Most likely path of a stream of features given chunk by chunk.
+
+    Without pruning (``beam`` and ``max_latency`` not set), the
+    concatenation of the outputs is the same as :any:`HMM.decode` on
+    the whole features.
+
+    Args:
+        model (:any:`HMM`): HMM based model.
+        inference_graph (:any:`CompiledGraph`): Decoding graph
+            (default: the graph of the model).
+        scale (float): Scaling factor of the acoustic model.
+        beam (float): Pruning threshold of the search.
+        max_latency (int): Maximum number of frames not finalized.
+
+    Example:
+        >>> decoder = model.streaming_decoder(beam=20.)
+        >>> for chunk in features:
+        ...     path += decoder.process(chunk)
+        ...     print(path + decoder.partial())
+        >>> path += decoder.flush()
+
+    '''
+
+    def __init__(self, model, inference_graph=None, scale=1., beam=None,
+                 max_latency=None):
+        self.model = model
+        self.graph = inference_graph if inference_graph is not None \
+                     else model.graph
+        self.scale = scale
+        self.search = StreamingViterbi(self.graph, beam=beam,
+                                       max_latency=max_latency)
+
+    def _pdf_ids(self, path):
+        return [self.graph.pdf_id_mapping[state] for state in path]
+
+    def reset(self):
+        'Start a new stream.'
+        self.search.reset()
+
+    def process(self, chunk):
+        '''Process the next chunk of features.
+
+        Args:
+            chunk (``torch.Tensor[nframes, dim]``): Features.
+
+        Returns:
+            list: pdf ids of the newly finalized frames.
+
+        '''
+        if len(chunk) == 0:
+            return []
+        with torch.no_grad():
+            stats = self.model.sufficient_statistics(chunk)
+            pc_llhs = self.scale * self.model._pc_llhs(stats, self.graph)
+            return self._pdf_ids(self.search.process(pc_llhs))
+
+    def partial(self):
+        '''pdf ids of the frames not yet finalized according to the
+        current best hypothesis (they may change with the next
+        chunks).'''
+        return self._pdf_ids(self.search.best_partial_path())
+
+    def flush(self):
+        '''Terminate the stream.
+
+        Returns:
+            list: pdf ids of the remaining frames.
+
+        '''
+        return self._pdf_ids(self.search.flush())
+
@@ -74,8 +74,7 @@ class Mixture(DiscreteLatentModel):
 
     def mean_field_factorization(self):
         mf_groups = self.modelset.mean_field_factorization()
-        mf_groups[0].append(self.weights)
-        return mf_groups
+        return [[*mf_groups[0], self.weights], *mf_groups[1:]]
 
     def sufficient_statistics(self, data):
         return self.modelset.sufficient_statistics(data)
@@ -77,9 +77,8 @@ class MixtureSet(ModelSet):
     # Model interface.
 
     def mean_field_factorization(self):
-        retval = self.modelset.mean_field_factorization()
-        retval[0] += [self.weights]
-        return retval
+        mf_groups = self.modelset.mean_field_factorization()
+        return [[*mf_groups[0], self.weights], *mf_groups[1:]]
 
     def sufficient_statistics(self, data):
         return self.modelset.sufficient_statistics(data)
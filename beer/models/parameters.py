@@ -93,6 +93,9 @@ class ConjugateBayesianParameter(BayesianParameter):
             likelihood_fn = prior.conjugate()
         self.likelihood_fn = likelihood_fn
 
+        # True if the statistics were stored since the last reset.
+        self.stats_stored = False
+
     def __len__(self):
         if len(self.stats.shape) <= 1: return 1
         return self.stats.shape[0]
@@ -106,6 +109,7 @@ class ConjugateBayesianParameter(BayesianParameter):
     def zero_stats(self):
         'Reset the accumulated statistics to zero.'
         self.stats.zero_()
+        self.stats_stored = False
 
     def store_stats(self, acc_stats):
         '''Store the accumulated statistics.
@@ -122,6 +126,7 @@ class ConjugateBayesianParameter(BayesianParameter):
             self.stats = acc_stats.clone().detach()
         else:
             self.stats = acc_stats
+        self.stats_stored = True
 
     def natural_form(self):
         return self.posterior.expected_sufficient_statistics()
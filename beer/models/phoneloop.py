@@ -67,9 +67,8 @@ class PhoneLoop(HMM):
     # Model interface.
 
     def mean_field_factorization(self):
-        params = super().mean_field_factorization()
-        params[0] += [self.weights]
-        return params
+        mf_groups = super().mean_field_factorization()
+        return [[*mf_groups[0], self.weights], *mf_groups[1:]]
 
     def accumulate(self, stats, parent_msg=None):
         retval = super().accumulate(stats, parent_msg)
@@ -0,0 +1,162 @@
+'''Fast serialization of the models.
+
+A model is stored as a small descriptor (the model pickled without the
+data of its tensors) followed by a flat blob with the data of all the
+tensors. When loading, the blob is memory-mapped (copy-on-write) so
+the processes loading the same model on a machine share one physical
+copy of the parameters as long as they do not modify them.
+
+Layout of the file::
+
+    <magic><size><table of the storages><size><descriptor><pad><blob>
+
+The storages of the tensors are aligned on 64 bytes in the blob and
+the tensors sharing a storage (e.g. views) still share it once loaded.
+The tensors are always loaded on the CPU. Files which do not start
+with the magic string are loaded with :any:`pickle` so the models saved
+before this format are still supported.
+
+'''
+
+import io
+import pickle
+import struct
+
+import numpy as np
+import torch
+
+
+__all__ = ['is_serialized', 'load', 'save']
+
+
+MAGIC = b'BEERMDL\x01'
+ALIGNMENT = 64
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _storage_bytes(storage):
+    data = torch.empty(0, dtype=torch.uint8, device=storage.device)
+    data.set_(storage)
+    return data.cpu().numpy().tobytes()
+
+
+class _Pickler(pickle.Pickler):
+    # Replace the tensors by a reference to their storage in the blob.
+
+    def __init__(self, file):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.storages = []
+        self.table = []
+        self._storage_ids = {}
+        self._blob_size = 0
+
+    def _storage_id(self, storage):
+        key = (str(storage.device), storage.data_ptr(), storage.nbytes())
+        if key not in self._storage_ids:
+            offset = _align(self._blob_size)
+            self._storage_ids[key] = len(self.storages)
+            self.storages.append(storage)
+            self.table.append((offset, storage.nbytes()))
+            self._blob_size = offset + storage.nbytes()
+        return self._storage_ids[key]
+
+    def persistent_id(self, obj):
+        # The parameters (and the other subclasses) are pickled as
+        # usual, only their data (a plain tensor) goes into the blob.
+        if type(obj) is not torch.Tensor or obj.layout != torch.strided:
+            return None
+        storage_id = self._storage_id(obj.untyped_storage())
+        return ('tensor', storage_id, str(obj.dtype).split('.')[-1],
+                tuple(obj.shape), obj.stride(), obj.storage_offset(),
+                obj.requires_grad)
+
+
+class _Unpickler(pickle.Unpickler):
+
+    def __init__(self, file, storages):
+        super().__init__(file)
+        self.storages = storages
+
+    def persistent_load(self, pid):
+        _, storage_id, dtype, shape, stride, offset, requires_grad = pid
+        data = self.storages[storage_id].view(getattr(torch, dtype))
+        tensor = data.as_strided(shape, stride, offset)
+        if requires_grad:
+            tensor.requires_grad_(True)
+        return tensor
+
+
+def _write_record(f, data):
+    f.write(struct.pack('<Q', len(data)))
+    f.write(data)
+
+
+def _read_record(f):
+    size, = struct.unpack('<Q', f.read(8))
+    return f.read(size)
+
+
+def save(obj, path):
+    '''Save a model (or any picklable object) in the fast format.
+
+    Args:
+        obj (object): Object to save.
+        path (str): Output file.
+
+    '''
+    descriptor = io.BytesIO()
+    pickler = _Pickler(descriptor)
+    pickler.dump(obj)
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        _write_record(f, pickle.dumps(pickler.table,
+                                      protocol=pickle.HIGHEST_PROTOCOL))
+        _write_record(f, descriptor.getvalue())
+        blob_start = _align(f.tell())
+        for storage, (offset, _) in zip(pickler.storages, pickler.table):
+            f.seek(blob_start + offset)
+            f.write(_storage_bytes(storage))
+        f.truncate(max(f.tell(), blob_start))
+
+
+def is_serialized(path):
+    'True if the file has been written by :any:`save`.'
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def load(path, mmap=True):
+    '''Load a model saved with :any:`save` or with :any:`pickle`.
+
+    Args:
+        path (str): Input file.
+        mmap (boolean): Memory-map the data of the tensors instead of
+            reading it.
+
+    Returns:
+        The loaded object.
+
+    '''
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            f.seek(0)
+            return pickle.load(f)
+        table = pickle.loads(_read_record(f))
+        descriptor = _read_record(f)
+        blob_start = _align(f.tell())
+        blob_size = max([offset + size for offset, size in table], default=0)
+        if mmap and blob_size > 0:
+            blob = np.memmap(f, dtype=np.uint8, mode='c', offset=blob_start,
+                             shape=(blob_size,))
+        else:
+            f.seek(blob_start)
+            blob = np.frombuffer(bytearray(f.read(blob_size)), dtype=np.uint8)
+    # One storage per slice of the blob (and not a single storage for
+    # all the tensors) so that pickling a tensor of the loaded model
+    # does not copy the whole blob.
+    storages = [torch.from_numpy(blob[offset:offset + size])
+                for offset, size in table]
+    return _Unpickler(io.BytesIO(descriptor), storages).load()
@@ -4,6 +4,7 @@
 
 logdomain=''
 acoustic_scale=1.
+encoding=float32
 parallel_env=sge
 parallel_opts=""
 parallel_njobs=4
@@ -16,6 +17,11 @@ while [[ $# -gt $nargs ]]; do
       shift
       shift
       ;;
+      --encoding)
+      encoding=$2
+      shift
+      shift
+      ;;
       --log-domain)
       logdomain='--log'
       shift
@@ -48,6 +54,8 @@ if [ $# -ne $nargs ]; then
     echo ""
     echo "Options:"
     echo "  --acoustic-scale    acoustic model scaling factor (default: 1)"
+    echo "  --encoding          encoding of the posteriors: float32, float16,"
+    echo "                      topk or threshold (default: float32)"
     echo "  --log-domain        store the posteriors in the log domain (default: false)"
     echo "  --parallel-env      parallel environment to use (default:sge)"
     echo "  --parallel-opts     options to pass to the parallel environment"
@@ -65,8 +73,8 @@ mkdir -p $outdir
 if [ ! -f $outdir/posts.npz ]; then
     tmpdir=$(mktemp -d $outdir/tmp.XXX);
     trap 'rm -rf "$tmpdir"' EXIT
-    cmd="beer hmm posteriors $logdomain -s $acoustic_scale --utts - \
-         $model $dataset $tmpdir"
+    cmd="beer hmm posteriors $logdomain -e $encoding -s $acoustic_scale \
+         --utts - $model $dataset $tmpdir/posts_JOBID.npz"
     utils/parallel/submit_parallel.sh \
         "$parallel_env" \
         "hmm-posteriors" \
@@ -75,8 +83,9 @@ if [ ! -f $outdir/posts.npz ]; then
         "$datadir/uttids" \
         "$cmd" \
         $outdir/compute_posts || exit 1
-    find $tmpdir -name '*npy' | \
-        zip -@ -j --quiet $outdir/posts.npz || exit 1
+    # Merge the archives of the jobs (see "beer.cli.posteriors").
+    python utils/merge_posteriors.py $outdir/posts.npz $tmpdir/posts_*.npz \
+        || exit 1
 else
     echo "posteriors already computed"
 fi
@@ -0,0 +1,19 @@
+
+'Merge the archives of posteriors computed by parallel jobs.'
+
+import argparse
+
+from beer.cli.posteriors import merge_posteriors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('out', help='merged archive')
+    parser.add_argument('archives', nargs='+', help='archives to merge')
+    args = parser.parse_args()
+
+    merge_posteriors(args.archives, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -11,35 +11,33 @@
 # 1/12 by default but they have a strong language model).
 
 import argparse
-import os
-import pickle
-import sys
 
-import numpy as np
 import beer
+from beer.cli.objcache import load_object
+from beer.cli.posteriors import ENCODINGS, PosteriorsWriter
 
 
 def compute_posts(model, data, scale):
-    inference_graph = model.graph.value
-    stats = model.sufficient_statistics(data)
-    pc_llhs = model._pc_llhs(stats, inference_graph) * scale
-    return model._inference(pc_llhs, inference_graph)
+    return model.posteriors(data, scale=scale)
 
 
-def main(args):
+def main():
     parser = argparse.ArgumentParser()
+    parser.add_argument('-e', '--encoding', choices=ENCODINGS,
+                        default='float32',
+                        help='encoding of the posteriors in the archive '
+                             '(default: float32)')
     parser.add_argument('-s', '--acoustic-scale', default=1., type=float,
                         help='scaling factor of the acoustic model')
     parser.add_argument('model', help='hmm based model')
     parser.add_argument('dataset', help='training data set')
-    parser.add_argument('outdir', help='output directory')
+    parser.add_argument('out', help='output archive')
     args = parser.parse_args()
 
-    with open(args.model, 'rb') as f:
-        model = pickle.load(f)
+    model = beer.serialization.load(args.model)
+    dataset = load_object(args.dataset)
 
-    with open(args.dataset, 'rb') as f:
-        dataset = pickle.load(f)
+    writer = PosteriorsWriter(args.out, encoding=args.encoding)
 
     scale = args.acoustic_scale
     for utt in dataset.utterances(random_order=False):
@@ -51,8 +49,8 @@ def main(args):
         # To get the posterior per units you can do something like:
         # posts = posts.reshape(len(posts), n_units, -1).sum(axis=-1)
 
-        path = os.path.join(args.outdir, f'{utt.id}.npy')
-        np.save(path, posts)
+        writer.add(utt.id, posts)
+    writer.close()
 
 
 if __name__ == "__main__":
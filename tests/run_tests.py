@@ -18,12 +18,24 @@ from basetest import BaseTest
 import test_nnet
 import test_problayers
 import test_arnet
+import test_audio
+import test_commands
 import test_create_model
+import test_dataset
 import test_bayesmodel
 import test_expfamilyprior
 import test_features
+import test_graph
+import test_lattice
+import test_llhcache
 import test_mixture
+import test_objectives
+import test_optimizers
 import test_normal
+import test_pipeline
+import test_posteriors
+import test_serialization
+import test_server
 import test_hmm
 import test_subspacemodels
 import test_utils
@@ -34,13 +46,25 @@ import test_priors
 testcases = {
     'test_problayers': test_problayers,
     'test_arnet': test_arnet,
+    'test_audio': test_audio,
+    'test_commands': test_commands,
     'test_nnet': test_nnet,
     'test_features': test_features,
+    'test_graph': test_graph,
+    'test_lattice': test_lattice,
+    'test_llhcache': test_llhcache,
     'test_priors': test_priors,
     'test_bayesmodel': test_bayesmodel,
     'test_create_model': test_create_model,
+    'test_dataset': test_dataset,
     'test_mixture': test_mixture,
+    'test_objectives': test_objectives,
+    'test_optimizers': test_optimizers,
     'test_normal': test_normal,
+    'test_pipeline': test_pipeline,
+    'test_posteriors': test_posteriors,
+    'test_serialization': test_serialization,
+    'test_server': test_server,
     'test_subspacemodels': test_subspacemodels,
     'test_vae': test_vae,
     'test_utils': test_utils,
@@ -75,12 +99,24 @@ def run():
             test_problayers,
             test_nnet,
             test_arnet,
+            test_audio,
+            test_commands,
             test_bayesmodel,
+            test_dataset,
             test_expfamilyprior,
             test_features,
+            test_graph,
+            test_lattice,
+            test_llhcache,
             #test_hmm,
             test_mixture,
             test_normal,
+            test_objectives,
+            test_optimizers,
+            test_pipeline,
+            test_posteriors,
+            test_serialization,
+            test_server,
             test_subspacemodels,
             test_utils,
             test_vae,
@@ -0,0 +1,90 @@
+'Test the audio reader of the command line tools.'
+
+# pylint: disable=C0413
+# Not all the modules can be placed at the top of the files as we need
+# first to change the PYTHONPATH before to import the modules.
+import sys
+sys.path.insert(0, './')
+sys.path.insert(0, './tests')
+
+import os
+import tempfile
+import threading
+import time
+import numpy as np
+from scipy.io.wavfile import write
+from basetest import BaseTest
+from beer.cli.audio import load_wav, read_audio
+
+
+class TestReadAudio(BaseTest):
+
+    def setUp(self):
+        # The errors of the reader thread have to be reported to the
+        # consumer, not raised in the thread.
+        self.thread_errors = []
+        self.excepthook = threading.excepthook
+        threading.excepthook = self.thread_errors.append
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.signals = {}
+        self.entries = []
+        for i in range(1 + np.random.randint(10)):
+            uttid = f'utt{i}'
+            path = os.path.join(self.tmpdir.name, uttid + '.wav')
+            self.signals[uttid] = np.random.randint(-1000, 1000,
+                                                    size=100 + i,
+                                                    dtype=np.int16)
+            write(path, 16000, self.signals[uttid])
+            # Alternate the files and the commands. The first commands
+            # are the slowest to check that the order is preserved.
+            if i % 2 == 0:
+                inwav = f'sleep {.1 / (i + 1)}; cat {path} |'
+            else:
+                inwav = path
+            self.entries.append((uttid, inwav))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+        threading.excepthook = self.excepthook
+        self.assertEqual([args.exc_value for args in self.thread_errors],
+                         [])
+
+    def test_read_audio(self):
+        uttids = []
+        for uttid, source in read_audio(self.entries, max_pipes=2):
+            uttids.append(uttid)
+            srate, signal = load_wav(source)
+            self.assertEqual(srate, 16000)
+            self.assertTrue(np.all(signal == self.signals[uttid]))
+        self.assertEqual(uttids, [uttid for uttid, _ in self.entries])
+
+    def test_failed_command(self):
+        with self.assertRaises(ValueError):
+            list(read_audio(self.entries + [('bad', 'false |')]))
+
+    def test_failed_command_extra(self):
+        # The failing command is followed by other commands still
+        # running (or waiting) when the error is reported.
+        entries = [('bad', 'false |', None)]
+        entries += [(uttid, inwav, i)
+                    for i, (uttid, inwav) in enumerate(self.entries)]
+        with self.assertRaises(ValueError):
+            list(read_audio(entries, max_pipes=2))
+
+    def test_early_stop(self):
+        # Slow commands, more than the reader can buffer: the reader is
+        # blocked when the consumer stops.
+        path = os.path.join(self.tmpdir.name, 'utt0.wav')
+        entries = self.entries[:1]
+        entries += [(f'slow{i}', f'sleep 10; cat {path} |')
+                    for i in range(10)]
+        start = time.time()
+        with read_audio(entries, max_pipes=2) as reader:
+            for uttid, _ in reader:
+                self.assertEqual(uttid, self.entries[0][0])
+                break
+        self.assertLess(time.time() - start, 5)
+        self.assertFalse(reader._thread.is_alive())
+
+
+__all__ = ['TestReadAudio']
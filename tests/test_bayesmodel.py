@@ -6,6 +6,7 @@
 import sys
 sys.path.insert(0, './')
 sys.path.insert(0, './tests')
+import copy
 import glob
 import yaml
 import numpy as np
@@ -211,8 +212,57 @@ class TestBayesianModel(BaseTest):
         self.weights /= self.weights.sum()
 
 
+class TestParameterRegistry(BaseTest):
+
+    def setUp(self):
+        self.dim = int(1 + torch.randint(10, (1, 1)).item())
+        self.ncomps = int(1 + torch.randint(10, (1, 1)).item())
+        self.data = torch.randn(20, self.dim).type(self.type)
+        modelset = beer.NormalSet.create(torch.zeros(self.dim).type(self.type),
+                                         torch.ones(self.dim).type(self.type),
+                                         self.ncomps, cov_type='diagonal')
+        self.model = beer.Mixture.create(modelset)
+
+    def test_mean_field_factorization(self):
+        nparams = len(list(self.model.bayesian_parameters()))
+        for _ in range(3):
+            self.model.mean_field_factorization()
+            self.assertEqual(len(list(self.model.bayesian_parameters())),
+                             nparams)
+        self.assertEqual(nparams, 2)
+
+    def test_replace_parameters(self):
+        old_param = self.model.weights
+        new_param = beer.Mixture.create(self.model.modelset).weights
+        list(self.model.bayesian_parameters())
+        self.model.replace_parameters({old_param: new_param})
+        params = list(self.model.bayesian_parameters())
+        self.assertTrue(new_param in params)
+        self.assertFalse(old_param in params)
+
+    def test_clear_cache(self):
+        stats = self.model.sufficient_statistics(self.data)
+        self.model.expected_log_likelihood(stats)
+        self.assertTrue(len(self.model.cache) > 0)
+        self.model.clear_cache()
+        for model in self.model.modules():
+            if isinstance(model, beer.Model):
+                self.assertEqual(len(model.cache), 0)
+
+    def test_clear_cache_copy(self):
+        stats = self.model.sufficient_statistics(self.data)
+        self.model.expected_log_likelihood(stats)
+        model = copy.deepcopy(self.model)
+        model.clear_cache()
+        self.assertEqual(len(model.cache), 0)
+        self.assertTrue(len(self.model.cache) > 0)
+        self.model.clear_cache()
+        self.assertEqual(len(self.model.cache), 0)
+
+
 __all__ = [
     'TestBayesianParameter',
     'TestBayesianParameterSet',
-    'TestBayesianModel'
+    'TestBayesianModel',
+    'TestParameterRegistry'
 ]
@@ -0,0 +1,127 @@
+'Test the lazy registration of the commands.'
+
+# pylint: disable=C0413
+# Not all the modules can be placed at the top of the files as we need
+# first to change the PYTHONPATH before to import the modules.
+import sys
+sys.path.insert(0, './')
+sys.path.insert(0, './tests')
+
+import argparse
+import logging
+import os
+import subprocess
+import tempfile
+import numpy as np
+import torch
+import yaml
+from basetest import BaseTest
+import beer
+import beer.cli.subcommands as subcommands
+from beer.cli.commands import add_commands, load_command
+from beer.cli.subcommands import run
+
+
+class TestCommands(BaseTest):
+
+    def test_help_messages(self):
+        # The help messages of the table have to be the docstrings of
+        # the modules of the commands ("run" is a command, not a group).
+        for group_name in subcommands.__all__:
+            group = getattr(subcommands, group_name)
+            for name, help_msg in getattr(group, 'cmds', {}).items():
+                cmd = load_command(group.__name__, name)
+                self.assertEqual(cmd.__doc__.strip(), help_msg)
+                self.assertTrue(callable(cmd.setup))
+                self.assertTrue(callable(cmd.main))
+
+    def test_lazy_import(self):
+        code = 'import sys, beer.cli.subcommands; ' \
+               'print("torch" in sys.modules)'
+        env = dict(os.environ, PYTHONPATH=os.path.abspath('./'))
+        output = subprocess.run([sys.executable, '-c', code], env=env,
+                                capture_output=True, text=True, check=True)
+        self.assertEqual(output.stdout.strip(), 'False')
+
+    def test_parse(self):
+        parser = argparse.ArgumentParser()
+        group = subcommands.hmm
+        add_commands(parser, group.__name__, group.cmds)
+        args = parser.parse_args(['decode', '--nj', '2', 'model', 'data'])
+        self.assertEqual(args.nj, 2)
+        self.assertEqual(args.model, 'model')
+        self.assertIs(args.func, load_command(group.__name__, 'decode').main)
+
+
+class TestRun(BaseTest):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.dim = int(1 + np.random.randint(5))
+        self.utts = {f'utt{i}': np.random.randn(10 + i, self.dim)
+                     for i in range(1 + np.random.randint(5))}
+        np.savez(self.path('features.npz'), **self.utts)
+        npdfs = int(2 + np.random.randint(5))
+        modelset = beer.NormalSet.create(torch.zeros(self.dim),
+                                         torch.ones(self.dim), npdfs,
+                                         noise_std=.1, cov_type='diagonal')
+        log_probs = torch.full((npdfs,), -float(np.log(npdfs)))
+        graph = beer.graph.CompiledGraph(
+            log_probs, log_probs,
+            torch.full((npdfs, npdfs), -float(np.log(npdfs))),
+            list(range(npdfs))
+        )
+        beer.serialization.save(beer.HMM.create(graph, modelset),
+                                self.path('model.mdl'))
+        self.uttids = sorted(self.utts)[::2]
+        with open(self.path('uttids'), 'w') as f:
+            f.write('\n'.join(self.uttids) + '\n')
+        self.logger = logging.getLogger('test_run')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmpdir.name, name)
+
+    def run_script(self, script):
+        with open(self.path('script.yml'), 'w') as f:
+            yaml.safe_dump(script, f)
+        run.main(argparse.Namespace(script=self.path('script.yml')),
+                 self.logger)
+
+    def test_run(self):
+        self.run_script([
+            f'dataset create {self.tmpdir.name} {self.path("features.npz")} '
+            f'{self.path("dataset.pkl")}',
+            {'cmd': f'dataset create {self.tmpdir.name} '
+                    f'{self.path("features.npz")} {self.path("saved.pkl")}',
+             'persist': True},
+            {'cmd': f'hmm score -u - {self.path("model.mdl")} '
+                    f'{self.path("dataset.pkl")}',
+             'stdin': self.path('uttids'),
+             'stdout': self.path('scores.txt')},
+        ])
+
+        # The dataset of the first step is only kept in memory.
+        self.assertFalse(os.path.exists(self.path('dataset.pkl')))
+        self.assertTrue(os.path.exists(self.path('saved.pkl')))
+        with open(self.path('scores.txt'), 'r') as f:
+            lines = [line.split() for line in f]
+        self.assertEqual([tokens[0] for tokens in lines], self.uttids)
+        self.assertEqual([int(tokens[2]) for tokens in lines],
+                         [len(self.utts[uttid]) for uttid in self.uttids])
+
+    def test_invalid_step(self):
+        with self.assertRaises(SystemExit):
+            self.run_script([{'cmd': 'hmm score', 'unknown': True}])
+
+    def test_unsafe_script(self):
+        with open(self.path('script.yml'), 'w') as f:
+            f.write('- !!python/object/apply:os.system ["exit 1"]\n')
+        with self.assertRaises(yaml.YAMLError):
+            run.main(argparse.Namespace(script=self.path('script.yml')),
+                     self.logger)
+
+
+__all__ = ['TestCommands', 'TestRun']
@@ -0,0 +1,224 @@
+'Test the features archives of the command line tools.'
+
+# pylint: disable=C0413
+# Not all the modules can be placed at the top of the files as we need
+# first to change the PYTHONPATH before to import the modules.
+import sys
+sys.path.insert(0, './')
+sys.path.insert(0, './tests')
+
+import os
+import struct
+import tempfile
+import numpy as np
+import torch
+from basetest import BaseTest
+from beer.cli.compression import compress, decompress
+from beer.cli.dataset import Dataset, FrameBatchIterator, Utterance
+from beer.cli.feacache import FeatureCache
+from beer.cli.feastore import FeatureStore, FeatureStoreWriter, \
+    is_feature_store, load_features
+from beer.cli.kaldi import KaldiArchive, matrix_end, read_matrix
+
+
+class TestFeatureStore(BaseTest):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'features.fea')
+        dim = int(1 + np.random.randint(10))
+        self.feats = {
+            f'utt{i}': np.random.randn(1 + np.random.randint(50), dim)
+            for i in range(1 + np.random.randint(10))
+        }
+        with FeatureStoreWriter(self.path) as writer:
+            for uttid, feats in self.feats.items():
+                writer.add(uttid, feats)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_read(self):
+        store = FeatureStore(self.path)
+        self.assertEqual(len(store), len(self.feats))
+        self.assertEqual(store.files, list(self.feats.keys()))
+        for uttid, feats in self.feats.items():
+            self.assertEqual(store[uttid].dtype, np.float32)
+            self.assertTrue(np.allclose(store[uttid], feats, atol=1e-6))
+
+    def test_compressed(self):
+        path = os.path.join(self.tmpdir.name, 'compressed.fea')
+        with FeatureStoreWriter(path, compression='int16') as writer:
+            for uttid, feats in self.feats.items():
+                writer.add(uttid, feats)
+        store = FeatureStore(path)
+        for uttid, feats in self.feats.items():
+            self.assertEqual(store[uttid].dtype, np.float32)
+            self.assertTrue(np.allclose(store[uttid], feats, atol=1e-3))
+
+    def test_load_features(self):
+        self.assertTrue(is_feature_store(self.path))
+        self.assertIsInstance(load_features(self.path), FeatureStore)
+        npz_path = os.path.join(self.tmpdir.name, 'features.npz')
+        np.savez(npz_path, **self.feats)
+        self.assertFalse(is_feature_store(npz_path))
+        self.assertEqual(len(load_features(npz_path).files), len(self.feats))
+
+
+class TestFeatureCache(BaseTest):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cachedir = os.path.join(self.tmpdir.name, 'cache')
+        self.wav = os.path.join(self.tmpdir.name, 'utt.wav')
+        with open(self.wav, 'wb') as f:
+            f.write(os.urandom(100))
+        self.features = np.random.randn(10, 3)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_cache(self):
+        cache = FeatureCache(self.cachedir, {'nfilters': 26})
+        key = cache.key(self.wav)
+        self.assertNotIn(key, cache)
+        cache[key] = self.features
+        self.assertIn(key, cache)
+        self.assertTrue(np.all(cache[key] == self.features))
+
+    def test_key(self):
+        cache1 = FeatureCache(self.cachedir, {'nfilters': 26})
+        cache2 = FeatureCache(self.cachedir, {'nfilters': 40})
+        self.assertEqual(cache1.key(self.wav), cache1.key(self.wav))
+        self.assertNotEqual(cache1.key(self.wav), cache2.key(self.wav))
+        self.assertNotEqual(cache1.key(self.wav),
+                            cache1.key(f'cat {self.wav} |'))
+        key = cache1.key(self.wav)
+        with open(self.wav, 'ab') as f:
+            f.write(b'0')
+        self.assertNotEqual(cache1.key(self.wav), key)
+
+
+class TestCompression(BaseTest):
+
+    def setUp(self):
+        nframes = int(1 + np.random.randint(100))
+        dim = int(1 + np.random.randint(40))
+        self.features = np.random.randn(nframes, dim).astype(np.float32)
+        self.range = self.features.max() - self.features.min()
+
+    def test_int8(self):
+        features = decompress(compress(self.features, 'int8'))
+        self.assertEqual(features.shape, self.features.shape)
+        self.assertEqual(features.dtype, np.float32)
+        # The maximum error depends on the distribution of each column.
+        self.assertTrue(np.abs(features - self.features).max() < self.range / 10)
+
+    def test_int16(self):
+        features = decompress(compress(self.features, 'int16'))
+        self.assertEqual(features.shape, self.features.shape)
+        self.assertTrue(np.abs(features - self.features).max() <= self.range / 65535)
+
+
+class TestKaldiArchive(BaseTest):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.ark = os.path.join(self.tmpdir.name, 'feats.ark')
+        self.scp = os.path.join(self.tmpdir.name, 'feats.scp')
+        dim = int(1 + np.random.randint(10))
+        self.feats = {
+            f'utt{i}': np.random.randn(1 + np.random.randint(50), dim)
+            for i in range(1 + np.random.randint(10))
+        }
+
+        # Same layout as the Kaldi tools (e.g. "copy-feats").
+        with open(self.ark, 'wb') as ark, open(self.scp, 'w') as scp:
+            for i, (uttid, feats) in enumerate(self.feats.items()):
+                ark.write(uttid.encode('utf-8') + b' ')
+                print(f'{uttid} {self.ark}:{ark.tell()}', file=scp)
+                ark.write(b'\0B')
+                if i % 2 == 0:
+                    ark.write(compress(feats, 'int16'))
+                else:
+                    ark.write(b'FM \x04' + struct.pack('<i', feats.shape[0]))
+                    ark.write(b'\x04' + struct.pack('<i', feats.shape[1]))
+                    ark.write(feats.astype('<f4').tobytes())
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_read(self):
+        for path in [self.scp, self.ark]:
+            archive = load_features(path)
+            self.assertIsInstance(archive, KaldiArchive)
+            self.assertEqual(archive.files, list(self.feats.keys()))
+            for uttid, feats in self.feats.items():
+                self.assertEqual(archive[uttid].dtype, np.float32)
+                self.assertTrue(np.allclose(archive[uttid], feats, atol=1e-3))
+
+    def test_index(self):
+        # The records of the "ark" file are indexed from their header
+        # only: same offsets as in the "scp" file.
+        self.assertEqual(KaldiArchive(self.ark).index,
+                         KaldiArchive(self.scp).index)
+        with open(self.ark, 'rb') as f:
+            buffer = f.read()
+        for path, offset in KaldiArchive(self.scp).index.values():
+            self.assertEqual(matrix_end(buffer, offset),
+                             read_matrix(buffer, offset)[1])
+
+
+class TestPrefetchIterator(BaseTest):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'features.npz')
+        dim = int(1 + np.random.randint(10))
+        self.feats = {
+            f'utt{i}': np.random.randn(1 + np.random.randint(50), dim)
+            for i in range(1 + np.random.randint(20))
+        }
+        np.savez(self.path, **self.feats)
+        self.dataset = Dataset(self.path, None, None, None)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_prefetch(self):
+        uttids = list(self.feats.keys())
+        np.random.shuffle(uttids)
+        utts = self.dataset.utterances(uttids=iter(uttids), prefetch=3,
+                                       num_workers=2)
+        self.assertEqual([utt.id for utt in utts], uttids)
+        for utt in self.dataset.utterances(prefetch=2):
+            self.assertTrue(np.allclose(utt.features.numpy(),
+                                        self.feats[utt.id]))
+
+
+class TestFrameBatchIterator(BaseTest):
+
+    def setUp(self):
+        self.batch_size = int(1 + np.random.randint(20))
+        self.buffer_size = int(1 + np.random.randint(100))
+        self.utts = [Utterance(f'utt{i}', torch.randn(1 + np.random.randint(50), 2))
+                     for i in range(1 + np.random.randint(20))]
+
+    def test_batches(self):
+        batches = list(FrameBatchIterator(self.utts, self.batch_size,
+                                          self.buffer_size))
+        self.assertTrue(all(len(batch) == self.batch_size
+                            for batch in batches[:-1]))
+        self.assertTrue(0 < len(batches[-1]) <= self.batch_size)
+
+        # Each frame is drawn exactly once.
+        frames = torch.cat([utt.features for utt in self.utts])
+        drawn = torch.cat(batches)
+        self.assertEqual(len(drawn), len(frames))
+        self.assertTrue(torch.allclose(drawn.sum(dim=0), frames.sum(dim=0),
+                                       atol=1e-4))
+
+
+__all__ = ['TestFeatureStore', 'TestFeatureCache', 'TestCompression',
+           'TestKaldiArchive', 'TestPrefetchIterator',
+           'TestFrameBatchIterator']
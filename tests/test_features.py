@@ -9,7 +9,9 @@ sys.path.insert(0, './tests')
 
 import beer
 import numpy as np
+import torch
 from basetest import BaseTest
+from beer.cli.subcommands.features.extract import extract_features, feaconf
 
 
 class TestFbank(BaseTest):
@@ -28,4 +30,73 @@ class TestFbank(BaseTest):
         self.assertTrue(np.allclose(ref_fea, fea_d_dd))
 
 
-__all__ = ['TestFbank']
+class TestBatchFeatureExtractor(BaseTest):
+
+    def setUp(self):
+        self.extractor = beer.features.BatchFeatureExtractor(
+            dtype=torch.float64)
+        s_t = np.load('tests/audio.npy')
+        self.signals = [s_t, s_t[:len(s_t) // 2], s_t[:len(s_t) // 3]]
+
+    def test_batch(self):
+        features, lengths = self.extractor(self.signals)
+        self.assertEqual(features.shape[-1], self.extractor.dim)
+        for i, signal in enumerate(self.signals):
+            self.assertEqual(lengths[i], self.extractor.nframes(len(signal)))
+            utt_features, _ = self.extractor([signal])
+            self.assertArraysAlmostEqual(features[i, :lengths[i]].numpy(),
+                                         utt_features[0].numpy())
+            self.assertTrue(bool((features[i, lengths[i]:] == 0).all()))
+
+    def test_extract_features(self):
+        # Same features as the (per utterance) "features extract"
+        # command with its default configuration.
+        extractor = beer.features.BatchFeatureExtractor(**feaconf,
+                                                        dtype=torch.float64)
+        dct_bases = beer.features.compute_dct_bases(feaconf['nfilters'],
+                                                    feaconf['n_dct_coeff'])
+        features, lengths = extractor(self.signals)
+        for i, signal in enumerate(self.signals):
+            ref = extract_features(signal, feaconf, dct_bases)
+            self.assertEqual(int(lengths[i]), len(ref))
+            self.assertArraysAlmostEqual(features[i, :lengths[i]].numpy(),
+                                         ref)
+
+    def test_deltas(self):
+        features = torch.randn(2, 50, 3, dtype=torch.float64)
+        lengths = torch.tensor([50, 20])
+        fea_d_dd = self.extractor.deltas(features, lengths)
+        for i in range(2):
+            ref = beer.features.add_deltas(features[i, :lengths[i]].numpy())
+            self.assertArraysAlmostEqual(fea_d_dd[i, :lengths[i]].numpy(), ref)
+
+
+class TestStreamingFeatureExtractor(BaseTest):
+
+    def setUp(self):
+        self.extractor = beer.features.BatchFeatureExtractor(
+            remove_dc=False, dtype=torch.float64)
+        self.signal = np.load('tests/audio.npy')
+        self.chunk_size = int(1 + torch.randint(2000, (1, 1)).item())
+
+    def stream(self, online_mnorm=False):
+        stream = beer.features.StreamingFeatureExtractor(
+            self.extractor, online_mnorm=online_mnorm)
+        features = [stream.process(self.signal[i: i + self.chunk_size])
+                    for i in range(0, len(self.signal), self.chunk_size)]
+        return torch.cat(features + [stream.flush()])
+
+    def test_process(self):
+        ref, _ = self.extractor([self.signal])
+        self.assertArraysAlmostEqual(self.stream().numpy(), ref[0].numpy())
+
+    def test_online_mnorm(self):
+        ref, _ = self.extractor([self.signal])
+        ref = ref[0]
+        counts = torch.arange(1, len(ref) + 1, dtype=ref.dtype)
+        ref = ref - ref.cumsum(dim=0) / counts[:, None]
+        self.assertArraysAlmostEqual(self.stream(True).numpy(), ref.numpy())
+
+
+__all__ = ['TestFbank', 'TestBatchFeatureExtractor',
+           'TestStreamingFeatureExtractor']
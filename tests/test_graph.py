@@ -0,0 +1,89 @@
+'Test the inference graph.'
+
+# pylint: disable=C0413
+# Not all the modules can be placed at the top of the files as we need
+# first to change the PYTHONPATH before to import the modules.
+import sys
+sys.path.insert(0, './')
+sys.path.insert(0, './tests')
+
+import numpy as np
+import torch
+from basetest import BaseTest
+from beer.graph import CompiledGraph, StreamingViterbi
+
+
+class TestStreamingViterbi(BaseTest):
+
+    def setUp(self):
+        self.nstates = int(1 + np.random.randint(20))
+        self.npoints = int(1 + np.random.randint(200))
+        trans_mat = torch.rand(self.nstates, self.nstates) ** 4
+        trans_mat /= trans_mat.sum(dim=1, keepdim=True)
+        init_probs = torch.rand(self.nstates)
+        final_probs = torch.rand(self.nstates)
+        self.graph = CompiledGraph((init_probs / init_probs.sum()).log(),
+                                   (final_probs / final_probs.sum()).log(),
+                                   trans_mat.log(),
+                                   list(range(self.nstates)))
+        self.llhs = 3 * torch.randn(self.npoints, self.nstates).type(self.type)
+        self.graph = self.graph.type(self.type)
+
+    def chunks(self):
+        start = 0
+        while start < self.npoints:
+            size = int(np.random.randint(20))
+            yield self.llhs[start:start + size]
+            start += size
+
+    def test_best_path(self):
+        search = StreamingViterbi(self.graph)
+        path, nframes = [], 0
+        for chunk in self.chunks():
+            path += search.process(chunk)
+            nframes += len(chunk)
+            self.assertEqual(len(path) + search.n_pending, nframes)
+            self.assertEqual(len(search.best_partial_path()),
+                             search.n_pending)
+        path += search.flush()
+        self.assertEqual(path, [int(state)
+                                for state in self.graph.best_path(self.llhs)])
+
+    def test_max_latency(self):
+        max_latency = int(np.random.randint(10))
+        search = StreamingViterbi(self.graph, beam=5.,
+                                  max_latency=max_latency)
+        path = []
+        for chunk in self.chunks():
+            path += search.process(chunk)
+            self.assertLessEqual(search.n_pending, max_latency)
+        path += search.flush()
+        self.assertEqual(len(path), self.npoints)
+        self.assertEqual(search.n_pending, 0)
+
+
+class TestCompiledGraph(BaseTest):
+
+    def setUp(self):
+        self.nstates = int(1 + np.random.randint(20))
+        self.npoints = int(1 + np.random.randint(200))
+        trans_mat = torch.rand(self.nstates, self.nstates)
+        trans_mat /= trans_mat.sum(dim=1, keepdim=True)
+        init_probs = torch.rand(self.nstates)
+        final_probs = torch.rand(self.nstates)
+        self.graph = CompiledGraph((init_probs / init_probs.sum()).log(),
+                                   (final_probs / final_probs.sum()).log(),
+                                   trans_mat.log(),
+                                   list(range(self.nstates)))
+        self.llhs = 3 * torch.randn(self.npoints, self.nstates).type(self.type)
+        self.graph = self.graph.type(self.type)
+
+    def test_log_likelihood(self):
+        log_alphas = self.graph._baum_welch_forward(self.llhs)
+        expected = torch.logsumexp(log_alphas[-1] + self.graph.final_log_probs,
+                                   dim=0)
+        llh = self.graph.log_likelihood(self.llhs)
+        self.assertAlmostEqual(float(llh), float(expected), places=self.tolplaces)
+
+
+__all__ = ['TestStreamingViterbi', 'TestCompiledGraph']
@@ -0,0 +1,105 @@
+'Test the lattices.'
+
+# pylint: disable=C0413
+# Not all the modules can be placed at the top of the files as we need
+# first to change the PYTHONPATH before to import the modules.
+import sys
+sys.path.insert(0, './')
+sys.path.insert(0, './tests')
+
+from itertools import groupby, product
+import os
+import tempfile
+import numpy as np
+import torch
+from basetest import BaseTest
+from beer.graph import CompiledGraph
+from beer.lattice import Lattice
+from beer.cli.lattices import LatticeWriter, load_lattices
+
+
+def create_graph(nstates):
+    trans_mat = torch.rand(nstates, nstates) ** 4
+    trans_mat /= trans_mat.sum(dim=1, keepdim=True)
+    init_probs = torch.rand(nstates)
+    final_probs = torch.rand(nstates)
+    return CompiledGraph((init_probs / init_probs.sum()).log(),
+                         (final_probs / final_probs.sum()).log(),
+                         trans_mat.log(), list(range(nstates)))
+
+
+def path_scores(graph, llhs, path):
+    graph_score = graph.init_log_probs[path[0]] \
+        + graph.final_log_probs[path[-1]] \
+        + sum(graph.trans_log_probs[src, dest]
+              for src, dest in zip(path[:-1], path[1:]))
+    return float(llhs[range(len(path)), list(path)].sum()), float(graph_score)
+
+
+class TestLattice(BaseTest):
+
+    def setUp(self):
+        self.nstates = int(1 + np.random.randint(10))
+        self.npoints = int(1 + np.random.randint(50))
+        self.graph = create_graph(self.nstates)
+        self.llhs = torch.randn(self.npoints, self.nstates)
+        self.acoustic_scale = float(.1 + np.random.rand())
+
+    def test_best_path(self):
+        lattice = Lattice.from_llhs(self.graph, self.llhs, beam=5.)
+        path, acoustic, graph_score = lattice.best_path()
+        best_path = [int(state) for state in self.graph.best_path(self.llhs)]
+        self.assertEqual(lattice.states[path].tolist(), best_path)
+        expected = path_scores(self.graph, self.llhs, best_path)
+        self.assertAlmostEqual(acoustic, expected[0], places=3)
+        self.assertAlmostEqual(graph_score, expected[1], places=3)
+
+    def test_rescore(self):
+        lattice = Lattice.from_llhs(self.graph, self.llhs, beam=1e6)
+        path, _, _ = lattice.best_path(acoustic_scale=self.acoustic_scale)
+        best_path = self.graph.best_path(self.acoustic_scale * self.llhs)
+        self.assertEqual(lattice.states[path].tolist(),
+                         [int(state) for state in best_path])
+
+        graph = create_graph(self.nstates)
+        path, _, _ = lattice.rescore_graph(graph).best_path()
+        self.assertEqual(lattice.states[path].tolist(),
+                         [int(state) for state in graph.best_path(self.llhs)])
+
+    def test_nbest(self):
+        nstates, npoints = 3, 5
+        graph = create_graph(nstates)
+        llhs = torch.randn(npoints, nstates)
+
+        # Best score of each sequence of states (without repetition).
+        best = {}
+        for path in product(range(nstates), repeat=npoints):
+            acoustic, graph_score = path_scores(graph, llhs, path)
+            labels = tuple(state for state, _ in groupby(path))
+            best[labels] = max(best.get(labels, float('-inf')),
+                               acoustic + graph_score)
+        expected = sorted(best.values(), reverse=True)[:5]
+
+        lattice = Lattice.from_llhs(graph, llhs, beam=1e6)
+        nbest = lattice.nbest(5)
+        self.assertEqual(len(set(tuple(labels) for labels, _, _ in nbest)),
+                         len(nbest))
+        for (labels, acoustic, graph_score), score in zip(nbest, expected):
+            self.assertAlmostEqual(acoustic + graph_score, score, places=3)
+            self.assertAlmostEqual(best[tuple(labels)], score, places=3)
+
+    def test_archive(self):
+        lattice = Lattice.from_llhs(self.graph, self.llhs, beam=5.)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'lattices.npz')
+            with LatticeWriter(path, start_pdf={'a': 0}) as writer:
+                writer.add('utt1', lattice)
+            archive = load_lattices(path)
+            self.assertEqual(archive.files, ['utt1'])
+            self.assertEqual(archive.start_pdf, {'a': 0})
+            for name in Lattice.arrays:
+                self.assertTrue(np.all(getattr(archive['utt1'], name) ==
+                                       getattr(lattice, name)))
+
+
+__all__ = ['TestLattice']
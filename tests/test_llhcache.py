@@ -0,0 +1,82 @@
+'Test the log-likelihoods cache of the command line tools.'
+
+# pylint: disable=C0413
+# Not all the modules can be placed at the top of the files as we need
+# first to change the PYTHONPATH before to import the modules.
+import sys
+sys.path.insert(0, './')
+sys.path.insert(0, './tests')
+
+import tempfile
+import numpy as np
+import torch
+import beer
+from basetest import BaseTest
+from beer.cli.llhcache import LogLikelihoodCache, emission_version
+
+
+class TestLogLikelihoodCache(BaseTest):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        dim = int(1 + np.random.randint(5))
+        npdfs = int(2 + np.random.randint(5))
+        modelset = beer.NormalSet.create(torch.zeros(dim), torch.ones(dim),
+                                         npdfs, noise_std=.1,
+                                         cov_type='diagonal')
+        nstates = int(1 + np.random.randint(2 * npdfs))
+        log_probs = torch.full((nstates,), -float(np.log(nstates)))
+        graph = beer.graph.CompiledGraph(
+            log_probs, log_probs,
+            torch.full((nstates, nstates), -float(np.log(nstates))),
+            list(np.random.randint(npdfs, size=nstates))
+        )
+        self.model = beer.HMM.create(graph, modelset)
+        self.features = torch.randn(int(1 + np.random.randint(50)), dim)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_pc_llhs(self):
+        cache = LogLikelihoodCache(self.tmpdir.name, self.model)
+        graph = self.model.graph
+        stats = self.model.sufficient_statistics(self.features)
+        expected = self.model._pc_llhs(stats, graph)
+        self.assertArraysAlmostEqual(
+            cache.pc_llhs(self.features, graph).numpy(), expected.numpy())
+        self.assertIn(cache.key(self.features), cache)
+        self.assertArraysAlmostEqual(
+            cache.pc_llhs(self.features, graph).numpy(), expected.numpy())
+        self.assertNotIn(cache.key(self.features, scale=.5), cache)
+
+    def test_version(self):
+        version = emission_version(self.model.modelset)
+        optim = beer.VBConjugateOptimizer(
+            self.model.conjugate_bayesian_parameters(keepgroups=True))
+        optim.init_step()
+        beer.evidence_lower_bound(self.model, self.features).backward()
+        optim.step()
+        self.assertNotEqual(emission_version(self.model.modelset), version)
+
+    def test_fixed_emissions(self):
+        cache = LogLikelihoodCache(self.tmpdir.name, self.model)
+        pc_llhs = cache.pc_llhs(self.features, self.model.graph)
+        elbo1 = beer.evidence_lower_bound(self.model, self.features)
+        elbo2 = beer.evidence_lower_bound(self.model, self.features,
+                                          pc_llhs=pc_llhs)
+        self.assertAlmostEqual(float(elbo1), float(elbo2), places=3)
+
+        # No statistics for the emissions: they are not updated.
+        version = emission_version(self.model.modelset)
+        groups = list(self.model.conjugate_bayesian_parameters(
+            keepgroups=True))
+        optim = beer.VBConjugateOptimizer(
+            groups, schedule='joint',
+            independent_groups=range(len(groups)))
+        optim.init_step()
+        elbo2.backward()
+        optim.step()
+        self.assertEqual(emission_version(self.model.modelset), version)
+
+
+__all__ = ['TestLogLikelihoodCache']
@@ -0,0 +1,48 @@
+'Test the objective functions of the VB inference.'
+
+# pylint: disable=C0413
+# Not all the modules can be placed at the top of the files as we need
+# first to change the PYTHONPATH before to import the modules.
+import sys
+sys.path.insert(0, './')
+sys.path.insert(0, './tests')
+
+import torch
+import beer
+from basetest import BaseTest
+
+
+def create_mixture(dim, ncomps, type_t):
+    modelset = beer.NormalSet.create(torch.zeros(dim).type(type_t),
+                                     torch.ones(dim).type(type_t), ncomps,
+                                     cov_type='diagonal')
+    return beer.Mixture.create(modelset)
+
+
+class TestEvidenceLowerBound(BaseTest):
+
+    def setUp(self):
+        self.dim = int(1 + torch.randint(10, (1, 1)).item())
+        self.ncomps = int(1 + torch.randint(10, (1, 1)).item())
+        self.npoints = int(1 + torch.randint(100, (1, 1)).item())
+        self.data = torch.randn(self.npoints, self.dim).type(self.type)
+        self.model = create_mixture(self.dim, self.ncomps, self.type)
+
+    def test_no_grad_auto(self):
+        elbo = beer.evidence_lower_bound(self.model, self.data)
+        self.assertTrue(isinstance(elbo.value, float))
+
+    def test_no_grad_same_value(self):
+        elbo1 = beer.evidence_lower_bound(self.model, self.data,
+                                          no_grad=False)
+        elbo2 = beer.evidence_lower_bound(self.model, self.data,
+                                          no_grad=True)
+        self.assertAlmostEqual(float(elbo1), float(elbo2),
+                               places=self.tolplaces)
+        for param in self.model.bayesian_parameters():
+            self.assertArraysAlmostEqual(elbo1._acc_stats[param].numpy(),
+                                         elbo2._acc_stats[param].numpy())
+            self.assertFalse(elbo2._acc_stats[param].requires_grad)
+
+
+__all__ = ['TestEvidenceLowerBound']
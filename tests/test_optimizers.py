@@ -0,0 +1,136 @@
+'Test the optimizers of the VB inference.'
+
+# pylint: disable=C0413
+# Not all the modules can be placed at the top of the files as we need
+# first to change the PYTHONPATH before to import the modules.
+import sys
+sys.path.insert(0, './')
+sys.path.insert(0, './tests')
+
+import copy
+import torch
+import beer
+from basetest import BaseTest
+
+
+class TestVBConjugateOptimizer(BaseTest):
+
+    def setUp(self):
+        self.dim = int(1 + torch.randint(10, (1, 1)).item())
+        self.npoints = int(1 + torch.randint(100, (1, 1)).item())
+        self.data = torch.randn(self.npoints, self.dim).type(self.type)
+        mean = torch.zeros(self.dim).type(self.type)
+        cov = torch.ones(self.dim).type(self.type)
+        self.models = [beer.Normal.create(mean, cov, cov_type='diagonal')
+                       for _ in range(3)]
+        self.groups = [[model.mean_precision] for model in self.models]
+
+    def posteriors(self):
+        return [model.mean_precision.posterior.natural_parameters().clone()
+                for model in self.models]
+
+    def run_step(self, schedule, nmodels_with_stats, independent=None,
+                 nsteps=1):
+        optim = beer.VBConjugateOptimizer(self.groups, schedule=schedule,
+                                          independent_groups=independent)
+        for _ in range(nsteps):
+            optim.init_step()
+            for model in self.models[:nmodels_with_stats]:
+                beer.evidence_lower_bound(model, self.data).backward()
+            before = self.posteriors()
+            optim.step()
+            after = self.posteriors()
+        return [not torch.allclose(p1, p2) for p1, p2 in zip(before, after)]
+
+    def test_default_schedule(self):
+        self.assertEqual(self.run_step(None, 3), [True, False, False])
+
+    def test_joint_schedule(self):
+        self.assertEqual(self.run_step('joint', 3, [0, 1, 2]),
+                         [True, True, True])
+
+    def test_joint_schedule_missing_stats(self):
+        self.assertEqual(self.run_step('joint', 2, [0, 1, 2]),
+                         [True, True, False])
+
+    def test_joint_schedule_dependent_groups(self):
+        # The groups 1 and 2 are not declared independent: they are
+        # updated one after the other, never with the other groups.
+        self.assertEqual(self.run_step('joint', 3, [0]),
+                         [True, False, False])
+        self.assertEqual(self.run_step('joint', 3, [0], nsteps=2),
+                         [False, True, False])
+        self.assertEqual(self.run_step('joint', 3, [0], nsteps=3),
+                         [False, False, True])
+
+    def test_joint_schedule_undeclared(self):
+        with self.assertRaises(ValueError):
+            beer.VBConjugateOptimizer(self.groups, schedule='joint')
+
+    def test_explicit_schedule(self):
+        self.assertEqual(self.run_step([[0, 2], [1]], 3), [True, False, True])
+
+
+class TestOnlineVBTrainer(BaseTest):
+
+    def setUp(self):
+        self.dim = int(1 + torch.randint(10, (1, 1)).item())
+        self.nutts = int(1 + torch.randint(20, (1, 1)).item())
+        self.batch_size = int(1 + torch.randint(5, (1, 1)).item())
+        self.utts = [torch.randn(10, self.dim).type(self.type)
+                     for _ in range(self.nutts)]
+        mean = torch.zeros(self.dim).type(self.type)
+        cov = torch.ones(self.dim).type(self.type)
+        self.model = beer.Normal.create(mean, cov, cov_type='diagonal')
+
+    def test_robbins_monro_lrate(self):
+        self.assertAlmostEqual(beer.robbins_monro_lrate(0), 1.)
+        self.assertAlmostEqual(beer.robbins_monro_lrate(3, 1., .5), .5)
+
+    def test_train(self):
+        trainer = beer.OnlineVBTrainer(self.model, 10 * self.nutts,
+                                       batch_size=self.batch_size)
+        elbos = list(trainer.train(iter(self.utts)))
+        nupdates = -(-self.nutts // self.batch_size)
+        self.assertEqual(len(elbos), nupdates)
+        self.assertEqual(trainer.update_count, nupdates)
+        self.assertAlmostEqual(trainer.optim.lrate,
+                               beer.robbins_monro_lrate(nupdates - 1))
+
+    def posterior(self, model):
+        return model.mean_precision.posterior.natural_parameters().clone()
+
+    def test_trained_model(self):
+        datasize = 10 * self.nutts
+        list(beer.OnlineVBTrainer(self.model, datasize).train(self.utts))
+        trained = self.posterior(self.model)
+
+        # Update from scratch (learning rate of 1): the statistics of the
+        # model are replaced with the ones of the minibatch.
+        model = copy.deepcopy(self.model)
+        list(beer.OnlineVBTrainer(model, datasize).train(self.utts[:1]))
+        replaced = self.posterior(model)
+
+        # The schedule is resumed: the model only moves partway.
+        trainer = beer.OnlineVBTrainer(self.model, datasize,
+                                       prior_steps=self.nutts)
+        list(trainer.train(self.utts[:1]))
+        lrate = beer.robbins_monro_lrate(self.nutts)
+        self.assertAlmostEqual(trainer.optim.lrate, lrate)
+        self.assertLess(lrate, 1.)
+        self.assertArraysAlmostEqual(
+            self.posterior(self.model).numpy(),
+            ((1 - lrate) * trained + lrate * replaced).numpy())
+
+    def test_state_dict(self):
+        trainer = beer.OnlineVBTrainer(self.model, 10 * self.nutts,
+                                       prior_steps=self.nutts)
+        list(trainer.train(iter(self.utts)))
+        state = trainer.state_dict()
+        trainer = beer.OnlineVBTrainer(self.model, 10 * self.nutts)
+        trainer.load_state_dict(state)
+        self.assertEqual(trainer.prior_steps, self.nutts)
+        self.assertEqual(trainer.update_count, self.nutts)
+
+
+__all__ = ['TestVBConjugateOptimizer', 'TestOnlineVBTrainer']
@@ -0,0 +1,39 @@
+'Test the parallel processing of a stream of items.'
+
+# pylint: disable=C0413
+# Not all the modules can be placed at the top of the files as we need
+# first to change the PYTHONPATH before to import the modules.
+import sys
+sys.path.insert(0, './')
+sys.path.insert(0, './tests')
+
+import math
+import numpy as np
+from basetest import BaseTest
+from beer.cli.pipeline import ordered_map
+
+
+class TestOrderedMap(BaseTest):
+
+    def setUp(self):
+        self.items = list(np.random.rand(1 + np.random.randint(100)))
+        self.nj = int(1 + np.random.randint(4))
+
+    def test_ordered_map(self):
+        results = list(ordered_map(math.sqrt, iter(self.items), nj=self.nj))
+        self.assertEqual(results, [math.sqrt(item) for item in self.items])
+
+    def test_bounded(self):
+        consumed = 0
+        def items():
+            nonlocal consumed
+            for item in self.items:
+                consumed += 1
+                yield item
+        results = ordered_map(math.sqrt, items(), nj=self.nj, max_pending=2)
+        next(results)
+        self.assertLessEqual(consumed, 2)
+        results.close()
+
+
+__all__ = ['TestOrderedMap']
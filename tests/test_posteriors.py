@@ -0,0 +1,81 @@
+'Test the posteriors archives of the command line tools.'
+
+# pylint: disable=C0413
+# Not all the modules can be placed at the top of the files as we need
+# first to change the PYTHONPATH before to import the modules.
+import sys
+sys.path.insert(0, './')
+sys.path.insert(0, './tests')
+
+import os
+import tempfile
+import numpy as np
+from basetest import BaseTest
+from beer.cli.posteriors import PosteriorsWriter, load_posteriors, \
+    merge_posteriors
+
+
+class TestPosteriorsArchive(BaseTest):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'posts.npz')
+        dim = int(2 + np.random.randint(10))
+        self.posts = {}
+        for i in range(1 + np.random.randint(10)):
+            posts = np.random.rand(1 + np.random.randint(50), dim)
+            self.posts[f'utt{i}'] = posts / posts.sum(axis=1, keepdims=True)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write_read(self, **kwargs):
+        with PosteriorsWriter(self.path, **kwargs) as writer:
+            for uttid, posts in self.posts.items():
+                writer.add(uttid, posts)
+        return load_posteriors(self.path)
+
+    def test_dense(self):
+        archive = self.write_read(encoding='float16', log=True)
+        self.assertEqual(archive.files, list(self.posts.keys()))
+        for uttid, posts in self.posts.items():
+            self.assertTrue(np.allclose(archive[uttid], np.log(1e-5 + posts),
+                                        atol=1e-2))
+
+    def test_topk(self):
+        archive = self.write_read(encoding='topk', topk=1)
+        for uttid, posts in self.posts.items():
+            best = posts.argmax(axis=1)
+            self.assertTrue(np.all(archive[uttid].argmax(axis=1) == best))
+            self.assertTrue(np.all((archive[uttid] > 0).sum(axis=1) == 1))
+
+    def test_threshold(self):
+        archive = self.write_read(encoding='threshold', threshold=.1)
+        for uttid, posts in self.posts.items():
+            expected = np.where(posts >= .1, posts, 0.)
+            self.assertTrue(np.allclose(archive[uttid], expected))
+
+    def test_merge(self):
+        uttids = list(self.posts.keys())
+        paths = []
+        for i in range(3):
+            paths.append(os.path.join(self.tmpdir.name, f'posts_{i}.npz'))
+            with PosteriorsWriter(paths[-1], encoding='topk', topk=2,
+                                  log=True) as writer:
+                for uttid in uttids[i::3]:
+                    writer.add(uttid, self.posts[uttid])
+        merge_posteriors(paths, self.path)
+        archive = load_posteriors(self.path)
+        self.assertEqual(sorted(archive.files), sorted(uttids))
+        for path in paths:
+            part = load_posteriors(path)
+            for uttid in part:
+                self.assertArraysAlmostEqual(archive[uttid], part[uttid])
+
+        with PosteriorsWriter(paths[1], encoding='float32') as writer:
+            writer.add('other', self.posts[uttids[0]])
+        with self.assertRaises(ValueError):
+            merge_posteriors(paths, self.path)
+
+
+__all__ = ['TestPosteriorsArchive']
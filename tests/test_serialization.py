@@ -0,0 +1,145 @@
+'Test the serialization of the models.'
+
+# pylint: disable=C0413
+# Not all the modules can be placed at the top of the files as we need
+# first to change the PYTHONPATH before to import the modules.
+import sys
+sys.path.insert(0, './')
+sys.path.insert(0, './tests')
+
+import os
+import pickle
+import tempfile
+import numpy as np
+import torch
+from basetest import BaseTest
+import beer
+from beer import serialization
+from beer.cli.objcache import ObjectCache, activate, load_object, save_object
+
+
+class TestSerialization(BaseTest):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'model')
+        dim = int(1 + np.random.randint(5))
+        npdfs = int(2 + np.random.randint(5))
+        modelset = beer.NormalSet.create(torch.zeros(dim), torch.ones(dim),
+                                         npdfs, noise_std=.1,
+                                         cov_type='diagonal')
+        nstates = int(1 + np.random.randint(2 * npdfs))
+        log_probs = torch.full((nstates,), -float(np.log(nstates)))
+        graph = beer.graph.CompiledGraph(
+            log_probs, log_probs,
+            torch.full((nstates, nstates), -float(np.log(nstates))),
+            list(np.random.randint(npdfs, size=nstates))
+        )
+        self.model = beer.HMM.create(graph, modelset).type(self.type)
+        self.features = torch.randn(int(1 + np.random.randint(50)),
+                                    dim).type(self.type)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def assertSameModel(self, model):
+        for param1, param2 in zip(self.model.bayesian_parameters(),
+                                  model.bayesian_parameters()):
+            self.assertArraysAlmostEqual(
+                param1.posterior.natural_parameters().numpy(),
+                param2.posterior.natural_parameters().numpy())
+        self.assertArraysAlmostEqual(
+            self.model.log_likelihood(self.features).numpy(),
+            model.log_likelihood(self.features).numpy())
+
+    def test_save_load(self):
+        serialization.save(self.model, self.path)
+        self.assertTrue(serialization.is_serialized(self.path))
+        self.assertSameModel(serialization.load(self.path))
+        self.assertSameModel(serialization.load(self.path, mmap=False))
+
+    def test_load_pickle(self):
+        with open(self.path, 'wb') as f:
+            pickle.dump(self.model, f)
+        self.assertFalse(serialization.is_serialized(self.path))
+        self.assertSameModel(serialization.load(self.path))
+
+    def test_shared_storage(self):
+        data = torch.randn(3, 4).type(self.type)
+        obj = {'data': data, 'row': data[1], 'transpose': data.t(),
+               'param': torch.nn.Parameter(torch.ones(2))}
+        serialization.save(obj, self.path)
+        loaded = serialization.load(self.path)
+        self.assertArraysAlmostEqual(loaded['transpose'].numpy(),
+                                     data.t().numpy())
+        self.assertIsInstance(loaded['param'], torch.nn.Parameter)
+        self.assertTrue(loaded['param'].requires_grad)
+
+        # The views still share the data and the modifications are not
+        # written back to the file.
+        loaded['row'][0] = 1000.
+        self.assertEqual(float(loaded['data'][1, 0]), 1000.)
+        self.assertEqual(float(loaded['transpose'][0, 1]), 1000.)
+        self.assertArraysAlmostEqual(
+            serialization.load(self.path)['data'].numpy(), data.numpy())
+
+
+class TestObjectCache(BaseTest):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'obj')
+        self.obj = {'data': torch.randn(int(1 + np.random.randint(10))),
+                    'name': 'obj'}
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_no_cache(self):
+        save_object(self.obj, self.path)
+        self.assertTrue(serialization.is_serialized(self.path))
+        save_object(self.obj, self.path, pickled=True)
+        self.assertFalse(serialization.is_serialized(self.path))
+        obj = load_object(self.path)
+        self.assertArraysAlmostEqual(obj['data'].numpy(),
+                                     self.obj['data'].numpy())
+
+    def test_in_memory(self):
+        cache = ObjectCache()
+        with activate(cache):
+            save_object(self.obj, self.path)
+            self.assertFalse(os.path.exists(self.path))
+            self.assertIn(self.path, cache)
+
+            # The cache keeps its own copy of the object.
+            obj = load_object(self.path)
+            obj['data'] += 1
+            obj = load_object(self.path)
+            self.assertArraysAlmostEqual(obj['data'].numpy(),
+                                         self.obj['data'].numpy())
+        self.assertFalse(os.path.exists(self.path))
+        with self.assertRaises(FileNotFoundError):
+            load_object(self.path)
+
+    def test_persist(self):
+        cache = ObjectCache()
+        cache.persist = True
+        with activate(cache):
+            save_object(self.obj, self.path, pickled=True)
+        with open(self.path, 'rb') as f:
+            obj = pickle.load(f)
+        self.assertArraysAlmostEqual(obj['data'].numpy(),
+                                     self.obj['data'].numpy())
+
+    def test_modified_file(self):
+        serialization.save(self.obj, self.path)
+        cache = ObjectCache()
+        with activate(cache):
+            self.assertEqual(load_object(self.path)['name'], 'obj')
+            self.assertIn(self.path, cache)
+            serialization.save({'name': 'new'}, self.path)
+            os.utime(self.path, ns=(0, 0))
+            self.assertEqual(load_object(self.path)['name'], 'new')
+
+
+__all__ = ['TestSerialization', 'TestObjectCache']
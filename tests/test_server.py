@@ -0,0 +1,141 @@
+'Test the batching server.'
+
+# pylint: disable=C0413
+# Not all the modules can be placed at the top of the files as we need
+# first to change the PYTHONPATH before to import the modules.
+import sys
+sys.path.insert(0, './')
+sys.path.insert(0, './tests')
+
+import os
+import tempfile
+import threading
+import numpy as np
+import torch
+from basetest import BaseTest
+import beer
+from beer.cli.server import BatchingServer, Client
+from beer.cli.subcommands.features.extract import feaconf
+from beer.cli.subcommands.hmm.serve import BatchDecoder
+
+
+class TestBatchingServer(BaseTest):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'server.sock')
+        self.nclients = int(1 + np.random.randint(10))
+        self.batch_sizes = []
+        self.server = BatchingServer(self.path, self.process_batch,
+                                     max_batch=4, batch_wait=.1)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.server.ready.wait()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.thread.join()
+        self.tmpdir.cleanup()
+
+    def process_batch(self, requests):
+        self.batch_sizes.append(len(requests))
+        responses = []
+        for header, array in requests:
+            if header['cmd'] == 'fail':
+                responses.append(({'error': 'failed'}, None))
+            else:
+                responses.append(({'cmd': header['cmd']}, 2 * array))
+        return responses
+
+    def test_request(self):
+        data = np.random.randn(10, 3)
+        with Client(self.path) as client:
+            header, array = client.request({'cmd': 'double'}, data)
+            self.assertEqual(header, {'cmd': 'double'})
+            self.assertArraysAlmostEqual(array, 2 * data)
+            with self.assertRaises(RuntimeError):
+                client.request({'cmd': 'fail'})
+
+            # The connection is still usable after an error.
+            _, array = client.request({'cmd': 'double'}, data)
+            self.assertArraysAlmostEqual(array, 2 * data)
+
+    def test_batching(self):
+        data = [np.random.randn(1 + i, 2) for i in range(self.nclients)]
+        results = [None] * self.nclients
+        def run(i):
+            with Client(self.path) as client:
+                results[i] = client.request({'cmd': 'double'}, data[i])[1]
+        threads = [threading.Thread(target=run, args=(i,))
+                   for i in range(self.nclients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for result, array in zip(results, data):
+            self.assertArraysAlmostEqual(result, 2 * array)
+        self.assertEqual(sum(self.batch_sizes), self.nclients)
+        self.assertLessEqual(max(self.batch_sizes), 4)
+        if self.nclients > 1:
+            self.assertGreater(max(self.batch_sizes), 1)
+
+
+class TestBatchDecoder(BaseTest):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'server.sock')
+        self.dim = int(1 + np.random.randint(5))
+        npdfs = int(2 + np.random.randint(5))
+        modelset = beer.NormalSet.create(torch.zeros(self.dim),
+                                         torch.ones(self.dim), npdfs,
+                                         noise_std=.1, cov_type='diagonal')
+        log_probs = torch.full((npdfs,), -float(np.log(npdfs)))
+        graph = beer.graph.CompiledGraph(
+            log_probs, log_probs,
+            torch.full((npdfs, npdfs), -float(np.log(npdfs))),
+            list(range(npdfs))
+        )
+        self.model = beer.HMM.create(graph, modelset)
+        self.batch_sizes = []
+        decoder = BatchDecoder(self.model, dict(feaconf))
+        def process_batch(requests):
+            self.batch_sizes.append(len(requests))
+            return decoder(requests)
+        # The batch is processed once both requests are received.
+        self.server = BatchingServer(self.path, process_batch,
+                                     max_batch=2, batch_wait=10.)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.server.ready.wait()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.thread.join()
+        self.tmpdir.cleanup()
+
+    def test_bad_request(self):
+        good = np.random.randn(10, self.dim).astype(np.float32)
+        bad = np.random.randn(5, self.dim + 1).astype(np.float32)
+        results = {}
+        def run(name, features):
+            with Client(self.path) as client:
+                try:
+                    results[name] = client.request(
+                        {'cmd': 'posteriors', 'state': True}, features)[1]
+                except RuntimeError as err:
+                    results[name] = err
+        threads = [threading.Thread(target=run, args=args)
+                   for args in [('good', good), ('bad', bad)]]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.batch_sizes, [2])
+        self.assertIsInstance(results['bad'], RuntimeError)
+        posts = self.model.posteriors(torch.from_numpy(good)).numpy()
+        self.assertArraysAlmostEqual(results['good'], posts)
+
+
+__all__ = ['TestBatchingServer', 'TestBatchDecoder']